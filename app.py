@@ -1,17 +1,56 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Request, Response, g, request, jsonify, render_template, send_file, abort
 from flask_cors import CORS
 import os
 import random
+import shutil
+import threading
+import time
+import uuid
+import re
+import hashlib
+import gc
+import io
+import multiprocessing
+import tempfile
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
 
 # Set Hugging Face token to avoid download issues
 from config import HUGGINGFACE_API_TOKEN
 os.environ["HUGGINGFACEHUB_API_TOKEN"] = HUGGINGFACE_API_TOKEN
 os.environ["HF_TOKEN"] = HUGGINGFACE_API_TOKEN
 
+# Logging goes through a queue to a background writer thread
+from config import LOG_LEVEL, LOG_FORMAT, LOG_DEBUG_SAMPLE_RATE, LOG_QUEUE_SIZE
+from lawhub_logging import setup_logging, NonBlockingQueueHandler
+logger = setup_logging(LOG_LEVEL, LOG_FORMAT, LOG_DEBUG_SAMPLE_RATE, LOG_QUEUE_SIZE)
+
 # RAG / LangChain imports - Updated for compatibility
 from typing import List
 from config import COI_PDF_PATH, HUGGINGFACE_MODEL_REPO, HUGGINGFACE_EMBEDDINGS_MODEL, RAG_PERSIST_DIR, LOCAL_LLM_ID
 from config import PINECONE_API_KEY, PINECONE_ENVIRONMENT, PINECONE_INDEX_NAME
+from config import RAG_KEEP_VERSIONS, RAG_BUILD_BATCH_SIZE, RAG_BUILD_RETRY_SECONDS, INDEX_JOB_HISTORY
+from config import PINECONE_UPSERT_BATCH_SIZE, PINECONE_UPSERT_WORKERS, PINECONE_UPSERT_MAX_RETRIES
+from config import PINECONE_CHECKPOINT_PATH, PINECONE_STATS_CACHE_PATH, PINECONE_STATS_TTL, PINECONE_MANIFEST_PATH
+from config import ASSET_BUILD_DIR, RAG_LANGUAGE_SPLIT
+from config import LLM_EARLY_STOP, LLM_EARLY_STOP_LOOP_REPEATS, LLM_ECHO_MARKERS
+from config import SESSION_MAX_COUNT, SESSION_TTL_MINUTES, SESSION_MAX_TURNS, SESSION_MAX_CHUNKS
+from config import SESSION_RERANK_MIN_SCORE
+from config import ANSWER_WAREHOUSE_DIR, ANSWER_WAREHOUSE_ENABLED, ANSWER_WAREHOUSE_MIN_SIMILARITY
+from config import UPLOAD_DIR, UPLOAD_MAX_MB, UPLOAD_EXTRACT_WORKERS, UPLOAD_INDEX_TTL_MINUTES, UPLOAD_INDEX_MEMORY_MB, UPLOAD_TOP_K
+from config import LLM_MODELS, LLM_DEFAULT_MODEL, LLM_POOL_RAM_BUDGET_MB, LLM_ROUTER, LLM_LOAD_RETRY_SECONDS
+from config import LLM_LOAD_MODE, LLM_LOW_CPU_MEM_USAGE, LLM_IDLE_UNLOAD_MINUTES
+from config import SERVER_HOST, SERVER_PORT, FLASK_DEBUG
+from config import TRAFFIC_CAPTURE, TRAFFIC_CAPTURE_PATH, TRAFFIC_CAPTURE_SAMPLE_RATE, TRAFFIC_CAPTURE_MAX_MB
+from config import RAG_ADAPTIVE_RETRIEVAL, RAG_TOP_K, RAG_FETCH_K, RAG_MIN_SCORE, RAG_SCORE_GAP
+from config import RAG_LANG_OVERFETCH
+from config import RAG_MMR_LAMBDA, RAG_DUPLICATE_SIM
+from config import EMBEDDINGS_BACKEND, EMBEDDINGS_ONNX_VARIANT, EMBEDDINGS_ONNX_THREADS, EMBEDDINGS_PARITY_MIN_COSINE
+from config import EMBEDDINGS_MICRO_BATCH, EMBEDDINGS_BATCH_MAX, EMBEDDINGS_BATCH_WAIT_MS
+from config import SPELL_CORRECTION, SPELL_MAX_EDIT_DISTANCE, SPELL_MIN_WORD_COUNT, PINECONE_VOCAB_PATH
+from config import SPELL_ENGLISH_FREQ_PATH, SPELL_ENGLISH_MAX_WORDS, SPELL_VALID_WORD_RATIO
+from config import LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT, LLM_OVERLOAD_MODE, PRIORITY_ISSUE_TYPES
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import Chroma, Pinecone
@@ -23,62 +62,212 @@ from langchain_core.documents import Document
 from langchain.chains import RetrievalQA
 from langchain_community.llms import HuggingFacePipeline
 from langchain.prompts import PromptTemplate
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, pipeline
+# transformers and torch are imported where a local LLM is loaded or run: a process that
+# never loads one (e.g. ONNX embeddings only) doesn't pay for them at startup
+from query_normalizer import SpellCorrector, count_words, load_frequency_list, normalize_query
+from chunk_store import ChunkStore, build_chunk_store
+from embedding_batcher import BatchingEmbeddings
+from pinecone_upload import bulk_upsert, cached_index_stats
+from document_extract import extract_document
+import legal_db
+from traffic_capture import TrafficCapture, answer_path
+
+class _LawHubRequest(Request):
+    """Request that spools document uploads straight into UPLOAD_DIR, so keeping one is a rename"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint != "upload_document" or (total_content_length or 0) <= 500 * 1024:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        spool = tempfile.NamedTemporaryFile("wb+", dir=UPLOAD_DIR, suffix=".part", delete=False)
+        self.__dict__.setdefault("_spooled_uploads", []).append(spool.name)
+        return spool
+
+    def close(self):
+        super().close()
+        # Spooled parts the handler didn't keep (rejected or failed uploads)
+        for path in self.__dict__.get("_spooled_uploads", ()):
+            if os.path.exists(path):
+                os.remove(path)
 
 app = Flask(__name__)
+app.request_class = _LawHubRequest
+app.config['MAX_CONTENT_LENGTH'] = UPLOAD_MAX_MB * 1024 * 1024
 CORS(app)
 
+# -----------------------
+# Traffic capture (replayed by replay_traffic.py)
+# -----------------------
+
+_traffic_capture = TrafficCapture(TRAFFIC_CAPTURE_PATH, TRAFFIC_CAPTURE_MAX_MB) if TRAFFIC_CAPTURE else None
+_CAPTURED_ENDPOINTS = {"ask", "legal_qa", "deepseek_legal"}
+
+def _note_answer_path(path):
+    """Record a path that the response body alone doesn't reveal (e.g. a template-echo fallback)"""
+    g.answer_path = path
+
+@app.before_request
+def _capture_start():
+    if (_traffic_capture is not None and request.endpoint in _CAPTURED_ENDPOINTS
+            and random.random() < TRAFFIC_CAPTURE_SAMPLE_RATE):
+        g.capture_started = time.time()
+
+@app.after_request
+def _capture_finish(response):
+    noted = g.get("answer_path")
+    if noted:
+        # Paths the body doesn't reveal; replays derive the others from the body themselves
+        response.headers["X-Answer-Path"] = noted
+    started = g.get("capture_started")
+    if started is None:
+        return response
+    payload = response.get_json(silent=True) if response.is_json else None
+    _traffic_capture.record(
+        endpoint=request.path,
+        ts=started,
+        data=request.get_json(force=True, silent=True) or {},
+        status=response.status_code,
+        path=answer_path(response.status_code, payload, noted),
+        latency_ms=(time.time() - started) * 1000,
+    )
+    return response
+
+# -----------------------
+# Static assets
+# -----------------------
+
+_asset_manifest = {"mtime": None, "data": None}
+
+def _load_asset_manifest():
+    """Manifest written by build_assets.py (None if assets haven't been built)"""
+    path = os.path.join(ASSET_BUILD_DIR, "manifest.json")
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if _asset_manifest["mtime"] != mtime:
+        import json
+        with open(path, 'r', encoding='utf-8') as f:
+            _asset_manifest["data"] = json.load(f)
+        _asset_manifest["mtime"] = mtime
+    return _asset_manifest["data"]
+
+def _send_built_asset(rel_path, immutable):
+    """Serve a prebuilt file with a strong ETag, picking a precompressed variant by Accept-Encoding"""
+    manifest = _load_asset_manifest()
+    entry = (manifest or {}).get("files", {}).get(rel_path)
+    if entry is None:
+        abort(404)
+
+    encoding = None
+    for candidate in ("br", "gzip"):
+        if candidate in entry["encodings"] and request.accept_encodings[candidate] > 0:
+            encoding = candidate
+            break
+    etag = f"{entry['etag']}-{encoding}" if encoding else entry["etag"]
+    headers = {
+        "ETag": f'"{etag}"',
+        "Vary": "Accept-Encoding",
+        # Hashed URLs never change content; pages keep their URL so they revalidate via ETag
+        "Cache-Control": "public, max-age=31536000, immutable" if immutable else "no-cache",
+    }
+    if request.if_none_match.contains(etag):
+        return "", 304, headers
+
+    path = os.path.join(ASSET_BUILD_DIR, rel_path)
+    if encoding:
+        path += ".br" if encoding == "br" else ".gz"
+        headers["Content-Encoding"] = encoding
+    response = send_file(os.path.abspath(path), mimetype=entry["mimetype"], etag=False, conditional=False)
+    response.headers.update(headers)
+    return response
+
+def _render_page(template_name):
+    """Serve the prebuilt page if build_assets.py has been run, else render the template"""
+    manifest = _load_asset_manifest()
+    if manifest and template_name in manifest.get("pages", {}):
+        return _send_built_asset(manifest["pages"][template_name], immutable=False)
+    return render_template(template_name)
+
+@app.route('/assets/<path:filename>')
+def built_asset(filename):
+    """Content-hashed build output (photos) with long-lived caching"""
+    if filename.startswith("pages/"):
+        abort(404)  # Pages keep stable URLs and are served from / and /app only
+    return _send_built_asset(filename, immutable=True)
+
 @app.route('/')
 def home():
     """Landing page"""
-    return render_template('landing_page.html')
+    return _render_page('landing_page.html')
 
 @app.route('/app')
 def app_main():
     """Main application page"""
-    return render_template('integrated_frontend.html')
+    return _render_page('integrated_frontend.html')
 
 @app.route('/api/ask', methods=['POST'])
 def ask():
-    """Main API endpoint for legal questions – RAG-only, simple-English output."""
+    """Main API endpoint for legal questions – RAG-only, simple-English output.
+
+    An optional session_id lets follow-up questions reuse the previous turn's retrieval.
+    """
     try:
         data = request.get_json(force=True, silent=True) or {}
         user_question = (data.get('question') or '').strip()
         country = (data.get('country') or '').strip() or None
+        session = _get_session((data.get('session_id') or '').strip())
 
         if not user_question:
             return jsonify({"error": "No question provided"}), 400
+        # Typo-corrected, normalized form for rules, caches and retrieval; prompts keep the original
+        search_question = normalize_question(user_question)
 
-        print(f"🤔 User asked: {user_question}")
+        logger.debug("User asked: %s", user_question)
+
+        # Emergencies skip retrieval and the LLM queue entirely
+        if classify_legal_issue(search_question) in PRIORITY_ISSUE_TYPES:
+            return _priority_response(search_question, country)
+
+        # High-frequency questions are answered from the precomputed warehouse
+        # (follow-ups in a conversation depend on earlier turns, so they always go live).
+        # A similarity lookup's question embedding is reused by the retriever below.
+        query_vec = None
+        if not (session and session["turns"] and _looks_like_follow_up(search_question)):
+            precomputed, query_vec = _warehouse_lookup(search_question, country)
+            if precomputed is not None:
+                logger.debug("Answered from the answer warehouse")
+                return jsonify(precomputed)
 
         # Try RAG pipeline (PDF-grounded) – required path
         try:
-            print("🔄 Attempting RAG query...")
+            logger.debug("Attempting RAG query...")
             if _ensure_rag_pipeline_ready():
-                print("✅ RAG pipeline ready, executing query...")
+                logger.debug("RAG pipeline ready, executing query...")
                 
                 # Use LLM-based retrieval approach
                 if _rag_chain["type"] == "llm_retrieval":
-                    retriever = _rag_chain["retriever"]
-                    llm = _rag_chain["llm"]
+                    retriever = _retriever_for(search_question)
                     prompt_template = _rag_chain["prompt_template"]
                     
-                    docs = retriever.get_relevant_documents(user_question)
+                    docs = _retrieve_for_session(session, search_question, retriever, query_vec)
                     
                     if docs:
                         # Combine relevant documents
                         context = "\n\n".join([doc.page_content for doc in docs[:4]])
+                        llm = _route_llm(search_question, context)
                         
                         # Generate answer using LLM
                         try:
                             prompt = prompt_template.format(context=context, question=user_question)
-                            response = llm.invoke(prompt)
+                            response = _invoke_llm_admitted(llm, prompt)
                             legal_advice = response.strip()
                             
                             # Check if response looks like a template (contains template text)
                             if "1. Immediate Actions Required" in legal_advice or "Answer:" in legal_advice:
-                                print("⚠️ LLM returned template text, using rule-based system")
-                                legal_advice = get_legal_advice(user_question, "", country)
+                                logger.warning("LLM returned template text, using rule-based system")
+                                _note_answer_path("template-echo")
+                                legal_advice = get_legal_advice(search_question, "", country)
                                 return jsonify({
                                     'success': True,
                                     'answer': legal_advice,
@@ -88,20 +277,14 @@ def ask():
                                 })
                             
                             # Add source attribution
-                            rag_sources = []
-                            for doc in docs[:4]:
-                                meta = doc.metadata or {}
-                                rag_sources.append({
-                                    "source": meta.get('source', 'Constitution PDF'),
-                                    "page": meta.get('page', 'Unknown')
-                                })
+                            rag_sources = _rag_sources(docs)
                             
                             # Add sources and disclaimer
                             pages_str = ", ".join([str(s.get('page','?')) for s in rag_sources if s.get('page') is not None])
                             legal_advice += f"\n\n📚 Sources: Constitution of India (pages: {pages_str})"
                             legal_advice += "\n\n⚖️ Legal Disclaimer: This information is based on constitutional provisions. For specific legal advice, consult a qualified lawyer."
                             
-                            print(f"✅ LLM-based answer generated from {len(docs)} documents")
+                            logger.debug("LLM-based answer generated from %s documents", len(docs))
                             return jsonify({
                                 'success': True,
                                 'answer': legal_advice,
@@ -111,10 +294,15 @@ def ask():
                                 'message': "🤖 AI-powered answer from your knowledge base"
                             })
                             
+                        except LLMOverloaded as overload:
+                            return _overload_response(search_question, docs, overload)
+                        except DegenerateGeneration as stop:
+                            return _early_stop_response(search_question, docs, stop)
                         except Exception as llm_error:
-                            print(f"❌ LLM generation failed: {llm_error}")
+                            logger.error("LLM generation failed: %s", llm_error)
+                            _note_answer_path("llm-error")
                             # Fallback to rule-based system
-                            legal_advice = get_legal_advice(user_question, "", country)
+                            legal_advice = get_legal_advice(search_question, "", country)
                             return jsonify({
                                 'success': True,
                                 'answer': legal_advice,
@@ -123,8 +311,8 @@ def ask():
                                 'message': "⚖️ Legal guidance provided"
                             })
                     else:
-                        print("⚠️ No relevant documents found - using rule-based system")
-                        legal_advice = get_legal_advice(user_question, "", country)
+                        logger.warning("No relevant documents found - using rule-based system")
+                        legal_advice = get_legal_advice(search_question, "", country)
                         return jsonify({
                             'success': True,
                             'answer': legal_advice,
@@ -135,20 +323,14 @@ def ask():
                         
                 elif _rag_chain["type"] == "simple_retrieval":
                     # Fallback to simple retrieval
-                    retriever = _rag_chain["retriever"]
-                    docs = retriever.get_relevant_documents(user_question)
+                    retriever = _retriever_for(search_question)
+                    docs = _retrieve_for_session(session, search_question, retriever, query_vec)
                     
                     if docs:
-                        legal_advice = _generate_answer_from_docs(user_question, docs)
-                        rag_sources = []
-                        for doc in docs[:4]:
-                            meta = doc.metadata or {}
-                            rag_sources.append({
-                                "source": meta.get('source', 'Constitution PDF'),
-                                "page": meta.get('page', 'Unknown')
-                            })
+                        legal_advice = _generate_answer_from_docs(search_question, docs)
+                        rag_sources = _rag_sources(docs)
                         
-                        print(f"✅ Simple retrieval answer generated from {len(docs)} documents")
+                        logger.debug("Simple retrieval answer generated from %s documents", len(docs))
                         return jsonify({
                             'success': True,
                             'answer': legal_advice + ("\n\n📚 Sources: Constitution of India (pages: " + ", ".join([str(s.get('page','?')) for s in rag_sources if s.get('page') is not None]) + ")" if rag_sources else ""),
@@ -158,8 +340,8 @@ def ask():
                             'message': "📚 Answered from your knowledge base"
                         })
                     else:
-                        print("⚠️ No relevant documents found - using rule-based system")
-                        legal_advice = get_legal_advice(user_question, "", country)
+                        logger.warning("No relevant documents found - using rule-based system")
+                        legal_advice = get_legal_advice(search_question, "", country)
                         return jsonify({
                             'success': True,
                             'answer': legal_advice,
@@ -168,17 +350,15 @@ def ask():
                             'message': "⚖️ Legal guidance provided"
                         })
                 else:
-                    print("⚠️ Unknown RAG chain type")
+                    logger.warning("Unknown RAG chain type")
             else:
-                print("❌ RAG pipeline failed to initialize")
+                logger.error("RAG pipeline failed to initialize")
         except Exception as rag_err:
-            print(f"❌ RAG query error, falling back to rule-based: {rag_err}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("RAG query error, falling back to rule-based: %s", rag_err)
 
         # If we reach here, we couldn't answer from PDF - use rule-based system
-        print("🔄 No RAG results, using rule-based system...")
-        legal_advice = get_legal_advice(user_question, "", country)
+        logger.info("No RAG results, using rule-based system...")
+        legal_advice = get_legal_advice(search_question, "", country)
         return jsonify({
             'success': True,
             'answer': legal_advice,
@@ -188,9 +368,7 @@ def ask():
         })
 
     except Exception as e:
-        print(f"❌ Main API error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Main API error: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -206,30 +384,37 @@ def deepseek_legal():
 
         if not user_question:
             return jsonify({"error": "No question provided"}), 400
+        # Typo-corrected, normalized form for rules, caches and retrieval; prompts keep the original
+        search_question = normalize_question(user_question)
 
-        print(f"🤖 DeepSeek Legal: {user_question}")
+        logger.debug("DeepSeek Legal: %s", user_question)
+
+        # Emergencies skip retrieval and the LLM queue entirely
+        if classify_legal_issue(search_question) in PRIORITY_ISSUE_TYPES:
+            return _priority_response(search_question)
 
         try:
             if _ensure_rag_pipeline_ready():
                 if _rag_chain["type"] == "llm_retrieval":
-                    retriever = _rag_chain["retriever"]
-                    llm = _rag_chain["llm"]
+                    retriever = _retriever_for(search_question)
                     prompt_template = _rag_chain["prompt_template"]
                     
-                    docs = retriever.get_relevant_documents(user_question)
+                    docs = retriever.get_relevant_documents(search_question)
                     
                     if docs:
                         context = "\n\n".join([doc.page_content for doc in docs[:4]])
+                        llm = _route_llm(search_question, context)
                         
                         try:
                             prompt = prompt_template.format(context=context, question=user_question)
-                            response = llm.invoke(prompt)
+                            response = _invoke_llm_admitted(llm, prompt)
                             legal_advice = response.strip()
                             
                             # Check if response looks like a template
                             if "1. Immediate Actions Required" in legal_advice or "Answer:" in legal_advice:
-                                print("⚠️ LLM returned template text, using rule-based system")
-                                legal_advice = get_legal_advice(user_question, "", None)
+                                logger.warning("LLM returned template text, using rule-based system")
+                                _note_answer_path("template-echo")
+                                legal_advice = get_legal_advice(search_question, "", None)
                                 return jsonify({
                                     'success': True,
                                     'answer': legal_advice,
@@ -238,13 +423,7 @@ def deepseek_legal():
                                     'message': "⚖️ Legal guidance provided"
                                 })
                             
-                            rag_sources = []
-                            for doc in docs[:4]:
-                                meta = doc.metadata or {}
-                                rag_sources.append({
-                                    "source": meta.get('source', 'Constitution PDF'),
-                                    "page": meta.get('page', 'Unknown')
-                                })
+                            rag_sources = _rag_sources(docs)
                             
                             pages_str = ", ".join([str(s.get('page','?')) for s in rag_sources if s.get('page') is not None])
                             legal_advice += f"\n\n📚 Sources: Constitution of India (pages: {pages_str})"
@@ -258,10 +437,15 @@ def deepseek_legal():
                                 'model': 'LLM + RAG',
                                 'message': "🤖 AI-powered answer from your knowledge base"
                             })
+                        except LLMOverloaded as overload:
+                            return _overload_response(search_question, docs, overload)
+                        except DegenerateGeneration as stop:
+                            return _early_stop_response(search_question, docs, stop)
                         except Exception as llm_error:
-                            print(f"❌ LLM generation failed: {llm_error}")
+                            logger.error("LLM generation failed: %s", llm_error)
+                            _note_answer_path("llm-error")
                             # Fallback to rule-based system
-                            legal_advice = get_legal_advice(user_question, "", None)
+                            legal_advice = get_legal_advice(search_question, "", None)
                             return jsonify({
                                 'success': True,
                                 'answer': legal_advice,
@@ -271,18 +455,12 @@ def deepseek_legal():
                             })
                             
                 elif _rag_chain["type"] == "simple_retrieval":
-                    retriever = _rag_chain["retriever"]
-                    docs = retriever.get_relevant_documents(user_question)
+                    retriever = _retriever_for(search_question)
+                    docs = retriever.get_relevant_documents(search_question)
                     
                     if docs:
-                        legal_advice = _generate_answer_from_docs(user_question, docs)
-                        rag_sources = []
-                        for doc in docs[:4]:
-                            meta = doc.metadata or {}
-                            rag_sources.append({
-                                "source": meta.get('source', 'Constitution PDF'),
-                                "page": meta.get('page', 'Unknown')
-                            })
+                        legal_advice = _generate_answer_from_docs(search_question, docs)
+                        rag_sources = _rag_sources(docs)
                         
                         return jsonify({
                             'success': True,
@@ -293,7 +471,7 @@ def deepseek_legal():
                             'message': "🤖 AI-powered answer from your knowledge base"
                         })
         except Exception as rag_err:
-            print(f"RAG query error, falling back to rule-based: {rag_err}")
+            logger.warning("RAG query error, falling back to rule-based: %s", rag_err)
 
         return jsonify({
             'success': True,
@@ -316,62 +494,54 @@ def legal_qa():
 
         if not user_question:
             return jsonify({"error": "No question provided"}), 400
+        # Typo-corrected, normalized form for rules, caches and retrieval; prompts keep the original
+        search_question = normalize_question(user_question)
 
-        print(f"⚖️ Legal Q&A: {user_question}")
+        logger.debug("Legal Q&A: %s", user_question)
 
         # Detect country from question
-        countries = {
-            "india": "India", "pakistan": "Pakistan", "usa": "USA", "australia": "Australia",
-            "canada": "Canada", "uk": "UK", "bhutan": "Bhutan", "nepal": "Nepal",
-            "new zealand": "New Zealand", "singapore": "Singapore"
-        }
-        country = None
-        question_lower = user_question.lower()
-        for country_key, country_name in countries.items():
-            if country_key in question_lower:
-                country = country_name
-                break
+        country = _detect_country(search_question)
+
+        # Emergencies skip retrieval and the LLM queue entirely
+        if classify_legal_issue(search_question) in PRIORITY_ISSUE_TYPES:
+            return _priority_response(search_question, country, question=user_question, country=country,
+                                      supported_countries=list(COUNTRY_NAMES.values()))
 
         # Try RAG
         try:
             if _ensure_rag_pipeline_ready():
                 if _rag_chain["type"] == "llm_retrieval":
-                    retriever = _rag_chain["retriever"]
-                    llm = _rag_chain["llm"]
+                    retriever = _retriever_for(search_question)
                     prompt_template = _rag_chain["prompt_template"]
                     
-                    docs = retriever.get_relevant_documents(user_question)
+                    docs = retriever.get_relevant_documents(search_question)
                     
                     if docs:
                         context = "\n\n".join([doc.page_content for doc in docs[:4]])
+                        llm = _route_llm(search_question, context)
                         
                         try:
                             prompt = prompt_template.format(context=context, question=user_question)
-                            response = llm.invoke(prompt)
+                            response = _invoke_llm_admitted(llm, prompt)
                             rag_answer = response.strip()
                             
                             # Check if response looks like a template
                             if "1. Immediate Actions Required" in rag_answer or "Answer:" in rag_answer:
-                                print("⚠️ LLM returned template text, using rule-based system")
-                                legal_advice = get_legal_advice(user_question, "", country)
+                                logger.warning("LLM returned template text, using rule-based system")
+                                _note_answer_path("template-echo")
+                                legal_advice = get_legal_advice(search_question, "", country)
                                 return jsonify({
                                     'success': True,
                                     'question': user_question,
                                     'country': country,
                                     'answer': legal_advice,
                                     'source': 'Rule-based system',
-                                    'supported_countries': list(countries.values()),
+                                    'supported_countries': list(COUNTRY_NAMES.values()),
                                     'model': 'rule-based',
                                     'message': "⚖️ Legal guidance provided"
                                 })
                             
-                            rag_sources = []
-                            for doc in docs[:4]:
-                                meta = doc.metadata or {}
-                                rag_sources.append({
-                                    "source": meta.get('source', 'Constitution PDF'),
-                                    "page": meta.get('page', 'Unknown')
-                                })
+                            rag_sources = _rag_sources(docs)
                             
                             pages_str = ", ".join([str(s.get('page','?')) for s in rag_sources if s.get('page') is not None])
                             rag_answer += f"\n\n📚 Sources: Constitution of India (pages: {pages_str})"
@@ -384,38 +554,37 @@ def legal_qa():
                                 'answer': rag_answer,
                                 'sources': rag_sources,
                                 'source': 'RAG: Constitution PDF',
-                                'supported_countries': list(countries.values()),
+                                'supported_countries': list(COUNTRY_NAMES.values()),
                                 'model': 'LLM + RAG',
                                 'message': "🤖 AI-powered answer from your knowledge base"
                             })
+                        except LLMOverloaded as overload:
+                            return _overload_response(search_question, docs, overload, question=user_question, country=country, supported_countries=list(COUNTRY_NAMES.values()))
+                        except DegenerateGeneration as stop:
+                            return _early_stop_response(search_question, docs, stop, question=user_question, country=country, supported_countries=list(COUNTRY_NAMES.values()))
                         except Exception as llm_error:
-                            print(f"❌ LLM generation failed: {llm_error}")
+                            logger.error("LLM generation failed: %s", llm_error)
+                            _note_answer_path("llm-error")
                             # Fallback to rule-based system
-                            legal_advice = get_legal_advice(user_question, "", country)
+                            legal_advice = get_legal_advice(search_question, "", country)
                             return jsonify({
                                 'success': True,
                                 'question': user_question,
                                 'country': country,
                                 'answer': legal_advice,
                                 'source': 'Rule-based system',
-                                'supported_countries': list(countries.values()),
+                                'supported_countries': list(COUNTRY_NAMES.values()),
                                 'model': 'rule-based',
                                 'message': "⚖️ Legal guidance provided"
                             })
                             
                 elif _rag_chain["type"] == "simple_retrieval":
-                    retriever = _rag_chain["retriever"]
-                    docs = retriever.get_relevant_documents(user_question)
+                    retriever = _retriever_for(search_question)
+                    docs = retriever.get_relevant_documents(search_question)
                     
                     if docs:
-                        legal_advice = _generate_answer_from_docs(user_question, docs)
-                        rag_sources = []
-                        for doc in docs[:4]:
-                            meta = doc.metadata or {}
-                            rag_sources.append({
-                                "source": meta.get('source', 'Constitution PDF'),
-                                "page": meta.get('page', 'Unknown')
-                            })
+                        legal_advice = _generate_answer_from_docs(search_question, docs)
+                        rag_sources = _rag_sources(docs)
                         
                         return jsonify({
                             'success': True,
@@ -424,22 +593,22 @@ def legal_qa():
                             'answer': legal_advice + ("\n\n📚 Sources: Constitution of India (pages: " + ", ".join([str(s.get('page','?')) for s in rag_sources if s.get('page') is not None]) + ")" if rag_sources else ""),
                             'sources': rag_sources,
                             'source': 'RAG: Constitution PDF',
-                            'supported_countries': list(countries.values()),
+                            'supported_countries': list(COUNTRY_NAMES.values()),
                             'model': 'retrieval',
                             'message': "📚 Answered from your knowledge base"
                         })
         except Exception as rag_err:
-            print(f"RAG query error, falling back to rule-based: {rag_err}")
+            logger.warning("RAG query error, falling back to rule-based: %s", rag_err)
 
         # Fallback
-        legal_advice = get_legal_advice(user_question, "", country)
+        legal_advice = get_legal_advice(search_question, "", country)
         return jsonify({
             'success': True,
             'question': user_question,
             'country': country,
             'answer': legal_advice,
             'source': 'Rule-based helper',
-            'supported_countries': list(countries.values()),
+            'supported_countries': list(COUNTRY_NAMES.values()),
             'message': "⚖️ Legal wisdom delivered (fallback)"
         })
 
@@ -449,30 +618,51 @@ def legal_qa():
             'error': str(e)
         }), 500
 
+COUNTRY_NAMES = {
+    "india": "India", "pakistan": "Pakistan", "usa": "USA", "australia": "Australia",
+    "canada": "Canada", "uk": "UK", "bhutan": "Bhutan", "nepal": "Nepal",
+    "new zealand": "New Zealand", "singapore": "Singapore"
+}
+
+# Checked in order; the first issue with a matching keyword wins
+LEGAL_ISSUE_KEYWORDS = [
+    # Sexual assault/rape first (highest priority and sensitivity)
+    ("sexual_assault", ['rape', 'sexual assault', 'molestation', 'abuse', 'harassment']),
+    ("document_loss", ['lost', 'missing', 'stolen', 'misplaced']),
+    ("passport_renewal", ['passport', 'renew', 'renewal', 'apply', 'application']),
+    ("criminal", ['arrest', 'police', 'criminal', 'jail']),
+    ("family", ['divorce', 'marriage', 'family', 'custody']),
+    ("property", ['property', 'land', 'house', 'rent', 'lease']),
+    ("employment", ['work', 'job', 'employment', 'salary', 'termination']),
+]
+
+def _detect_country(question):
+    question_lower = question.lower()
+    for country_key, country_name in COUNTRY_NAMES.items():
+        if country_key in question_lower:
+            return country_name
+    return None
+
+def classify_legal_issue(question):
+    """Determine the type of legal issue from keywords in the question"""
+    question_lower = question.lower()
+    for issue, keywords in LEGAL_ISSUE_KEYWORDS:
+        if any(word in question_lower for word in keywords):
+            return issue
+    return "general"
+
 def get_legal_advice(question, context="", country=None):
     """
     Get creative and engaging legal advice using rule-based system
     """
     # Use provided country or detect from question
     if not country:
-        countries = {
-            "india": "India", "pakistan": "Pakistan", "usa": "USA", "australia": "Australia",
-            "canada": "Canada", "uk": "UK", "bhutan": "Bhutan", "nepal": "Nepal",
-            "new zealand": "New Zealand", "singapore": "Singapore"
-        }
-        question_lower = question.lower()
-        for country_key, country_name in countries.items():
-            if country_key in question_lower:
-                country = country_name
-                break
+        country = _detect_country(question)
     
     # Analyze the question to provide more relevant responses
-    question_lower = question.lower()
+    issue_type = classify_legal_issue(question)
     
-    # Determine the type of legal issue
-    # Check for sexual assault/rape first (highest priority and sensitivity)
-    if any(word in question_lower for word in ['rape', 'sexual assault', 'molestation', 'abuse', 'harassment']):
-        issue_type = "sexual_assault"
+    if issue_type == "sexual_assault":
         greeting = "🚨 Sexual Assault Emergency! You are not alone, and help is available!"
         specific_advice = """🚨 IMMEDIATE CRISIS RESPONSE:
 
@@ -518,33 +708,26 @@ Step 5: 📋 Documentation
 • National Commission for Women: 7827170170"""
     
     # Check for lost/missing documents next
-    elif any(word in question_lower for word in ['lost', 'missing', 'stolen', 'misplaced']):
-        issue_type = "document_loss"
+    elif issue_type == "document_loss":
         greeting = "🛡️ Document Emergency! Don't panic, I've got your back!"
         specific_advice = "📋 Document Recovery Action Plan:\n\n📋 Step 1: Report immediately to local police (get FIR copy)\n\n📋 Step 2: Contact passport office/embassy\n\n📋 Step 3: Gather supporting documents (ID proofs, photos)\n\n📋 Step 4: Apply for replacement with urgency\n\n📋 Step 5: Keep copies of all applications\n\n💡 Pro Tips:\n\n• File police complaint within 24 hours\n\n• Keep FIR copy safe - you'll need it\n\n• Contact embassy if abroad\n\n• Apply for emergency travel document if needed\n\n• Use passport tracking services"
     # Check for passport renewal/application
-    elif any(word in question_lower for word in ['passport', 'renew', 'renewal', 'apply', 'application']) and not any(word in question_lower for word in ['lost', 'missing', 'stolen']):
-        issue_type = "passport_renewal"
+    elif issue_type == "passport_renewal":
         greeting = "📋 Passport Services! Let's get your travel documents sorted!"
         specific_advice = "🛂 Passport Renewal/Application Guide:\n\n📋 Step 1: Check eligibility and requirements\n\n📋 Step 2: Gather required documents (ID proofs, photos, address proof)\n\n📋 Step 3: Fill application form online or offline\n\n📋 Step 4: Pay applicable fees\n\n📋 Step 5: Submit application with all documents\n\n📋 Step 6: Track application status\n\n💡 Pro Tips:\n\n• Apply well before travel dates (3-6 months)\n\n• Keep all original documents ready\n\n• Use official government portals\n\n• Check processing times for your region\n\n• Keep application number safe for tracking"
-    elif any(word in question_lower for word in ['arrest', 'police', 'criminal', 'jail']):
-        issue_type = "criminal"
+    elif issue_type == "criminal":
         greeting = "🚨 Criminal Case Alert! Stay calm, know your rights!"
         specific_advice = "⚖️ Criminal Defense Action Plan:\n\n📋 Step 1: Know your rights (right to remain silent)\n\n📋 Step 2: Contact lawyer immediately\n\n📋 Step 3: Don't sign anything without legal advice\n\n📋 Step 4: Document everything (witnesses, evidence)\n\n📋 Step 5: Apply for bail if arrested\n\n💡 Pro Tips:\n\n• Remember: 'You have the right to remain silent'\n\n• Get lawyer contact before trouble\n\n• Keep evidence of innocence\n\n• Don't talk to police without lawyer\n\n• File complaints if rights violated"
-    elif any(word in question_lower for word in ['divorce', 'marriage', 'family', 'custody']):
-        issue_type = "family"
+    elif issue_type == "family":
         greeting = "💔 Family Law Matter! Let's handle this with care and wisdom!"
         specific_advice = "👨‍👩‍👧‍👦 Family Law Action Plan:\n\n📋 Step 1: Document all incidents and communications\n\n📋 Step 2: Consult family law specialist\n\n📋 Step 3: Consider mediation first\n\n📋 Step 4: Gather financial documents\n\n📋 Step 5: Focus on children's best interests\n\n💡 Pro Tips:\n\n• Keep emotions separate from legal strategy\n\n• Document everything with dates\n\n• Consider counseling before legal action\n\n• Protect children from conflict\n\n• Maintain financial records"
-    elif any(word in question_lower for word in ['property', 'land', 'house', 'rent', 'lease']):
-        issue_type = "property"
+    elif issue_type == "property":
         greeting = "🏠 Property Law Issue! Let's protect your rights!"
         specific_advice = "🏘️ Property Law Action Plan:\n\n📋 Step 1: Gather all property documents\n\n📋 Step 2: Verify ownership and boundaries\n\n📋 Step 3: Consult property law expert\n\n📋 Step 4: Document all communications\n\n📋 Step 5: Consider legal notice if needed\n\n💡 Pro Tips:\n\n• Keep all property documents safe\n\n• Take photos of property condition\n\n• Maintain payment records\n\n• Get everything in writing\n\n• Know your tenant/owner rights"
-    elif any(word in question_lower for word in ['work', 'job', 'employment', 'salary', 'termination']):
-        issue_type = "employment"
+    elif issue_type == "employment":
         greeting = "💼 Employment Law Issue! Let's fight for your workplace rights!"
         specific_advice = "💼 Employment Law Action Plan:\n\n📋 Step 1: Document all workplace incidents\n\n📋 Step 2: Know your employment contract\n\n📋 Step 3: Contact labor department if needed\n\n📋 Step 4: Keep salary and work records\n\n📋 Step 5: Consider legal action if rights violated\n\n💡 Pro Tips:\n\n• Keep copies of all employment documents\n\n• Document harassment or discrimination\n\n• Know your working hours and overtime rights\n\n• File complaints with labor department\n\n• Don't sign anything under pressure"
     else:
-        issue_type = "general"
         greeting = "⚖️ Legal Guidance! Here's your action plan!"
         specific_advice = "🎯 General Legal Guidance - Your Action Plan:\n\n📋 Step 1: Document everything (your evidence collection)\n\n📋 Step 2: Research your specific legal rights (your knowledge power)\n\n📋 Step 3: Contact relevant authorities (your legal guardians)\n\n📋 Step 4: Consider consulting a lawyer (your legal expert)\n\n📋 Step 5: Follow proper legal procedures (your legal roadmap)\n\n💡 Pro Tips:\n\n• Keep all documents and evidence organized\n\n• Take photos and screenshots when relevant\n\n• Stay calm and professional in all interactions\n\n• Know your rights but also your responsibilities\n\n• Consider mediation before going to court"
     
@@ -577,7 +760,7 @@ Step 5: 📋 Documentation
 # -------------------------------
 # Answer generation from RAG docs
 # -------------------------------
-def _generate_answer_from_docs(question, docs):
+def _generate_answer_from_docs(question, docs, use_llm=True):
     """Create a step-based, structured answer using retrieved PDF chunks and LLM.
     
     This function:
@@ -585,17 +768,18 @@ def _generate_answer_from_docs(question, docs):
     2. Uses LLM to generate structured, step-based responses
     3. Ensures accuracy by grounding in retrieved text
     4. Provides actionable legal guidance
-    """
-    def is_english_line(line: str) -> bool:
-        for ch in line:
-            if '\u0900' <= ch <= '\u097F':  # Devanagari range
-                return False
-        return True
 
+    With use_llm=False the answer is purely extractive (used when the LLM queue is full).
+    """
     # Combine and filter retrieved documents
     raw = "\n\n".join([getattr(d, 'page_content', '') for d in docs[:3]])
     lines = [ln.strip() for ln in raw.splitlines() if ln.strip()]
-    eng_lines = [ln for ln in lines if is_english_line(ln)]
+    if all((getattr(d, 'metadata', None) or {}).get('lang') for d in docs[:3]):
+        # Language-partitioned index: chunks are already single-language, no per-line filtering needed
+        eng_lines = lines
+    else:
+        eng_lines = [ln for ln in lines if not _DEVANAGARI_RE.search(ln)]
+    answer_lang = (getattr(docs[0], 'metadata', None) or {}).get('lang', 'en') if docs else 'en'
 
     # Score lines by relevance to question
     q_words = [w for w in question.lower().split() if len(w) > 3]
@@ -611,8 +795,12 @@ def _generate_answer_from_docs(question, docs):
     context = "\n".join(top_lines)
     
     # Initialize LLM if not already done
-    llm = _initialize_llm()
+    llm = _route_llm(question, context) if use_llm else None
     
+    if llm is None and answer_lang == "hi":
+        bullet_points = "\n".join([f"• {ln}" for ln in top_lines[:6]])
+        return f"आपके प्रश्न के बारे में भारत का संविधान यह कहता है:\n\n{bullet_points}\n\n⚖️ यह सामान्य जानकारी है। विशिष्ट कानूनी सलाह के लिए किसी योग्य वकील से परामर्श करें।"
+
     if llm is None:
         # Fallback to simple format if LLM fails
         bullet_points = "\n".join([f"• {ln}" for ln in top_lines[:6]])
@@ -647,7 +835,7 @@ Answer:"""
     try:
         # Generate structured response using LLM
         prompt = step_prompt_template.format(question=question, context=context)
-        response = llm.invoke(prompt)
+        response = _invoke_llm_admitted(llm, prompt)
         
         # Clean and format the response
         answer = response.strip()
@@ -660,34 +848,69 @@ Answer:"""
         
         return answer
         
+    except DegenerateGeneration as stop:
+        logger.info("Answering extractively after early stop (%s)", stop)
+        return _generate_answer_from_docs(question, docs, use_llm=False)
     except Exception as e:
-        print(f"❌ LLM generation failed: {e}")
+        logger.error("LLM generation failed: %s", e)
         # Fallback response
         bullet_points = "\n".join([f"• {ln}" for ln in top_lines[:6]])
         return f"Based on the Constitution of India:\n\n{bullet_points}\n\n📋 Recommended Steps:\n1. Review the constitutional provisions mentioned above\n2. Gather relevant documentation\n3. Consult with a legal expert\n4. Follow proper legal procedures\n5. Keep records of all actions taken\n\n⚖️ For specific legal advice, please consult a qualified lawyer."
 
 @app.route('/api/preload_rag', methods=['POST'])
 def manual_preload_rag():
-    """Manually trigger RAG pipeline preloading"""
+    """Start loading/building the RAG pipeline in the background"""
     try:
-        print("🔄 Manual RAG preload requested...")
-        success = preload_rag_pipeline()
-        if success:
+        logger.info("Manual RAG preload requested...")
+        if _rag_chain is not None:
             return jsonify({
                 "success": True,
-                "message": "RAG pipeline preloaded successfully! 🚀"
+                "message": "RAG pipeline already loaded! 🚀",
+                "index_version": _current_index_version()
             })
-        else:
+        job, created = start_index_job("build")
+        return jsonify({
+            "success": True,
+            "message": "RAG pipeline preload started ⏳" if created else "An index job is already running ⏳",
+            "job": job
+        }), 202
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/reindex', methods=['POST'])
+def reindex_rag():
+    """Rebuild the vector index into a new version and swap it in when done"""
+    try:
+        logger.info("RAG reindex requested...")
+        job, created = start_index_job("reindex")
+        if not created:
             return jsonify({
                 "success": False,
-                "error": "RAG pipeline preloading failed"
-            }), 500
+                "error": "An index job is already running",
+                "job": job
+            }), 409
+        return jsonify({
+            "success": True,
+            "message": "Reindex started ⏳",
+            "job": job
+        }), 202
     except Exception as e:
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def index_job_status(job_id):
+    """Progress of a background build/reindex job"""
+    job = get_index_job(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Unknown job"}), 404
+    return jsonify({"success": True, "job": job})
+
 @app.route('/api/status', methods=['GET'])
 def status():
     """Check API status"""
@@ -696,16 +919,43 @@ def status():
     # Determine which vector store is being used
     vector_store_info = "Chroma (local)"
     if _rag_vs is not None:
-        if hasattr(_rag_vs, 'index_name'):
-            vector_store_info = f"Pinecone ({_rag_vs.index_name})"
+        if _is_pinecone(_rag_vs):
+            vector_store_info = f"Pinecone ({PINECONE_INDEX_NAME})"
         else:
             vector_store_info = "Chroma (local)"
+    with _route_counts_lock:
+        routed = dict(_route_counts)
+    with _sessions_lock:
+        sessions = {"active": len(_sessions), **_session_stats}
+    with _retrieval_stats_lock:
+        retrieval = dict(_retrieval_stats)
     
     return jsonify({
         "status": "online",
         "message": "LawHub API is running! 🚀",
         "rag_pipeline": rag_status,
         "vector_store": vector_store_info,
+        "index_version": _current_index_version(),
+        "llm_admission": _llm_admission.stats(),
+        "llm_pool": {**_model_pool.stats(), "routed": routed},
+        "sessions": sessions,
+        "log_records_dropped": NonBlockingQueueHandler.dropped,
+        "traffic_capture": _traffic_capture.stats() if _traffic_capture is not None else None,
+        "query_normalizer": {
+            "vocabulary": len(_spell_corrector) if _spell_corrector is not None else 0,
+            "corrections": _spell_corrector.corrections if _spell_corrector is not None else 0,
+        },
+        "early_stop": {**_early_stop_stats, "reasons": dict(_early_stop_stats["reasons"])},
+        "embeddings": _embeddings.stats() if isinstance(_embeddings, BatchingEmbeddings) else None,
+        "retrieval": {
+            "queries": retrieval["queries"],
+            "avg_docs": round(retrieval["returned"] / retrieval["queries"], 2) if retrieval["queries"] else None,
+        },
+        "generation": {
+            "count": _generation_stats["count"],
+            "avg_prompt_chars": round(_generation_stats["prompt_chars"] / _generation_stats["count"]) if _generation_stats["count"] else None,
+            "avg_seconds": round(_generation_stats["seconds"] / _generation_stats["count"], 2) if _generation_stats["count"] else None,
+        },
         "features": [
             "Legal Q&A with AI",
             "Document search",
@@ -716,6 +966,498 @@ def status():
         ]
     })
 
+# -----------------------
+# Early-stop for degenerate generations
+# -----------------------
+
+class DegenerateGeneration(Exception):
+    """Raised when generation was aborted for echoing the prompt or looping"""
+
+class _DegenerationGuard:
+    """Stops generate() as soon as the output echoes the prompt template or starts looping.
+
+    A transformers stopping criterion (called with input_ids and scores); it is duck-typed
+    so this module doesn't import transformers.
+    """
+
+    def __init__(self, tokenizer, max_length):
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.start = None
+        self.reason = None
+        self.generated = 0
+
+    def _looping(self, tokens):
+        # Same token repeated, or a short phrase (period 2-8 tokens) repeated back to back
+        if len(tokens) >= 8 and len(set(tokens[-8:])) == 1:
+            return True
+        for period in range(2, 9):
+            span = period * LLM_EARLY_STOP_LOOP_REPEATS
+            if len(tokens) >= span:
+                tail = tokens[-span:]
+                if all(tail[i] == tail[i % period] for i in range(period, span)):
+                    return True
+        return False
+
+    def __call__(self, input_ids, scores, **kwargs):
+        if self.start is None:
+            self.start = input_ids.shape[-1] - 1  # First call comes after the first new token
+        tokens = input_ids[0, self.start:].tolist()
+        self.generated = len(tokens)
+
+        if self._looping(tokens):
+            self.reason = "repetition loop"
+        elif len(tokens) >= 24 and len(set(zip(tokens, tokens[1:], tokens[2:]))) / (len(tokens) - 2) < 0.3:
+            self.reason = "n-gram degeneration"
+        else:
+            recent = self.tokenizer.decode(tokens[-32:], skip_special_tokens=True)
+            if any(marker in recent for marker in LLM_ECHO_MARKERS):
+                self.reason = "template echo"
+        return self.reason is not None
+
+_early_stop_stats = {"aborted": 0, "tokens_generated": 0, "tokens_saved": 0, "reasons": {}}
+_generation_stats = {"count": 0, "prompt_chars": 0, "seconds": 0.0}
+_early_stop_lock = threading.Lock()
+
+def _generate_guarded(llm, prompt):
+    """llm.invoke with the degeneration guard in the generation loop (plain invoke for non-HF LLMs)"""
+    started = time.time()
+    try:
+        hf_pipeline = getattr(llm, 'pipeline', None)
+        if not LLM_EARLY_STOP or hf_pipeline is None or getattr(hf_pipeline, 'tokenizer', None) is None:
+            return llm.invoke(prompt)
+
+        from transformers import StoppingCriteriaList
+        max_length = getattr(hf_pipeline.model.generation_config, 'max_length', None) or 512
+        guard = _DegenerationGuard(hf_pipeline.tokenizer, max_length)
+        text = llm.invoke(prompt, pipeline_kwargs={"stopping_criteria": StoppingCriteriaList([guard])})
+        if guard.reason:
+            with _early_stop_lock:
+                _early_stop_stats["aborted"] += 1
+                _early_stop_stats["tokens_generated"] += guard.generated
+                _early_stop_stats["tokens_saved"] += max(0, max_length - guard.generated)
+                _early_stop_stats["reasons"][guard.reason] = _early_stop_stats["reasons"].get(guard.reason, 0) + 1
+            logger.info("Generation aborted after %s tokens (%s)", guard.generated, guard.reason,
+                        extra={"event": "early_stop", "tokens": guard.generated, "reason": guard.reason})
+            raise DegenerateGeneration(guard.reason)
+        return text
+    finally:
+        with _early_stop_lock:
+            _generation_stats["count"] += 1
+            _generation_stats["prompt_chars"] += len(prompt)
+            _generation_stats["seconds"] += time.time() - started
+
+# -----------------------
+# LLM admission control
+# -----------------------
+
+class LLMOverloaded(Exception):
+    """Raised when the generation queue is full or the wait for a slot timed out"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"LLM queue full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class _AdmissionController:
+    """Caps concurrent LLM generations and bounds how many requests may wait for a slot"""
+
+    def __init__(self, max_concurrent, max_queue, queue_timeout):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._in_flight = 0
+        self._avg_seconds = 5.0  # EWMA of generation time, used for Retry-After
+        self.admitted = 0
+        self.rejected = 0
+
+    def _retry_after(self):
+        backlog = (self._waiting + self._in_flight) / self.max_concurrent
+        return max(1, int(self._avg_seconds * max(backlog, 1) + 0.999))
+
+    def run(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.max_queue:
+                    self.rejected += 1
+                    raise LLMOverloaded(self._retry_after())
+                self._waiting += 1
+            try:
+                acquired = self._slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                with self._lock:
+                    self.rejected += 1
+                    raise LLMOverloaded(self._retry_after())
+
+        with self._lock:
+            self._in_flight += 1
+            self.admitted += 1
+        started = time.time()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.time() - started
+            with self._lock:
+                self._in_flight -= 1
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "avg_generation_seconds": round(self._avg_seconds, 2),
+            }
+
+_llm_admission = _AdmissionController(LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT)
+
+def _invoke_llm_admitted(llm, prompt):
+    """Guarded llm.invoke behind the admission controller.
+
+    Raises LLMOverloaded when saturated and DegenerateGeneration when the output degenerates.
+    """
+    if llm is None:
+        raise RuntimeError("No LLM could be loaded from the model pool")
+    return _llm_admission.run(_generate_guarded, llm, prompt)
+
+def _rag_sources(docs, limit=4):
+    """{source, page} of the chunks an answer was built from"""
+    sources = []
+    for doc in docs[:limit]:
+        meta = doc.metadata or {}
+        sources.append({"source": meta.get('source', 'Constitution PDF'), "page": meta.get('page', 'Unknown')})
+    return sources
+
+def _overload_response(user_question, docs, overload, **extra):
+    """Reply for a request that could not get an LLM slot: 503 or an extractive answer"""
+    if LLM_OVERLOAD_MODE == "reject":
+        logger.warning("LLM queue full, rejecting request (retry after %ss)", overload.retry_after,
+                       extra={"event": "llm_overload", "retry_after": overload.retry_after})
+        response = jsonify({
+            'success': False,
+            'error': "LawHub is busy right now. Please try again shortly.",
+            'retry_after': overload.retry_after
+        })
+        return response, 503, {'Retry-After': str(overload.retry_after)}
+
+    logger.warning("LLM queue full, answering extractively")
+    _note_answer_path("overload-extractive")
+    return _extractive_response(user_question, docs, "📚 Answered from your knowledge base (AI is busy)", **extra)
+
+def _early_stop_response(user_question, docs, stop, **extra):
+    """Reply after the degeneration guard stopped generation: the retrieved passages, extractively"""
+    # The guard already logged the stop with its details; this is the expected outcome, not a failure
+    logger.info("Answering extractively after early stop (%s)", stop)
+    _note_answer_path("early-stop")
+    return _extractive_response(user_question, docs, "📚 Answered from your knowledge base", **extra)
+
+def _extractive_response(user_question, docs, message, **extra):
+    legal_advice = _generate_answer_from_docs(user_question, docs, use_llm=False)
+    rag_sources = _rag_sources(docs)
+    return jsonify({
+        'success': True,
+        **extra,
+        'answer': legal_advice + ("\n\n📚 Sources: Constitution of India (pages: " + ", ".join([str(s.get('page','?')) for s in rag_sources if s.get('page') is not None]) + ")" if rag_sources else ""),
+        'sources': rag_sources,
+        'source': 'RAG: Constitution PDF',
+        'model': 'retrieval',
+        'message': message
+    })
+
+def _priority_response(user_question, rule_country=None, **extra):
+    """Rule-based answer for emergencies, returned without touching retrieval or the LLM queue"""
+    logger.info("Emergency question, answering from the priority lane")
+    return jsonify({
+        'success': True,
+        **extra,
+        'answer': get_legal_advice(user_question, "", rule_country),
+        'source': 'Rule-based system',
+        'model': 'rule-based',
+        'priority': True,
+        'message': "🚨 Emergency guidance provided"
+    })
+
+# -----------------------
+# Query normalization
+# -----------------------
+
+_VOCAB_FILE = "vocab.json"
+_CHUNK_STORE_DIR = "chunks"
+
+def _keyword_vocabulary():
+    """Words from the rule tables, which are always valid correction targets"""
+    texts = [" ".join(keywords) for _, keywords in LEGAL_ISSUE_KEYWORDS]
+    texts += list(COUNTRY_NAMES) + list(LLM_ROUTER.get("complex_keywords", ()))
+    return count_words(texts)
+
+_english_counts = None
+
+def _english_frequencies():
+    """General English word counts from SPELL_ENGLISH_FREQ_PATH (empty if the file isn't installed)"""
+    global _english_counts
+    if _english_counts is None:
+        try:
+            _english_counts = load_frequency_list(SPELL_ENGLISH_FREQ_PATH)
+        except OSError:
+            _english_counts = Counter()
+    return _english_counts
+
+def _build_spell_corrector(corpus_counts=None):
+    """Corrector over the corpus and English vocabularies, or None while neither is available.
+
+    The rule tables alone are no vocabulary: with nothing else to match, ordinary words
+    get rewritten into the nearest keyword ("rest" -> "rent").
+    """
+    corpus = {w: c for w, c in (corpus_counts or {}).items() if c >= SPELL_MIN_WORD_COUNT}
+    english = _english_frequencies()
+    if not corpus and not english:
+        return None
+    vocabulary = _keyword_vocabulary()
+    for word, _ in english.most_common(SPELL_ENGLISH_MAX_WORDS):
+        vocabulary[word] += 1  # Valid targets, but corpus words win ties
+    for word, count in corpus.items():
+        vocabulary[word] += count
+    return SpellCorrector(vocabulary, max_distance=SPELL_MAX_EDIT_DISTANCE,
+                          english=english, valid_word_ratio=SPELL_VALID_WORD_RATIO)
+
+def _write_vocabulary(path, chunks):
+    """Store the chunks' word counts next to the index they were built into"""
+    import json
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(count_words(d.page_content for d in chunks), f)
+
+def _corpus_vocabulary(vs):
+    """Word counts of the indexed chunks: the stored vocab.json, or counted from the Chroma store"""
+    import json
+    is_pinecone = _is_pinecone(vs)
+    path = PINECONE_VOCAB_PATH if is_pinecone else os.path.join(vs._persist_directory, _VOCAB_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    if is_pinecone:
+        return None  # Pinecone can't be enumerated; the vocabulary is written on the next upload
+    chunk_store = _open_chunk_store(vs)
+    if chunk_store is not None:
+        texts = (chunk_store.text(i) for i in range(len(chunk_store)))
+    else:
+        texts = vs._collection.get(include=["documents"])["documents"]
+    counts = count_words(texts)
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(counts, f)
+    except OSError:
+        pass
+    return counts
+
+# No correction until an index (or an English word list) supplies a vocabulary
+_spell_corrector = _build_spell_corrector() if SPELL_CORRECTION else None
+
+# -----------------------
+# Answer warehouse (precomputed answers)
+# -----------------------
+
+_warehouse = {"mtime": None, "data": None}
+_warehouse_lock = threading.Lock()
+
+def normalize_question(question):
+    """Normalized, typo-corrected form of a question used for cache keys, rules and retrieval"""
+    return normalize_query(question, _spell_corrector)
+
+def _warehouse_key(question, country=None):
+    return f"{(country or '').lower()}|{normalize_question(question)}"
+
+def _warehouse_tags():
+    """Index/model versions a precomputed answer is only valid for"""
+    return {
+        "index_version": _current_index_version(),
+        "llm_models": {name: spec["model_id"] for name, spec in LLM_MODELS.items()},
+        "embeddings_model": HUGGINGFACE_EMBEDDINGS_MODEL,
+    }
+
+def _load_warehouse():
+    """Load answers.json (and its memory-mapped embedding matrix) when it changes on disk"""
+    path = os.path.join(ANSWER_WAREHOUSE_DIR, "answers.json")
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _warehouse_lock:
+        if _warehouse["mtime"] == mtime:
+            return _warehouse["data"]
+        import json
+        with open(path, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+        entries = stored["entries"]
+        vectors = None
+        emb_file = stored["meta"].get("embeddings_file")
+        if emb_file and os.path.exists(os.path.join(ANSWER_WAREHOUSE_DIR, emb_file)):
+            vectors = np.load(os.path.join(ANSWER_WAREHOUSE_DIR, emb_file), mmap_mode='r')
+            if vectors.shape[0] != len(entries):
+                vectors = None
+        _warehouse["data"] = {
+            "meta": stored["meta"],
+            "entries": entries,
+            "keys": {e["key"]: i for i, e in enumerate(entries)},
+            "countries": np.array([(e.get("country") or '').lower() for e in entries]),
+            "vectors": vectors,
+        }
+        _warehouse["mtime"] = mtime
+        logger.info("Answer warehouse loaded: %s answers", len(entries))
+        return _warehouse["data"]
+
+def _question_vector(question):
+    """Query embedding of a question, or None if the embedding model is unavailable"""
+    try:
+        return np.asarray(_get_embeddings().embed_query(question), dtype=np.float32)
+    except Exception as e:
+        logger.warning("Question embedding failed: %s", e)
+        return None
+
+def _warehouse_lookup(question, country=None):
+    """Precomputed /api/ask response for a question, by exact key or by embedding similarity.
+
+    Returns (response or None, the question's embedding or None). The question is only
+    embedded when a warehouse is loaded and the exact key missed, so a server without a
+    warehouse never loads the embedding model on the request thread here.
+    """
+    if not ANSWER_WAREHOUSE_ENABLED:
+        return None, None
+    data = _load_warehouse()
+    if not data or not data["entries"]:
+        return None, None
+    if data["meta"].get("tags") != _warehouse_tags():
+        return None, None  # Built against another index/model version
+
+    index = data["keys"].get(_warehouse_key(question, country))
+    query_vec = None
+    if index is None and data["vectors"] is not None:
+        query_vec = _question_vector(question)
+        if query_vec is None:
+            return None, None
+        scores = np.asarray(data["vectors"] @ query_vec.astype(data["vectors"].dtype), dtype=np.float32)
+        scores[data["countries"] != (country or '').lower()] = -1.0
+        best = int(np.argmax(scores))
+        if scores[best] >= ANSWER_WAREHOUSE_MIN_SIMILARITY:
+            index = best
+    if index is None:
+        return None, query_vec
+    return dict(data["entries"][index]["response"], warehouse=True), query_vec
+
+# -----------------------
+# Conversation sessions
+# -----------------------
+
+_sessions = OrderedDict()  # session_id -> session, least recently used first
+_sessions_lock = threading.Lock()
+_session_stats = {"reranked": 0, "researched": 0, "fresh": 0}
+_FOLLOW_UP_STARTS = ("what about", "how about", "and ", "what if", "also", "then ", "same for", "but ")
+_FOLLOW_UP_PRONOUNS = {"it", "its", "that", "this", "they", "them", "those", "these", "he", "she", "such"}
+
+def _get_session(session_id):
+    """Fetch (or create) a session, expiring idle ones and evicting the least recently used"""
+    if not session_id:
+        return None
+    now = time.time()
+    cutoff = now - SESSION_TTL_MINUTES * 60
+    with _sessions_lock:
+        while _sessions:
+            oldest_id, oldest = next(iter(_sessions.items()))
+            if oldest["last_used"] >= cutoff:
+                break
+            del _sessions[oldest_id]
+        session = _sessions.get(session_id)
+        if session is None:
+            session = {"turns": [], "chunks": [], "vectors": {}, "last_used": now, "lock": threading.Lock()}
+            _sessions[session_id] = session
+            while len(_sessions) > SESSION_MAX_COUNT:
+                _sessions.popitem(last=False)
+        else:
+            _sessions.move_to_end(session_id)
+        session["last_used"] = now
+    return session
+
+def _chunk_key(doc):
+    return getattr(doc, 'id', None) or hashlib.sha1(doc.page_content.encode('utf-8')).hexdigest()[:16]
+
+def _looks_like_follow_up(question):
+    # Needs a continuation cue or a reference back; short but self-contained questions
+    # ("What is Article 21?") are new topics and must not reuse the previous retrieval
+    question_lower = question.lower().strip()
+    words = re.findall(r"[\w']+", question_lower)
+    return question_lower.startswith(_FOLLOW_UP_STARTS) or any(w in _FOLLOW_UP_PRONOUNS for w in words)
+
+def _remember_retrieval(session, question, docs):
+    # Caller holds session["lock"]; newest chunks first, capped per session
+    merged = [(_chunk_key(d), d) for d in docs]
+    seen = {key for key, _ in merged}
+    merged += [(key, d) for key, d in session["chunks"] if key not in seen]
+    session["chunks"] = merged[:SESSION_MAX_CHUNKS]
+    kept = {key for key, _ in session["chunks"]}
+    session["vectors"] = {k: v for k, v in session["vectors"].items() if k in kept}
+    session["turns"] = (session["turns"] + [question])[-SESSION_MAX_TURNS:]
+
+def _count_session_outcome(outcome):
+    # Sessions are locked one at a time; the shared counters need the registry lock
+    with _sessions_lock:
+        _session_stats[outcome] += 1
+
+def _retrieve(retriever, query, query_vec=None):
+    # Only the adaptive retriever can take a precomputed query embedding
+    if query_vec is not None and isinstance(retriever, _AdaptiveRetriever):
+        return retriever.get_relevant_documents(query, query_vec=query_vec)
+    return retriever.get_relevant_documents(query)
+
+def _retrieve_for_session(session, question, retriever, query_vec=None):
+    """Retrieve docs for a question, answering follow-ups from the session's cached chunks when confident.
+
+    query_vec, if given, is the embedding of question itself and is reused for a fresh search.
+    """
+    if session is None:
+        return _retrieve(retriever, question, query_vec)
+
+    with session["lock"]:
+        query = question
+        if session["chunks"] and session["turns"] and _looks_like_follow_up(question):
+            embeddings = _get_embeddings()
+            # Chunk embeddings are computed once per chunk, the first time a follow-up needs them
+            missing = [(key, d) for key, d in session["chunks"] if key not in session["vectors"]]
+            if missing:
+                vectors = embeddings.embed_documents([d.page_content for _, d in missing])
+                for (key, _), vec in zip(missing, vectors):
+                    session["vectors"][key] = np.asarray(vec, dtype=np.float32)
+
+            query = f"{session['turns'][-1]} {question}"
+            query_vec = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+            keys = [key for key, _ in session["chunks"]]
+            scores = np.stack([session["vectors"][k] for k in keys]) @ query_vec
+            order = np.argsort(-scores)
+            if scores[order[0]] >= SESSION_RERANK_MIN_SCORE:
+                docs = [session["chunks"][i][1] for i in order[:6]]
+                session["turns"] = (session["turns"] + [question])[-SESSION_MAX_TURNS:]
+                _count_session_outcome("reranked")
+                logger.debug("Follow-up answered from session chunks (score %.2f)", scores[order[0]])
+                return docs
+            # Low confidence: search again, with the previous question as context
+            _count_session_outcome("researched")
+        else:
+            _count_session_outcome("fresh")
+
+        docs = _retrieve(retriever, query, query_vec if query == question else None)
+        _remember_retrieval(session, question, docs)
+        return docs
+
 # -----------------------
 # RAG: Constitution Chat
 # -----------------------
@@ -723,24 +1465,61 @@ def status():
 _rag_vs = None
 _rag_retriever = None
 _rag_chain = None
-_llm = None
+_embeddings = None
+_embeddings_lock = threading.Lock()
+_rag_lock = threading.Lock()  # Serializes index loads/swaps; readers never take it
 
-def _initialize_llm():
-    """Initialize the local LLM for generating step-based responses"""
-    global _llm
-    if _llm is not None:
-        return _llm
-    
+# Versioned Chroma builds: RAG_PERSIST_DIR/versions/<version>, with CURRENT naming the live one
+_RAG_VERSIONS_DIR = os.path.join(RAG_PERSIST_DIR, "versions")
+_RAG_CURRENT_FILE = os.path.join(RAG_PERSIST_DIR, "CURRENT")
+
+_index_jobs = {}
+_index_jobs_lock = threading.Lock()
+
+def _is_pinecone(vs):
+    """Whether a vector store is the Pinecone one (everything else here is a Chroma version)"""
+    return isinstance(vs, Pinecone)
+
+_DEVANAGARI_RE = re.compile('[\u0900-\u097F]')
+_LATIN_RE = re.compile('[A-Za-z]')
+
+def _load_llm(model_id, task=None, load_mode=None):
+    """Load a local model into a LangChain HuggingFacePipeline (None if loading fails)
+
+    load_mode is "fp32" (default weights), "bf16" (bfloat16 weights) or "int8"
+    (dynamic int8 quantization of the Linear layers, CPU only).
+    """
+    load_mode = load_mode or LLM_LOAD_MODE
     try:
-        print(f"🤖 Initializing LLM: {LOCAL_LLM_ID}")
-        
+        logger.info("Initializing LLM: %s (%s)", model_id, load_mode)
+        from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, pipeline
+
         # Use different model types based on the model ID
-        if "gpt-neox" in LOCAL_LLM_ID.lower():
+        if task is None:
+            task = "text-generation" if "gpt-neox" in model_id.lower() else "text2text-generation"
+
+        # Stream weights in instead of materialising a second full copy in RAM
+        model_kwargs = {"low_cpu_mem_usage": LLM_LOW_CPU_MEM_USAGE}
+        if load_mode == "bf16":
+            import torch
+            model_kwargs["torch_dtype"] = torch.bfloat16
+
+        if task == "text-generation":
             # GPT-NeoX is a text generation model, not text2text
             from transformers import AutoModelForCausalLM
-            tokenizer = AutoTokenizer.from_pretrained(LOCAL_LLM_ID)
-            model = AutoModelForCausalLM.from_pretrained(LOCAL_LLM_ID)
-            
+            tokenizer = AutoTokenizer.from_pretrained(model_id)
+            model = AutoModelForCausalLM.from_pretrained(model_id, **model_kwargs)
+        else:
+            # Default to text2text for other models
+            tokenizer = AutoTokenizer.from_pretrained(model_id)
+            model = AutoModelForSeq2SeqLM.from_pretrained(model_id, **model_kwargs)
+
+        if load_mode == "int8":
+            import torch
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        model.eval()
+
+        if task == "text-generation":
             pipe = pipeline(
                 "text-generation",
                 model=model,
@@ -752,10 +1531,6 @@ def _initialize_llm():
                 pad_token_id=tokenizer.eos_token_id
             )
         else:
-            # Default to text2text for other models
-            tokenizer = AutoTokenizer.from_pretrained(LOCAL_LLM_ID)
-            model = AutoModelForSeq2SeqLM.from_pretrained(LOCAL_LLM_ID)
-            
             pipe = pipeline(
                 "text2text-generation",
                 model=model,
@@ -766,150 +1541,544 @@ def _initialize_llm():
                 device="cpu"
             )
         
-        _llm = HuggingFacePipeline(pipeline=pipe)
-        print("✅ LLM initialized successfully")
-        return _llm
+        llm = HuggingFacePipeline(pipeline=pipe)
+        logger.info("LLM initialized successfully: %s", model_id)
+        return llm
     except Exception as e:
-        print(f"❌ LLM initialization failed: {e}")
+        logger.error("LLM initialization failed (%s): %s", model_id, e)
         return None
 
-def preload_rag_pipeline():
-    """Preload the RAG pipeline when server starts"""
-    print("🚀 Preloading RAG pipeline...")
+def _llm_ram_mb(llm):
+    """Size of a loaded pipeline's weights in MB, from its state_dict (None if it can't be measured).
+
+    parameters() misses the packed weights of dynamically quantized int8 Linear layers;
+    the state_dict holds them (as tuples of tensors), so it is counted instead.
+    """
+    import torch
+    seen = set()
+
+    def tensor_bytes(value):
+        if isinstance(value, (tuple, list)):
+            return sum(tensor_bytes(v) for v in value)
+        if not isinstance(value, torch.Tensor):
+            return 0
+        try:
+            key = (value.untyped_storage().data_ptr(), value.storage_offset())
+        except Exception:
+            key = id(value)
+        if key in seen:  # Tied weights are shared, count them once
+            return 0
+        seen.add(key)
+        return value.numel() * value.element_size()
+
     try:
-        success = _ensure_rag_pipeline_ready()
-        if success:
-            print("✅ RAG pipeline preloaded successfully!")
-        else:
-            print("❌ RAG pipeline preloading failed")
-        return success
-    except Exception as e:
-        print(f"❌ RAG preload error: {e}")
-        return False
+        state = llm.pipeline.model.state_dict()
+        return sum(tensor_bytes(v) for v in state.values()) / (1024 * 1024)
+    except Exception:
+        return None
+
+class _ModelPool:
+    """Registered LLMs loaded on first use; least recently used ones are evicted to stay under a RAM budget"""
+
+    def __init__(self, budget_mb, idle_unload_seconds=0, retry_seconds=300):
+        self.budget_mb = budget_mb
+        self.idle_unload_seconds = idle_unload_seconds
+        self.retry_seconds = retry_seconds
+        self._specs = {}
+        self._loaded = OrderedDict()  # name -> (llm, ram_mb), least recently used first
+        self._last_used = {}
+        self._reaper = None
+        self._failed = {}  # name -> time after which loading is tried again
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.loads = 0
+        self.evictions = 0
+        self.idle_unloads = 0
+
+    def register(self, name, model_id, est_ram_mb, task=None, load_mode=None):
+        with self._lock:
+            self._specs[name] = {"model_id": model_id, "est_ram_mb": est_ram_mb, "task": task, "load_mode": load_mode}
+            self._failed.pop(name, None)
+
+    def has(self, name):
+        return name in self._specs
+
+    def _evict_for(self, needed_mb, keep=None):
+        # Caller holds self._lock; returns how many models were dropped
+        used = sum(ram for _, ram in self._loaded.values())
+        evicted = 0
+        for name in list(self._loaded):
+            if used + needed_mb <= self.budget_mb:
+                break
+            if name == keep:
+                continue
+            _, ram = self._loaded.pop(name)
+            used -= ram
+            evicted += 1
+            self.evictions += 1
+            logger.info("Evicted LLM '%s' from the model pool (%.0f MB)", name, ram)
+        return evicted
+
+    def unload_idle(self):
+        """Drop models that have not served a request for idle_unload_seconds"""
+        if not self.idle_unload_seconds:
+            return []
+        now = time.time()
+        with self._lock:
+            idle = [name for name in self._loaded
+                    if now - self._last_used.get(name, now) >= self.idle_unload_seconds]
+            for name in idle:
+                self._loaded.pop(name)
+                self.idle_unloads += 1
+        if idle:
+            gc.collect()
+            logger.info("Unloaded idle LLMs: %s", ', '.join(idle))
+        return idle
+
+    def _reap_forever(self):
+        while True:
+            time.sleep(max(5, min(60, self.idle_unload_seconds / 4)))
+            self.unload_idle()
+
+    def _ensure_reaper(self):
+        # Caller holds self._lock
+        if self.idle_unload_seconds and self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_forever, name="llm-idle-reaper", daemon=True)
+            self._reaper.start()
+
+    def get(self, name):
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                self._last_used[name] = time.time()
+                return self._loaded[name][0]
+            spec = self._specs.get(name)
+            if spec is None or time.time() < self._failed.get(name, 0):
+                return None
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                if name in self._loaded:
+                    self._loaded.move_to_end(name)
+                    self._last_used[name] = time.time()
+                    return self._loaded[name][0]
+                if spec["est_ram_mb"] > self.budget_mb:
+                    logger.warning("LLM '%s' (~%s MB) does not fit the %s MB pool budget", name, spec['est_ram_mb'], self.budget_mb)
+                    return None
+                evicted = self._evict_for(spec["est_ram_mb"])
+            if evicted:
+                gc.collect()
+
+            llm = _load_llm(spec["model_id"], spec["task"], spec["load_mode"])
+            with self._lock:
+                if llm is None:
+                    self._failed[name] = time.time() + self.retry_seconds
+                    return None
+                self._failed.pop(name, None)
+                ram = _llm_ram_mb(llm) or spec["est_ram_mb"]
+                self._loaded[name] = (llm, ram)
+                self._last_used[name] = time.time()
+                self.loads += 1
+                self._ensure_reaper()
+                # Re-check with the measured size, never evicting the model we just loaded
+                evicted = self._evict_for(0, keep=name)
+            if evicted:
+                gc.collect()
+            return llm
+
+    def stats(self):
+        with self._lock:
+            return {
+                "budget_mb": self.budget_mb,
+                "used_mb": round(sum(ram for _, ram in self._loaded.values()), 1),
+                "loaded": list(self._loaded),
+                "registered": list(self._specs),
+                "retry_pending": [name for name, at in self._failed.items() if at > time.time()],
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "idle_unloads": self.idle_unloads,
+                "idle_unload_seconds": self.idle_unload_seconds,
+            }
+
+_model_pool = _ModelPool(LLM_POOL_RAM_BUDGET_MB, LLM_IDLE_UNLOAD_MINUTES * 60, LLM_LOAD_RETRY_SECONDS)
+for _name, _spec in LLM_MODELS.items():
+    _model_pool.register(_name, _spec["model_id"], _spec.get("est_ram_mb", 0),
+                         _spec.get("task"), _spec.get("load_mode"))
+_route_counts = Counter()  # model name -> questions routed to it
+_route_counts_lock = threading.Lock()
+
+def _pick_llm_name(question, context=""):
+    """Route long or complex questions to the large model, everything else to the default"""
+    large = LLM_ROUTER.get("complex_model")
+    if not large or not _model_pool.has(large):
+        return LLM_DEFAULT_MODEL
+    question_lower = question.lower()
+    is_complex = (
+        len(question.split()) >= LLM_ROUTER.get("min_question_words", 30)
+        or len(context) >= LLM_ROUTER.get("min_context_chars", 4000)
+        or any(k in question_lower for k in LLM_ROUTER.get("complex_keywords", ()))
+    )
+    return large if is_complex else LLM_DEFAULT_MODEL
+
+def _route_llm(question, context=""):
+    """Pick and load the LLM for a question, falling back to the default model"""
+    name = _pick_llm_name(question, context)
+    llm = _model_pool.get(name)
+    if llm is None and name != LLM_DEFAULT_MODEL:
+        name = LLM_DEFAULT_MODEL
+        llm = _model_pool.get(name)
+    with _route_counts_lock:
+        _route_counts[name] += 1
+    return llm
+
+def _initialize_llm():
+    """Initialize the default local LLM for generating step-based responses"""
+    return _model_pool.get(LLM_DEFAULT_MODEL)
+
+def preload_rag_pipeline(wait=True):
+    """Load/build the RAG pipeline through the background index job system.
 
-def _ensure_rag_pipeline_ready():
-    global _rag_vs, _rag_retriever, _rag_chain
+    With wait, block until the job finishes and return whether the pipeline is ready;
+    otherwise return as soon as the job has started (requests skip RAG until it is done).
+    """
     if _rag_chain is not None:
-        print("✅ RAG pipeline already ready")
         return True
-    try:
-        print("🔄 Initializing RAG pipeline...")
-        # Validate prerequisites
-        if not os.path.exists(COI_PDF_PATH):
-            raise FileNotFoundError(f"PDF not found at path: {COI_PDF_PATH}")
+    logger.info("Preloading RAG pipeline...")
+    job, _ = start_index_job("build")
+    if not wait:
+        return False
+    while True:
+        current = get_index_job(job["id"])
+        if current is None or current["status"] not in ("queued", "running"):
+            break
+        time.sleep(0.5)
+    success = _rag_chain is not None
+    if success:
+        logger.info("RAG pipeline preloaded successfully!")
+    else:
+        logger.error("RAG pipeline preloading failed")
+    return success
 
-        print(f"📄 PDF found at: {COI_PDF_PATH}")
-        
-        # Build or load vector store
-        print("🔧 Loading embeddings model...")
+def _get_embeddings():
+    """Load the sentence-transformer embeddings once and share them across index builds.
+
+    With EMBEDDINGS_MICRO_BATCH, concurrent embed_query calls (retrieval, warehouse lookups,
+    session reranking) are coalesced into batched encodes.
+    """
+    global _embeddings
+    if _embeddings is not None:
+        return _embeddings
+    with _embeddings_lock:
+        if _embeddings is None:
+            model = _load_embeddings_model()
+            if EMBEDDINGS_MICRO_BATCH:
+                model = BatchingEmbeddings(model, EMBEDDINGS_BATCH_MAX, EMBEDDINGS_BATCH_WAIT_MS)
+            _embeddings = model
+    return _embeddings
+
+def _load_embeddings_model():
+    if EMBEDDINGS_BACKEND == "onnx":
+        logger.info("Loading ONNX Runtime embeddings...")
+        from onnx_embeddings import load_embeddings
+        model, onnx_error = load_embeddings(_load_torch_embeddings, variant=EMBEDDINGS_ONNX_VARIANT,
+                                            threads=EMBEDDINGS_ONNX_THREADS,
+                                            min_cosine=EMBEDDINGS_PARITY_MIN_COSINE)
+        if onnx_error is None:
+            logger.info("ONNX %s embeddings loaded", EMBEDDINGS_ONNX_VARIANT)
+        else:
+            logger.warning("ONNX embeddings unavailable, used torch: %s", onnx_error)
+        return model
+    return _load_torch_embeddings()
+
+def _load_torch_embeddings():
+    logger.info("Loading embeddings model...")
+    try:
+        model = HuggingFaceEmbeddings(
+            model_name=HUGGINGFACE_EMBEDDINGS_MODEL,
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={'normalize_embeddings': True}
+        )
+        logger.info("Embeddings model loaded")
+    except Exception as emb_error:
+        logger.error("Embeddings model error: %s", emb_error)
+        # Try alternative approach
         try:
-            embeddings = HuggingFaceEmbeddings(
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(HUGGINGFACE_EMBEDDINGS_MODEL)
+            model = HuggingFaceEmbeddings(
                 model_name=HUGGINGFACE_EMBEDDINGS_MODEL,
                 model_kwargs={'device': 'cpu'},
                 encode_kwargs={'normalize_embeddings': True}
             )
-            print("✅ Embeddings model loaded")
-        except Exception as emb_error:
-            print(f"❌ Embeddings model error: {emb_error}")
-            # Try alternative approach
-            try:
-                from sentence_transformers import SentenceTransformer
-                model = SentenceTransformer(HUGGINGFACE_EMBEDDINGS_MODEL)
-                embeddings = HuggingFaceEmbeddings(
-                    model_name=HUGGINGFACE_EMBEDDINGS_MODEL,
-                    model_kwargs={'device': 'cpu'},
-                    encode_kwargs={'normalize_embeddings': True}
-                )
-                print("✅ Embeddings model loaded via alternative method")
-            except Exception as alt_error:
-                print(f"❌ Alternative embeddings method failed: {alt_error}")
-                raise emb_error
-
-        # Check if Pinecone is configured and use it if available
-        use_pinecone = PINECONE_API_KEY and PINECONE_ENVIRONMENT and PINECONE_INDEX_NAME
-        
-        if use_pinecone:
-            print("🌲 Using Pinecone vector store...")
-            try:
-                import pinecone
-                pinecone.init(api_key=PINECONE_API_KEY, environment=PINECONE_ENVIRONMENT)
-                
-                # Check if index exists, create if not
-                if PINECONE_INDEX_NAME not in pinecone.list_indexes():
-                    print(f"🔨 Creating Pinecone index: {PINECONE_INDEX_NAME}")
-                    pinecone.create_index(
-                        name=PINECONE_INDEX_NAME,
-                        dimension=384,  # Dimension for all-MiniLM-L6-v2
-                        metric="cosine"
-                    )
-                
-                # Load existing index or create new one
-                _rag_vs = Pinecone.from_existing_index(
-                    index_name=PINECONE_INDEX_NAME,
-                    embedding=embeddings
-                )
-                print("✅ Pinecone vector store loaded")
-                
-                # Check if index is empty and upload data if needed
-                index_stats = pinecone.describe_index(PINECONE_INDEX_NAME)
-                if index_stats.total_vector_count == 0:
-                    print("📤 Uploading PDF data to Pinecone...")
-                    loader = PyPDFLoader(COI_PDF_PATH)
-                    pages = loader.load()
-                    print(f"📄 Loaded {len(pages)} pages from PDF")
-
-                    splitter = RecursiveCharacterTextSplitter(chunk_size=1200, chunk_overlap=200)
-                    chunks: List[Document] = splitter.split_documents(pages)
-                    print(f"✂️ Split into {len(chunks)} chunks")
-
-                    _rag_vs = Pinecone.from_documents(chunks, embeddings, index_name=PINECONE_INDEX_NAME)
-                    print("✅ PDF data uploaded to Pinecone")
-                else:
-                    print(f"✅ Pinecone index contains {index_stats.total_vector_count} vectors")
-                
-            except Exception as pinecone_error:
-                print(f"❌ Pinecone error: {pinecone_error}")
-                print("🔄 Falling back to Chroma...")
-                use_pinecone = False
-        
-        if not use_pinecone:
-            # Use Chroma as fallback
-            print("📚 Using Chroma vector store...")
-            os.makedirs(RAG_PERSIST_DIR, exist_ok=True)
-            print(f"📁 RAG persist directory: {RAG_PERSIST_DIR}")
-            
-            if os.listdir(RAG_PERSIST_DIR):
-                print("📚 Loading existing Chroma vector store...")
-                _rag_vs = Chroma(persist_directory=RAG_PERSIST_DIR, embedding_function=embeddings)
-                print("✅ Existing Chroma vector store loaded")
-            else:
-                print("📚 Building new Chroma vector store from PDF...")
-                loader = PyPDFLoader(COI_PDF_PATH)
-                pages = loader.load()
-                print(f"📄 Loaded {len(pages)} pages from PDF")
+            logger.info("Embeddings model loaded via alternative method")
+        except Exception as alt_error:
+            logger.error("Alternative embeddings method failed: %s", alt_error)
+            raise emb_error
+    return model
+
+def detect_language(text):
+    """'hi' if the text is mostly Devanagari, else 'en' (script-based, no model involved)"""
+    devanagari = len(_DEVANAGARI_RE.findall(text))
+    if not devanagari:
+        return "en"
+    latin = len(_LATIN_RE.findall(text))
+    return "hi" if devanagari >= latin else "en"
+
+def _split_page_by_language(page):
+    """Split one bilingual PDF page into an English and a Hindi document, tagged with 'lang'"""
+    segments = {"en": [], "hi": []}
+    for line in page.page_content.splitlines():
+        if line.strip():
+            segments[detect_language(line)].append(line)
+    return [
+        Document(page_content="\n".join(lines), metadata={**(page.metadata or {}), "lang": lang})
+        for lang, lines in segments.items() if lines
+    ]
+
+def _load_pdf_chunks():
+    """Load the Constitution PDF and split it into retrieval chunks"""
+    loader = PyPDFLoader(COI_PDF_PATH)
+    pages = loader.load()
+    logger.info("Loaded %s pages from PDF", len(pages))
+
+    if RAG_LANGUAGE_SPLIT:
+        # Hindi and English text go into separate, language-tagged chunks
+        pages = [segment for page in pages for segment in _split_page_by_language(page)]
+        logger.info("Split pages into %s language segments", len(pages))
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1200, chunk_overlap=200)
+    chunks: List[Document] = splitter.split_documents(pages)
+    logger.info("Split into %s chunks", len(chunks))
+    return chunks
+
+def _current_index_version():
+    """Name of the live Chroma index version, or None if no versioned build exists yet"""
+    try:
+        with open(_RAG_CURRENT_FILE, 'r', encoding='utf-8') as f:
+            version = f.read().strip()
+    except OSError:
+        return None
+    if version and os.path.isdir(os.path.join(_RAG_VERSIONS_DIR, version)):
+        return version
+    return None
+
+def _set_current_index_version(version):
+    """Atomically point CURRENT at a finished index version"""
+    tmp_path = f"{_RAG_CURRENT_FILE}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, _RAG_CURRENT_FILE)
+
+def _live_chroma_dir():
+    """Directory of the Chroma store to serve from, or None if one must be built"""
+    version = _current_index_version()
+    if version:
+        return os.path.join(_RAG_VERSIONS_DIR, version)
+    # Stores built before versioning live directly in RAG_PERSIST_DIR
+    legacy_entries = [e for e in os.listdir(RAG_PERSIST_DIR)
+                      if e not in ("versions", os.path.basename(_RAG_CURRENT_FILE), _VOCAB_FILE) and not e.endswith(".tmp")]
+    if legacy_entries:
+        return RAG_PERSIST_DIR
+    return None
+
+def _build_index_version(embeddings, job=None):
+    """Build a fresh Chroma store in its own version directory; the live index is untouched"""
+    version = f"v{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    version_dir = os.path.join(_RAG_VERSIONS_DIR, version)
+    os.makedirs(version_dir, exist_ok=True)
+    logger.info("Building Chroma index version %s...", version)
+    try:
+        _update_index_job(job, stage="loading_pdf")
+        chunks = _load_pdf_chunks()
+
+        _update_index_job(job, stage="embedding", processed=0, total=len(chunks))
+        vs = Chroma(persist_directory=version_dir, embedding_function=embeddings)
+        vectors = []
+        for start in range(0, len(chunks), RAG_BUILD_BATCH_SIZE):
+            batch = chunks[start:start + RAG_BUILD_BATCH_SIZE]
+            batch_vectors = embeddings.embed_documents([d.page_content for d in batch])
+            # Chroma keeps ids (= chunk store ids), vectors and metadata; the text lives in the chunk store
+            vs._collection.upsert(ids=[str(start + i) for i in range(len(batch))], embeddings=batch_vectors,
+                                  metadatas=[dict(d.metadata or {}) for d in batch])
+            vectors.extend(batch_vectors)
+            _update_index_job(job, processed=start + len(batch))
+        vs.persist()
+        dimension = None if chunks else len(embeddings.embed_query("dimension"))
+        build_chunk_store(os.path.join(version_dir, _CHUNK_STORE_DIR), chunks, vectors, dimension=dimension)
+        _write_vocabulary(os.path.join(version_dir, _VOCAB_FILE), chunks)
+        logger.info("Chroma index version %s built and persisted", version)
+        return version, vs
+    except Exception:
+        shutil.rmtree(version_dir, ignore_errors=True)
+        raise
+
+class _AdaptiveRetriever:
+    """Retriever that cuts the result list by score and de-duplicates it with MMR.
+
+    Candidates come back from the store together with their stored embeddings, so scoring
+    and MMR cost one query embedding plus a small matrix product. The list ends at
+    RAG_MIN_SCORE or at the first drop of RAG_SCORE_GAP between consecutive hits, so a
+    confident single-article match yields one chunk instead of RAG_TOP_K.
+    """
 
-                splitter = RecursiveCharacterTextSplitter(chunk_size=1200, chunk_overlap=200)
-                chunks: List[Document] = splitter.split_documents(pages)
-                print(f"✂️ Split into {len(chunks)} chunks")
+    def __init__(self, vs, embeddings, search_filter=None, chunk_store=None, adaptive=True):
+        self.vs = vs
+        self.embeddings = embeddings
+        self.search_filter = search_filter
+        self.chunk_store = chunk_store
+        self.adaptive = adaptive
+
+    def _candidates(self, query_vec):
+        """Nearest RAG_FETCH_K chunks as (embedding matrix, function returning candidate i's Document)"""
+        store = self.chunk_store
+        if store is not None:
+            # Chroma only supplies ids; vectors, text and metadata come from the memory-mapped store.
+            # The language filter runs on the store's lang column rather than Chroma's metadata
+            # where-clause: Chroma is over-fetched unfiltered, and a partition too small to fill
+            # RAG_FETCH_K from that is scanned directly.
+            lang = (self.search_filter or {}).get("lang")
+            result = self.vs._collection.query(query_embeddings=[query_vec.tolist()],
+                                               n_results=RAG_FETCH_K * RAG_LANG_OVERFETCH if lang else RAG_FETCH_K,
+                                               include=["distances"])
+            ids = np.asarray([int(i) for i in result["ids"][0]], dtype=np.int64)
+            if lang:
+                ids = ids[store.records["lang"][ids] == lang.encode('ascii')][:RAG_FETCH_K]
+                if len(ids) < RAG_FETCH_K:
+                    ids = store.nearest(query_vec, RAG_FETCH_K, lang)
+            vectors = np.asarray(store.vectors[ids], dtype=np.float32).reshape(len(ids), -1)
+            return vectors, lambda i: Document(page_content=store.text(ids[i]), metadata=store.metadata(ids[i]))
+
+        if _is_pinecone(self.vs):
+            result = self.vs._index.query(vector=query_vec.tolist(), top_k=RAG_FETCH_K, filter=self.search_filter,
+                                          include_values=True, include_metadata=True,
+                                          namespace=getattr(self.vs, '_namespace', None))
+            docs, vectors = [], []
+            for match in result["matches"]:
+                metadata = dict(match.get("metadata") or {})
+                text = metadata.pop(getattr(self.vs, '_text_key', 'text'), "")
+                docs.append(Document(page_content=text, metadata=metadata))
+                vectors.append(match["values"])
+        else:
+            result = self.vs._collection.query(query_embeddings=[query_vec.tolist()], n_results=RAG_FETCH_K,
+                                               where=self.search_filter,
+                                               include=["documents", "metadatas", "embeddings"])
+            docs = [Document(page_content=text, metadata=dict(meta or {}))
+                    for text, meta in zip(result["documents"][0], result["metadatas"][0])]
+            vectors = result["embeddings"][0]
+        return np.asarray(vectors, dtype=np.float32).reshape(len(docs), -1), docs.__getitem__
+
+    def get_relevant_documents(self, query, query_vec=None):
+        if query_vec is None:
+            query_vec = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        vectors, fetch = self._candidates(query_vec)
+        if not len(vectors):
+            return []
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        scores = vectors @ (query_vec / max(float(np.linalg.norm(query_vec)), 1e-12))
+        order = np.argsort(-scores)
+        if not self.adaptive:
+            return [self._scored(fetch(int(i)), scores[i]) for i in order[:RAG_TOP_K]]
+
+        # Score cut: the best hit always stays; stop below the floor or at the first big drop
+        keep = [int(order[0])]
+        for prev, idx in zip(order, order[1:]):
+            if scores[idx] < RAG_MIN_SCORE or scores[prev] - scores[idx] >= RAG_SCORE_GAP:
+                break
+            keep.append(int(idx))
 
-                _rag_vs = Chroma.from_documents(chunks, embeddings, persist_directory=RAG_PERSIST_DIR)
-                _rag_vs.persist()
-                print("✅ New Chroma vector store built and persisted")
+        # MMR over the survivors; near-duplicates of an already chosen chunk are dropped
+        selected = []
+        while keep and len(selected) < RAG_TOP_K:
+            if selected:
+                redundancy = (vectors[keep] @ vectors[selected].T).max(axis=1)
+            else:
+                redundancy = np.zeros(len(keep), dtype=np.float32)
+            best = int(np.argmax(RAG_MMR_LAMBDA * scores[keep] - (1 - RAG_MMR_LAMBDA) * redundancy))
+            idx = keep.pop(best)
+            if redundancy[best] < RAG_DUPLICATE_SIM:
+                selected.append(idx)
+
+        with _retrieval_stats_lock:
+            _retrieval_stats["queries"] += 1
+            _retrieval_stats["candidates"] += len(vectors)
+            _retrieval_stats["returned"] += len(selected)
+        return [self._scored(fetch(i), scores[i]) for i in selected]
+
+    @staticmethod
+    def _scored(doc, score):
+        doc.metadata["score"] = round(float(score), 4)
+        return doc
+
+    def invoke(self, query, config=None):
+        return self.get_relevant_documents(query)
+
+_retrieval_stats = {"queries": 0, "candidates": 0, "returned": 0}
+_retrieval_stats_lock = threading.Lock()
+
+_chunk_stores = {}  # store directory -> ChunkStore, opened once per process, closed when its version is deleted
+
+def _open_chunk_store(vs):
+    """Memory-mapped chunk store of a Chroma index version, or None (Pinecone, older builds)"""
+    persist_dir = getattr(vs, '_persist_directory', None)
+    if _is_pinecone(vs) or not persist_dir:
+        return None
+    path = os.path.join(persist_dir, _CHUNK_STORE_DIR)
+    if path not in _chunk_stores:
+        _chunk_stores[path] = ChunkStore(path) if ChunkStore.exists(path) else None
+    return _chunk_stores[path]
+
+def _close_chunk_store(persist_dir):
+    """Evict and unmap the chunk store of an index version (it must no longer be live)"""
+    store = _chunk_stores.pop(os.path.join(persist_dir, _CHUNK_STORE_DIR), None)
+    if store is not None:
+        store.close()
+
+def _make_retriever(vs, search_filter=None):
+    chunk_store = _open_chunk_store(vs)
+    if RAG_ADAPTIVE_RETRIEVAL or chunk_store is not None:
+        # Indexes with a chunk store keep no text in Chroma, so they always go through this retriever
+        return _AdaptiveRetriever(vs, _get_embeddings(), search_filter, chunk_store, adaptive=RAG_ADAPTIVE_RETRIEVAL)
+    search_kwargs = {"k": RAG_TOP_K}
+    if search_filter:
+        search_kwargs["filter"] = search_filter
+    return vs.as_retriever(search_kwargs=search_kwargs)
+
+def _install_rag_chain(vs):
+    """Wire a vector store into a retriever and RAG chain and publish it for requests"""
+    global _rag_vs, _rag_retriever, _rag_chain, _spell_corrector
+    corrector = _spell_corrector
+    if SPELL_CORRECTION:
+        try:
+            corrector = _build_spell_corrector(_corpus_vocabulary(vs))
+            if corrector is not None:
+                logger.info("Spelling vocabulary: %s words", len(corrector))
+        except Exception as e:
+            logger.warning("Corpus spelling vocabulary unavailable: %s", e)
+    retrievers = None
+    if _index_has_language_partitions(vs):
+        retrievers = {lang: _make_retriever(vs, {"lang": lang}) for lang in ("en", "hi")}
+        retriever = retrievers["en"]
+        logger.debug("Language-partitioned retrievers configured (en, hi)")
+    else:
+        retriever = _make_retriever(vs)
+        logger.debug("Retriever configured")
 
-        _rag_retriever = _rag_vs.as_retriever(search_kwargs={"k": 6})  # Increased k for better retrieval
-        print("🔍 Retriever configured")
+    # Create a proper LLM-based retrieval system
+    logger.info("Setting up LLM-based retrieval system...")
 
-        # Create a proper LLM-based retrieval system
-        print("🤖 Setting up LLM-based retrieval system...")
-        
-        # Initialize LLM for answer generation
-        llm = _initialize_llm()
-        
-        if llm is not None:
-            # Create a proper RAG chain with LLM
-            prompt_template = PromptTemplate(
-                input_variables=["context", "question"],
-                template="""You are a professional legal assistant. Based on the provided constitutional context, provide a clear, step-by-step answer to the user's legal question.
+    # Initialize LLM for answer generation
+    # Only check that the default model loads: requests resolve it through the pool every time,
+    # so the chain holds no reference that would keep an evicted or idle-unloaded model alive
+    llm_available = _initialize_llm() is not None
+
+    if llm_available:
+        # Create a proper RAG chain with LLM
+        prompt_template = PromptTemplate(
+            input_variables=["context", "question"],
+            template="""You are a professional legal assistant. Based on the provided constitutional context, provide a clear, step-by-step answer to the user's legal question.
 
 Context from Constitution of India:
 {context}
@@ -927,29 +2096,317 @@ Provide a structured response with:
 Format with clear step numbers, emojis, and practical advice. Be specific and actionable based on the constitutional context.
 
 Answer:"""
-            )
-            
-            _rag_chain = {
-                "retriever": _rag_retriever,
-                "llm": llm,
-                "prompt_template": prompt_template,
-                "type": "llm_retrieval"
-            }
-            print("✅ LLM-based RAG chain created successfully!")
-        else:
-            # Fallback to simple retrieval if LLM fails
-            _rag_chain = {
-                "retriever": _rag_retriever,
-                "type": "simple_retrieval"
-            }
-            print("⚠️ Using simple retrieval (LLM not available)")
-        print("✅ RAG chain created successfully!")
+        )
+
+        chain = {
+            "retriever": retriever,
+            "retrievers": retrievers,
+            "llm_name": LLM_DEFAULT_MODEL,
+            "prompt_template": prompt_template,
+            "type": "llm_retrieval"
+        }
+        logger.info("LLM-based RAG chain created successfully!")
+    else:
+        # Fallback to simple retrieval if LLM fails
+        chain = {
+            "retriever": retriever,
+            "retrievers": retrievers,
+            "type": "simple_retrieval"
+        }
+        logger.warning("Using simple retrieval (LLM not available)")
+
+    persist_dir = getattr(vs, '_persist_directory', None)
+    if persist_dir and not _is_pinecone(vs):
+        _chroma_clients[os.path.normpath(persist_dir)] = vs
+
+    # Publish the chain last: requests only read _rag_chain, so the swap is a single reference assignment
+    _rag_vs = vs
+    _rag_retriever = retriever
+    _rag_chain = chain
+    _spell_corrector = corrector
+
+def _index_has_language_partitions(vs):
+    """Whether the store's chunks carry 'lang' metadata (indexes built before the split don't)"""
+    if not RAG_LANGUAGE_SPLIT:
+        return False
+    try:
+        if _is_pinecone(vs):
+            # Uploads made before the split carry no 'lang'; a filtered top-1 query finds nothing there
+            probe = _get_embeddings().embed_query("Constitution of India")
+            result = vs._index.query(vector=probe, top_k=1, filter={"lang": "en"},
+                                     namespace=getattr(vs, '_namespace', None))
+            return bool(result["matches"])
+        return bool(vs._collection.get(where={"lang": "en"}, limit=1)["ids"])
+    except Exception:
+        return False
+
+def _retriever_for(question):
+    """Retriever for the question's language partition (the default retriever if unpartitioned)"""
+    chain = _rag_chain
+    retrievers = chain.get("retrievers")
+    if not retrievers:
+        return chain["retriever"]
+    return retrievers.get(detect_language(question), chain["retriever"])
+
+_chroma_clients = {}  # index version directory -> the Chroma store installed from it
+
+def _release_index_version(path):
+    """Close what this process holds open in an index version, so its files can be deleted (Windows)"""
+    _close_chunk_store(path)
+    vs = _chroma_clients.pop(os.path.normpath(path), None)
+    system = getattr(getattr(vs, '_client', None), '_system', None)
+    if system is not None:
+        try:
+            system.stop()  # Closes the SQLite connection and the HNSW segment files
+        except Exception as e:
+            logger.warning("Could not close the Chroma client of %s: %s", path, e)
+
+def _gc_index_versions():
+    """Delete old index versions, keeping the newest RAG_KEEP_VERSIONS and always the live one.
+
+    Returns the versions actually deleted; the rest are retried by the next pass.
+    """
+    if not os.path.isdir(_RAG_VERSIONS_DIR):
+        return []
+    live = _current_index_version()
+    versions = sorted(os.listdir(_RAG_VERSIONS_DIR), reverse=True)
+    keep = set(versions[:max(RAG_KEEP_VERSIONS, 1)])
+    if live:
+        keep.add(live)
+
+    def log_failure(func, failed_path, exc_info):
+        logger.warning("Could not delete %s: %s", failed_path, exc_info[1])
+
+    removed = []
+    for version in versions:
+        if version not in keep:
+            path = os.path.join(_RAG_VERSIONS_DIR, version)
+            _release_index_version(path)
+            shutil.rmtree(path, onerror=log_failure)
+            if os.path.exists(path):
+                logger.warning("Index version %s is still in use; the next cleanup retries it", version)
+            else:
+                removed.append(version)
+    if removed:
+        logger.info("Removed old index versions: %s", ', '.join(removed))
+    return removed
+
+def _ensure_rag_pipeline_ready(job=None):
+    if _rag_chain is not None:
+        logger.debug("RAG pipeline already ready")
         return True
-    except Exception as e:
-        print(f"❌ RAG init error: {e}")
-        import traceback
-        traceback.print_exc()
+    if job is None:
+        # Request threads never build or wait on _rag_lock: the index is loaded/built by a
+        # background job, and requests are answered without RAG until it is published
+        _start_background_build()
+        logger.info("RAG index not ready yet, answering without RAG while it builds")
         return False
+    with _rag_lock:
+        if _rag_chain is not None:
+            return True
+        try:
+            logger.info("Initializing RAG pipeline...")
+            # Validate prerequisites
+            if not os.path.exists(COI_PDF_PATH):
+                raise FileNotFoundError(f"PDF not found at path: {COI_PDF_PATH}")
+
+            logger.info("PDF found at: %s", COI_PDF_PATH)
+
+            # Build or load vector store
+            _update_index_job(job, stage="loading_embeddings")
+            embeddings = _get_embeddings()
+            vs = None
+
+            # Check if Pinecone is configured and use it if available
+            use_pinecone = PINECONE_API_KEY and PINECONE_ENVIRONMENT and PINECONE_INDEX_NAME
+
+            if use_pinecone:
+                logger.info("Using Pinecone vector store...")
+                try:
+                    import pinecone
+                    pinecone.init(api_key=PINECONE_API_KEY, environment=PINECONE_ENVIRONMENT)
+
+                    # Check if index exists, create if not
+                    if PINECONE_INDEX_NAME not in pinecone.list_indexes():
+                        logger.info("Creating Pinecone index: %s", PINECONE_INDEX_NAME)
+                        pinecone.create_index(
+                            name=PINECONE_INDEX_NAME,
+                            dimension=384,  # Dimension for all-MiniLM-L6-v2
+                            metric="cosine"
+                        )
+
+                    # Load existing index or create new one
+                    vs = Pinecone.from_existing_index(
+                        index_name=PINECONE_INDEX_NAME,
+                        embedding=embeddings
+                    )
+                    logger.info("Pinecone vector store loaded")
+
+                    # Upload if the index is empty (stats are cached between restarts) or an
+                    # earlier upload was interrupted (its checkpoint is still on disk)
+                    index_stats = cached_index_stats(pinecone.Index(PINECONE_INDEX_NAME),
+                                                     PINECONE_STATS_CACHE_PATH, PINECONE_STATS_TTL)
+                    if index_stats["total_vector_count"] == 0 or os.path.exists(PINECONE_CHECKPOINT_PATH):
+                        logger.info("Uploading PDF data to Pinecone...")
+                        _upload_chunks_to_pinecone(embeddings, job)
+                        logger.info("PDF data uploaded to Pinecone")
+                    else:
+                        logger.info("Pinecone index contains %s vectors", index_stats['total_vector_count'])
+
+                except Exception as pinecone_error:
+                    logger.error("Pinecone error: %s", pinecone_error)
+                    logger.info("Falling back to Chroma...")
+                    use_pinecone = False
+
+            if not use_pinecone:
+                # Use Chroma as fallback
+                logger.info("Using Chroma vector store...")
+                os.makedirs(RAG_PERSIST_DIR, exist_ok=True)
+                logger.info("RAG persist directory: %s", RAG_PERSIST_DIR)
+
+                live_dir = _live_chroma_dir()
+                if live_dir:
+                    logger.info("Loading existing Chroma vector store from %s...", live_dir)
+                    vs = Chroma(persist_directory=live_dir, embedding_function=embeddings)
+                    logger.info("Existing Chroma vector store loaded")
+                else:
+                    version, vs = _build_index_version(embeddings, job)
+                    _set_current_index_version(version)
+                _update_index_job(job, version=_current_index_version())
+
+            _update_index_job(job, stage="installing")
+            _install_rag_chain(vs)
+            logger.info("RAG chain created successfully!")
+            return True
+        except Exception as e:
+            logger.exception("RAG init error: %s", e)
+            return False
+
+def _upload_chunks_to_pinecone(embeddings, job=None):
+    """Bulk-upsert the PDF chunks into the Pinecone index (batched, parallel, resumable)"""
+    import pinecone
+    index = pinecone.Index(PINECONE_INDEX_NAME)
+    _update_index_job(job, stage="loading_pdf")
+    chunks = _load_pdf_chunks()
+    _write_vocabulary(PINECONE_VOCAB_PATH, chunks)
+    _update_index_job(job, stage="uploading", processed=0, total=0)
+    upload_stats = bulk_upsert(
+        chunks, embeddings.embed_documents, index,
+        index_name=PINECONE_INDEX_NAME,
+        checkpoint_path=PINECONE_CHECKPOINT_PATH,
+        batch_size=PINECONE_UPSERT_BATCH_SIZE,
+        workers=PINECONE_UPSERT_WORKERS,
+        max_retries=PINECONE_UPSERT_MAX_RETRIES,
+        progress=lambda done, total: _update_index_job(job, processed=done, total=total),
+        manifest_path=PINECONE_MANIFEST_PATH,
+    )
+    cached_index_stats(index, PINECONE_STATS_CACHE_PATH, PINECONE_STATS_TTL, refresh=True)
+    return upload_stats
+
+def _reindex_rag_store(job=None):
+    """Build a new index version from the PDF and swap it in without interrupting live queries"""
+    if not os.path.exists(COI_PDF_PATH):
+        raise FileNotFoundError(f"PDF not found at path: {COI_PDF_PATH}")
+
+    if _rag_vs is None and PINECONE_API_KEY and PINECONE_ENVIRONMENT and PINECONE_INDEX_NAME:
+        # Nothing loaded yet: connect first, so a Pinecone deployment isn't replaced by a local build
+        if not _ensure_rag_pipeline_ready(job=job):
+            return False
+    if _is_pinecone(_rag_vs):
+        # Pinecone has no local versions: unchanged chunks are overwritten in place and the
+        # vectors of changed or removed chunks are deleted once the upload completes
+        _update_index_job(job, stage="loading_embeddings")
+        _upload_chunks_to_pinecone(_get_embeddings(), job)
+        return True
+
+    _update_index_job(job, stage="loading_embeddings")
+    embeddings = _get_embeddings()
+    version, vs = _build_index_version(embeddings, job)
+
+    _update_index_job(job, stage="swapping", version=version)
+    with _rag_lock:
+        _set_current_index_version(version)
+        _install_rag_chain(vs)
+    logger.info("Live RAG index swapped to %s", version)
+
+    _update_index_job(job, stage="garbage_collecting")
+    _gc_index_versions()
+    return True
+
+# -----------------------
+# Background index jobs
+# -----------------------
+
+def _update_index_job(job, **fields):
+    """Record progress on a job dict (no-op when called outside a job)"""
+    if job is None:
+        return
+    with _index_jobs_lock:
+        job.update(fields)
+        if job.get("total"):
+            job["progress"] = round(min(job.get("processed", 0) / job["total"], 1.0), 3)
+
+def _start_background_build():
+    """Start the index build job unless one is running or the last one failed under RAG_BUILD_RETRY_SECONDS ago"""
+    with _index_jobs_lock:
+        builds = [job for job in _index_jobs.values() if job["kind"] == "build"]
+        last = builds[-1] if builds else None
+        if (last is not None and last["status"] == "failed"
+                and time.time() - (last["finished_at"] or 0) < RAG_BUILD_RETRY_SECONDS):
+            return
+    start_index_job("build")
+
+def _run_index_job(job):
+    _update_index_job(job, status="running", started_at=time.time())
+    try:
+        if job["kind"] == "reindex":
+            ok = _reindex_rag_store(job)
+        else:
+            ok = _ensure_rag_pipeline_ready(job=job)
+        if not ok:
+            raise RuntimeError("RAG pipeline initialization failed")
+        _update_index_job(job, status="succeeded", stage="done", progress=1.0, version=_current_index_version())
+        logger.info("Index job %s (%s) finished", job['id'], job['kind'])
+    except Exception as e:
+        logger.error("Index job %s (%s) failed: %s", job['id'], job['kind'], e)
+        _update_index_job(job, status="failed", error=str(e))
+    finally:
+        _update_index_job(job, finished_at=time.time())
+
+def start_index_job(kind):
+    """Start a background build/reindex job; returns (job, created) where created is False if one is already running"""
+    with _index_jobs_lock:
+        for existing in _index_jobs.values():
+            if existing["status"] in ("queued", "running"):
+                return dict(existing), False
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0.0,
+            "processed": 0,
+            "total": 0,
+            "version": None,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        _index_jobs[job["id"]] = job
+        # Only keep the most recent jobs around for status lookups
+        for old_id in list(_index_jobs)[:-INDEX_JOB_HISTORY]:
+            if _index_jobs[old_id]["status"] not in ("queued", "running"):
+                del _index_jobs[old_id]
+
+    threading.Thread(target=_run_index_job, args=(job,), name=f"index-job-{job['id'][:8]}", daemon=True).start()
+    return dict(job), True
+
+def get_index_job(job_id):
+    with _index_jobs_lock:
+        job = _index_jobs.get(job_id)
+        return dict(job) if job else None
 
 @app.route('/api/chat_rag', methods=['POST'])
 def chat_rag():
@@ -962,9 +2419,10 @@ def chat_rag():
 
         ok = _ensure_rag_pipeline_ready()
         if not ok:
-            return jsonify({"success": False, "error": "RAG pipeline failed to initialize. Check logs and config."}), 500
+            return jsonify({"success": False, "error": "RAG index is still loading, please retry shortly.",
+                            "retry_after": 10}), 503, {'Retry-After': '10'}
 
-        result = _rag_chain({"query": user_question})
+        result = _rag_chain({"query": normalize_question(user_question)})
         answer = result.get('result', '')
         sources = []
         for doc in (result.get('source_documents') or [])[:4]:
@@ -987,7 +2445,7 @@ def chat_rag():
 def test_rag():
     """Test endpoint to verify RAG pipeline"""
     try:
-        print("🧪 Testing RAG pipeline...")
+        logger.info("Testing RAG pipeline...")
         if _ensure_rag_pipeline_ready() and _rag_chain["type"] == "simple_retrieval":
             retriever = _rag_chain["retriever"]
             docs = retriever.get_relevant_documents("What is the Constitution of India?")
@@ -1020,14 +2478,271 @@ def test_rag():
                 "error": "RAG pipeline failed to initialize"
             }), 500
     except Exception as e:
-        print(f"❌ RAG test error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("RAG test error: %s", e)
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
+# -----------------------
+# Document analysis (uploads)
+# -----------------------
+
+_upload_extract_pool = None  # Process pool, created on first upload
+_upload_extract_lock = threading.Lock()
+_upload_index_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="upload-index")
+_uploads = OrderedDict()  # doc_id -> record, least recently used first
+_uploads_lock = threading.Lock()
+
+_UPLOAD_TYPES = (".pdf", ".docx", ".txt")
+_UPLOAD_PRIVATE_FIELDS = ("path", "chunks", "vectors")
+
+def _get_upload_extract_pool():
+    global _upload_extract_pool
+    with _upload_extract_lock:
+        if _upload_extract_pool is None:
+            # spawn, not fork: a forked worker would inherit the index, reaper and logging threads.
+            # Workers run document_extract, which imports only the standard library and pypdf.
+            _upload_extract_pool = ProcessPoolExecutor(max_workers=UPLOAD_EXTRACT_WORKERS,
+                                                       mp_context=multiprocessing.get_context("spawn"))
+        return _upload_extract_pool
+
+def _upload_view(record):
+    return {k: v for k, v in record.items() if k not in _UPLOAD_PRIVATE_FIELDS}
+
+def _drop_upload(doc_id):
+    # Caller holds _uploads_lock
+    record = _uploads.pop(doc_id, None)
+    if record and record.get("path") and os.path.exists(record["path"]):
+        os.remove(record["path"])
+
+def _sweep_uploads():
+    """Expire ephemeral document indexes that have not been used within the TTL"""
+    cutoff = time.time() - UPLOAD_INDEX_TTL_MINUTES * 60
+    with _uploads_lock:
+        for doc_id in [d for d, r in _uploads.items() if r["status"] != "processing" and r["last_used"] < cutoff]:
+            _drop_upload(doc_id)
+            logger.info("Expired uploaded document %s", doc_id)
+
+def _enforce_upload_memory_cap(keep):
+    # Caller holds _uploads_lock; evicts least recently used indexes beyond the memory cap
+    budget = UPLOAD_INDEX_MEMORY_MB * 1024 * 1024
+    used = sum(r.get("index_bytes", 0) for r in _uploads.values())
+    for doc_id in list(_uploads):
+        if used <= budget:
+            break
+        if doc_id == keep or _uploads[doc_id]["status"] != "ready":
+            continue
+        used -= _uploads[doc_id].get("index_bytes", 0)
+        _drop_upload(doc_id)
+        logger.info("Evicted uploaded document %s to stay under the memory cap", doc_id)
+
+def _index_upload(doc_id, extract_future):
+    """Chunk and embed an extracted document into its own in-memory vector index"""
+    with _uploads_lock:
+        record = _uploads.get(doc_id)
+    if record is None:
+        return
+    try:
+        extracted = extract_future.result()
+        pages = [
+            Document(page_content=text, metadata={"source": record["filename"], "page": page_no})
+            for page_no, text in extracted["pages"] if text.strip()
+        ]
+        if not pages:
+            raise ValueError("No text could be extracted from the document")
+        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
+        chunks = splitter.split_documents(pages)
+        text_bytes = sum(len(c.page_content.encode('utf-8')) for c in chunks)
+        if text_bytes * 2 > UPLOAD_INDEX_MEMORY_MB * 1024 * 1024:
+            raise ValueError("Document is too large to analyse")
+
+        vectors = np.asarray(_get_embeddings().embed_documents([c.page_content for c in chunks]), dtype=np.float32)
+        with _uploads_lock:
+            if doc_id not in _uploads:
+                return
+            record.update(
+                status="ready",
+                chunks=chunks,
+                vectors=vectors,
+                chunk_count=len(chunks),
+                index_bytes=vectors.nbytes + text_bytes,
+                page_count=extracted["page_count"],
+                word_count=extracted["word_count"],
+                risk_flags=extracted["risk_flags"],
+                preview=" ".join(pages[0].page_content.split())[:1000],
+                last_used=time.time(),
+            )
+            _enforce_upload_memory_cap(keep=doc_id)
+        logger.info("Uploaded document %s indexed (%s chunks)", doc_id, len(chunks))
+    except Exception as e:
+        logger.error("Document analysis failed for %s: %s", doc_id, e)
+        with _uploads_lock:
+            record.update(status="failed", error=str(e))
+    finally:
+        # The extracted text lives in memory now; the upload itself is no longer needed
+        with _uploads_lock:
+            if record.get("path") and os.path.exists(record["path"]):
+                os.remove(record["path"])
+            record["path"] = None
+
+_DOCUMENT_PROMPT = PromptTemplate(
+    input_variables=["document", "constitution", "question"],
+    template="""You are a professional legal assistant. Answer the user's question about their uploaded document. Use the constitutional context only where it is relevant.
+
+Uploaded document excerpts:
+{document}
+
+Context from Constitution of India:
+{constitution}
+
+User Question: {question}
+
+Give a clear, practical answer that points to the relevant clauses and flags any risks.
+
+Response:"""
+)
+
+@app.route('/api/documents', methods=['POST'])
+def upload_document():
+    """Upload a PDF/DOCX for analysis; extraction and indexing happen in the background"""
+    try:
+        _sweep_uploads()
+        file = request.files.get('file')
+        if file is None or not file.filename:
+            return jsonify({"success": False, "error": "No file provided"}), 400
+        ext = os.path.splitext(file.filename)[1].lower()
+        if ext not in _UPLOAD_TYPES:
+            return jsonify({"success": False, "error": f"Unsupported file type. Use one of: {', '.join(_UPLOAD_TYPES)}"}), 400
+
+        doc_id = uuid.uuid4().hex
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        path = os.path.join(UPLOAD_DIR, f"{doc_id}{ext}")
+        spooled = getattr(file.stream, "name", None)
+        if isinstance(spooled, str) and os.path.dirname(os.path.abspath(spooled)) == os.path.abspath(UPLOAD_DIR):
+            # Large uploads were spooled into UPLOAD_DIR while parsing: keep the file by renaming it
+            file.stream.close()
+            os.replace(spooled, path)
+        else:
+            file.save(path, buffer_size=1024 * 1024)
+
+        now = time.time()
+        record = {
+            "id": doc_id,
+            "filename": os.path.basename(file.filename),
+            "path": path,
+            "status": "processing",
+            "error": None,
+            "created_at": now,
+            "last_used": now,
+        }
+        with _uploads_lock:
+            _uploads[doc_id] = record
+        logger.info("Document uploaded: %s (%.0f KB)", record['filename'], os.path.getsize(path) / 1024)
+
+        future = _get_upload_extract_pool().submit(extract_document, path)
+        future.add_done_callback(lambda f: _upload_index_pool.submit(_index_upload, doc_id, f))
+        return jsonify({"success": True, "document": _upload_view(record)}), 202
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/documents/<doc_id>', methods=['GET'])
+def document_status(doc_id):
+    """Status and analysis summary of an uploaded document"""
+    _sweep_uploads()
+    with _uploads_lock:
+        record = _uploads.get(doc_id)
+        view = _upload_view(record) if record else None
+    if view is None:
+        return jsonify({"success": False, "error": "Unknown or expired document"}), 404
+    return jsonify({"success": True, "document": view})
+
+@app.route('/api/documents/<doc_id>/ask', methods=['POST'])
+def ask_document(doc_id):
+    """Answer a question from an uploaded document together with the Constitution index"""
+    try:
+        data = request.get_json(force=True, silent=True) or {}
+        user_question = (data.get('question') or '').strip()
+        if not user_question:
+            return jsonify({"error": "No question provided"}), 400
+
+        _sweep_uploads()
+        with _uploads_lock:
+            record = _uploads.get(doc_id)
+            if record is not None:
+                _uploads.move_to_end(doc_id)
+                record["last_used"] = time.time()
+        if record is None:
+            return jsonify({"success": False, "error": "Unknown or expired document"}), 404
+        if record["status"] != "ready":
+            return jsonify({"success": False, "error": f"Document is {record['status']}", "document": _upload_view(record)}), 409
+
+        logger.debug("Document question (%s): %s", record['filename'], user_question)
+        # The upload's own words aren't in the spelling vocabulary, so the document side is only folded
+        document_question = normalize_query(user_question)
+        search_question = normalize_question(user_question)
+        query_vec = np.asarray(_get_embeddings().embed_query(document_question), dtype=np.float32)
+        scores = record["vectors"] @ query_vec
+        top = np.argsort(-scores)[:UPLOAD_TOP_K]
+        doc_hits = [record["chunks"][i] for i in top]
+
+        coi_docs = []
+        if _ensure_rag_pipeline_ready():
+            coi_docs = _retriever_for(search_question).get_relevant_documents(search_question)[:2]
+
+        sources = [{"source": d.metadata.get('source'), "page": d.metadata.get('page')} for d in doc_hits]
+        sources += [{"source": 'Constitution PDF', "page": (d.metadata or {}).get('page', 'Unknown')} for d in coi_docs]
+
+        document_context = "\n\n".join(d.page_content for d in doc_hits)
+        constitution_context = "\n\n".join(d.page_content for d in coi_docs) or "(not available)"
+        llm = _route_llm(search_question, document_context + constitution_context)
+        if llm is not None:
+            try:
+                prompt = _DOCUMENT_PROMPT.format(document=document_context, constitution=constitution_context,
+                                                 question=user_question)
+                answer = _invoke_llm_admitted(llm, prompt).strip()
+                if answer and "Uploaded document excerpts" not in answer:
+                    return jsonify({
+                        "success": True,
+                        "answer": answer + "\n\n⚖️ Legal Disclaimer: This is not legal advice. For specific legal advice, consult a qualified lawyer.",
+                        "sources": sources,
+                        "model": "LLM + RAG",
+                        "document": _upload_view(record)
+                    })
+            except DegenerateGeneration as stop:
+                logger.info("Document LLM answer stopped early (%s), answering extractively", stop)
+            except Exception as llm_error:
+                logger.error("Document LLM answer failed, answering extractively: %s", llm_error)
+
+        # Extractive answer: the most relevant passages of the document itself
+        q_words = [w for w in document_question.split() if len(w) > 3]
+        lines = [ln.strip() for d in doc_hits for ln in d.page_content.splitlines() if ln.strip()]
+        scored = sorted(lines, key=lambda ln: -sum(1 for w in q_words if w in ln.lower()))
+        bullet_points = "\n".join(f"• {ln}" for ln in scored[:6])
+        answer = f"Here's what your document says about this:\n\n{bullet_points}"
+        if coi_docs:
+            pages_str = ", ".join(str((d.metadata or {}).get('page', '?')) for d in coi_docs)
+            answer += f"\n\n📚 Related constitutional provisions: Constitution of India (pages: {pages_str})"
+        answer += "\n\n⚖️ For specific legal advice, please consult a qualified lawyer."
+        return jsonify({
+            "success": True,
+            "answer": answer,
+            "sources": sources,
+            "model": "retrieval",
+            "document": _upload_view(record)
+        })
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+_legal_db_local = threading.local()
+
+def _legal_db():
+    """Per-thread connection to the legal database (WAL mode, so imports don't block readers)"""
+    conn = getattr(_legal_db_local, "conn", None)
+    if conn is None:
+        conn = _legal_db_local.conn = legal_db.connect()
+    return conn
+
 @app.route('/api/add_training_data', methods=['POST'])
 def add_training_data():
     """Add new training data to the system"""
@@ -1041,9 +2756,10 @@ def add_training_data():
         if not question or not answer:
             return jsonify({"error": "Question and answer are required"}), 400
         
-        # Here you would typically save to a database
-        # For now, we'll just return success
-        print(f"📝 Added training data: {question[:50]}...")
+        record = {"question": question, "answer": answer, "country": country, "category": category,
+                  "source": data.get('source')}
+        legal_db.insert_rows(_legal_db(), "training_data", [record])
+        logger.info("Added training data: %s...", question[:50])
         
         return jsonify({
             "success": True,
@@ -1064,15 +2780,19 @@ def add_training_data():
 
 @app.route('/api/training_stats', methods=['GET'])
 def get_training_stats():
-    """Get training data statistics"""
+    """Get training data statistics (read from the materialized count tables, not the data)"""
     try:
-        # Here you would typically get stats from a database
-        # For now, we'll return sample stats
+        conn = _legal_db()
+        training = legal_db.table_stats(conn, "training_data")
+        documents = legal_db.table_stats(conn, "legal_documents")
         stats = {
-            "total_examples": 100,
-            "country_specific": 75,
-            "categories": ["General", "Criminal", "Family", "Property", "Employment"],
-            "countries": ["India", "Pakistan", "USA", "Australia", "General"]
+            "total_examples": training["total"],
+            "country_specific": training["country_specific"],
+            "categories": list(training["by_category"]),
+            "countries": list(training["by_country"]),
+            "by_country": training["by_country"],
+            "by_category": training["by_category"],
+            "legal_documents": documents,
         }
         
         return jsonify({
@@ -1086,12 +2806,64 @@ def get_training_stats():
             "error": str(e)
         }), 500
 
+@app.route('/api/import/<table>', methods=['POST'])
+def bulk_import(table):
+    """Stream a CSV/JSONL upload (multipart field `file`, or the raw body) into a table"""
+    try:
+        if table not in legal_db.TABLES:
+            return jsonify({"success": False, "error": f"Unknown table. Use one of: {', '.join(legal_db.TABLES)}"}), 404
+        file = request.files.get('file')
+        if file is not None:
+            stream = file.stream
+            fmt = request.args.get('format') or legal_db.format_from_filename(file.filename)
+        else:
+            stream = request.stream
+            fmt = request.args.get('format') or ("csv" if "csv" in (request.content_type or "") else "jsonl")
+        if fmt not in ("csv", "jsonl"):
+            return jsonify({"success": False, "error": "format must be csv or jsonl"}), 400
+
+        text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        result = legal_db.insert_rows(_legal_db(), table, legal_db.records_from_stream(text, fmt))
+        logger.info("Imported %s rows into %s (%s rows/s)", result['inserted'], table, result['rows_per_second'])
+        return jsonify({"success": True, **result})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/export/<table>', methods=['GET'])
+def bulk_export(table):
+    """Stream a table out as JSONL (default) or CSV"""
+    fmt = request.args.get('format', 'jsonl')
+    if table not in legal_db.TABLES or fmt not in legal_db.EXPORT_FORMATS:
+        return jsonify({"success": False, "error": "Unknown table or format"}), 404
+    # A connection of its own: the generator runs after this handler returns
+    conn = legal_db.connect()
+
+    def generate():
+        try:
+            yield from legal_db.export_rows(conn, table, fmt)
+        finally:
+            conn.close()
+
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return Response(generate(), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={table}.{fmt}"})
+
+def shutdown_background_workers(wait=True):
+    """Stop the document pools (letting queued extractions and index builds finish if wait) and the embedding batcher"""
+    _upload_index_pool.shutdown(wait=wait)
+    with _upload_extract_lock:
+        if _upload_extract_pool is not None:
+            _upload_extract_pool.shutdown(wait=wait)
+    if isinstance(_embeddings, BatchingEmbeddings):
+        _embeddings.close()
+
 if __name__ == '__main__':
-    print("🚀 Starting LawHub server...")
+    logger.info("Starting LawHub server...")
     
-    # Preload RAG pipeline immediately
-    print("🔄 Preloading RAG pipeline on startup...")
-    preload_rag_pipeline()
+    # Build/load the RAG index in the background; requests are answered without RAG until it is ready
+    logger.info("Preloading RAG pipeline on startup...")
+    preload_rag_pipeline(wait=False)
     
-    print("🌐 Starting Flask server...")
-    app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
+    # Development server only; production runs under `python asgi.py`
+    logger.info("Starting Flask development server...")
+    app.run(debug=FLASK_DEBUG, host=SERVER_HOST, port=SERVER_PORT)
@@ -0,0 +1,221 @@
+# LawHub ASGI entry point
+#
+# Runs the Flask app under an ASGI server. The event loop owns every connection, so
+# waiting on slow clients never ties up a thread. That covers reading request bodies,
+# writing responses and idle keep-alive connections. A Flask handler only runs on the
+# sized handler pool once its whole request has arrived. Request bodies are spooled:
+# small ones stay in memory, larger ones (uploads, imports) go to a temporary file, so
+# concurrent large uploads don't sit in RAM. Generation is additionally
+# capped by the LLM admission control in app.py. On shutdown, in-flight requests
+# (including running generations) get ASGI_DRAIN_TIMEOUT to finish. Any request that
+# arrives meanwhile gets 503. After that the worker pools stop.
+#
+#   python asgi.py
+#   uvicorn asgi:application --host 0.0.0.0 --port 5000 --timeout-graceful-shutdown 60
+
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from config import SERVER_HOST, SERVER_PORT, ASGI_WORKERS, ASGI_HANDLER_THREADS
+from config import ASGI_MAX_BODY_MB, ASGI_DRAIN_TIMEOUT
+if __name__ != "__mp_main__":
+    # Spawned worker processes (upload text extraction) re-run the launching script as
+    # __mp_main__; they only need document_extract, not the app and its models
+    import app as lawhub
+
+    logger = lawhub.logger.getChild("asgi")
+
+_RESPONSE_BUFFER_BYTES = 256 * 1024  # Bodies up to this size are collected in a single pool hop
+_BODY_MEMORY_BYTES = 1024 * 1024  # Request bodies larger than this are spooled to a temporary file
+_END = object()
+
+_handler_pool = ThreadPoolExecutor(max_workers=ASGI_HANDLER_THREADS, thread_name_prefix="asgi-handler")
+_in_flight = 0
+_idle = None  # asyncio.Event, set whenever no request is being handled
+_draining = False
+
+
+def _build_environ(scope, body, length):
+    """WSGI environ for an ASGI http scope whose body (a file positioned at 0) has been fully received"""
+    server = scope.get("server") or (SERVER_HOST, SERVER_PORT)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(length),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": ASGI_WORKERS > 1,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name != "CONTENT_LENGTH":
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _run_handler(environ):
+    """Call the Flask app on a pool thread and collect the start of its response body.
+
+    Returns (status, headers, chunks, stream) where stream is None when the
+    whole body fit in the buffer.
+    """
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+
+    result = lawhub.app(environ, start_response)
+    iterator = iter(result)
+    chunks, size = [], 0
+    for chunk in iterator:
+        if chunk:
+            chunks.append(chunk)
+            size += len(chunk)
+        if size >= _RESPONSE_BUFFER_BYTES:
+            return started["status"], started["headers"], chunks, (iterator, result)
+    if hasattr(result, "close"):
+        result.close()
+    return started["status"], started["headers"], chunks, None
+
+
+def _next_chunk(stream):
+    iterator, result = stream
+    for chunk in iterator:
+        if chunk:
+            return chunk
+    if hasattr(result, "close"):
+        result.close()
+    return _END
+
+
+async def _read_body(receive, spool, limit):
+    """Receive the request body into spool without holding a thread; its size, or None past limit"""
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ConnectionResetError("client disconnected")
+        body = message.get("body", b"")
+        size += len(body)
+        if size > limit:
+            return None
+        if body:
+            spool.write(body)
+        if not message.get("more_body", False):
+            spool.seek(0)
+            return size
+
+
+def _idle_event():
+    """The idle event, created on first use (lifespan events are optional, e.g. --lifespan off)"""
+    global _idle
+    if _idle is None:
+        _idle = asyncio.Event()
+        _idle.set()
+    return _idle
+
+
+async def _send_simple(send, status, text, extra_headers=()):
+    body = text.encode("utf-8")
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    headers.extend(extra_headers)
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _handle_http(scope, receive, send):
+    global _in_flight
+    if _draining:
+        await _send_simple(send, 503, '{"success": false, "error": "Server is shutting down"}',
+                           [(b"retry-after", b"5"), (b"connection", b"close")])
+        return
+
+    _in_flight += 1
+    _idle_event().clear()
+    body = tempfile.SpooledTemporaryFile(max_size=_BODY_MEMORY_BYTES)
+    try:
+        try:
+            length = await _read_body(receive, body, ASGI_MAX_BODY_MB * 1024 * 1024)
+        except ConnectionResetError:
+            return
+        if length is None:
+            await _send_simple(send, 413, '{"success": false, "error": "Request body too large"}')
+            return
+
+        loop = asyncio.get_running_loop()
+        status, headers, chunks, stream = await loop.run_in_executor(
+            _handler_pool, _run_handler, _build_environ(scope, body, length))
+
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        if scope["method"] == "HEAD":
+            chunks, stream = [], None
+        for chunk in chunks:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        while stream is not None:
+            chunk = await loop.run_in_executor(_handler_pool, _next_chunk, stream)
+            if chunk is _END:
+                break
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        body.close()
+        _in_flight -= 1
+        if _in_flight == 0:
+            _idle_event().set()
+
+
+async def _handle_lifespan(receive, send):
+    global _draining
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            _idle_event()
+            # Build/load the index as a background job; requests are answered without RAG meanwhile
+            lawhub.start_index_job("build")
+            logger.info("ASGI server ready (%s handler threads)", ASGI_HANDLER_THREADS)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            _draining = True
+            logger.info("Draining %s in-flight request(s)...", _in_flight)
+            try:
+                await asyncio.wait_for(_idle_event().wait(), timeout=ASGI_DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning("Shutting down with %s request(s) still running", _in_flight)
+            await asyncio.get_running_loop().run_in_executor(None, lawhub.shutdown_background_workers)
+            _handler_pool.shutdown(wait=False)
+            logger.info("ASGI server stopped")
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http":
+        await _handle_http(scope, receive, send)
+    elif scope["type"] == "lifespan":
+        await _handle_lifespan(receive, send)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run("asgi:application", host=SERVER_HOST, port=SERVER_PORT, workers=ASGI_WORKERS,
+                timeout_graceful_shutdown=ASGI_DRAIN_TIMEOUT, log_level="warning")
@@ -0,0 +1,126 @@
+# LawHub embeddings backend benchmark
+#
+# Compares the torch (sentence-transformers) and ONNX Runtime (fp32/int8) embedding
+# backends: load time, resident memory, single-query latency and batch throughput. Each
+# backend runs in a fresh subprocess so RSS reflects only what that backend imports. A
+# missing ONNX export is created up front, so no measured run includes the export.
+#
+#   python bench_embeddings.py
+#   python bench_embeddings.py --backends torch onnx-int8 --queries 500 --docs 1024
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from bench_llm import _rss_mb
+from config import HUGGINGFACE_EMBEDDINGS_MODEL
+
+BACKENDS = ("torch", "onnx-fp32", "onnx-int8")
+QUERIES = [
+    "What does Article 21 say about personal liberty?",
+    "Can I be arrested without a warrant?",
+    "How do I file a writ of habeas corpus?",
+    "What are my rights as a tenant?",
+    "Is the right to education a fundamental right?",
+]
+DOC = ("The State shall not deny to any person equality before the law or the equal protection of the "
+       "laws within the territory of India. Prohibition of discrimination on grounds of religion, race, "
+       "caste, sex or place of birth. ") * 4
+
+
+def _load(backend):
+    if backend == "torch":
+        try:
+            from langchain_huggingface import HuggingFaceEmbeddings
+        except ImportError:
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=HUGGINGFACE_EMBEDDINGS_MODEL, model_kwargs={'device': 'cpu'},
+                                     encode_kwargs={'normalize_embeddings': True}), None
+    from onnx_embeddings import load_onnx_embeddings
+    if not _onnx_exported():
+        raise SystemExit("ONNX export missing; run python onnx_embeddings.py first")
+    embeddings = load_onnx_embeddings(variant=backend.split("-", 1)[1], min_cosine=0.0)
+    return embeddings, embeddings.meta["parity"][embeddings.variant]["min_cosine"]
+
+
+def _onnx_exported():
+    from onnx_embeddings import _META_FILE, model_dir
+    return os.path.exists(os.path.join(model_dir(HUGGINGFACE_EMBEDDINGS_MODEL), _META_FILE))
+
+
+def run_single(backend, queries, docs):
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    embeddings, parity = _load(backend)
+    load_seconds = time.perf_counter() - started
+
+    for q in QUERIES:
+        embeddings.embed_query(q)  # Warm-up
+    latencies = []
+    for n in range(queries):
+        t0 = time.perf_counter()
+        embeddings.embed_query(QUERIES[n % len(QUERIES)])
+        latencies.append((time.perf_counter() - t0) * 1000)
+    latencies.sort()
+
+    t0 = time.perf_counter()
+    embeddings.embed_documents([DOC] * docs)
+    batch_seconds = time.perf_counter() - t0
+    rss_after = _rss_mb()
+
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 2),
+        "rss_mb": round(rss_after, 1) if rss_after is not None else None,
+        "rss_delta_mb": round(rss_after - rss_before, 1) if rss_after is not None and rss_before is not None else None,
+        "query_p50_ms": round(latencies[len(latencies) // 2], 2),
+        "query_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        "docs_per_second": round(docs / batch_seconds, 1),
+        "parity_min_cosine": parity,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--docs", type=int, default=512)
+    parser.add_argument("--single", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.single, args.queries, args.docs)))
+        return
+
+    if any(b.startswith("onnx") for b in args.backends) and not _onnx_exported():
+        from onnx_embeddings import export_onnx
+        print("📦 Exporting the ONNX model (once, not timed)...", file=sys.stderr)
+        export_onnx()
+
+    results = []
+    for backend in args.backends:
+        print(f"⏱️ Benchmarking {backend} embeddings...", file=sys.stderr)
+        cmd = [sys.executable, __file__, "--single", backend, "--queries", str(args.queries), "--docs", str(args.docs)]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        lines = [ln for ln in proc.stdout.splitlines() if ln.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            results.append({"backend": backend, "error": (proc.stderr.strip().splitlines() or ["failed"])[-1]})
+        else:
+            results.append(json.loads(lines[-1]))
+
+    header = f"{'backend':<10} {'load s':>7} {'RSS MB':>8} {'p50 ms':>7} {'p95 ms':>7} {'docs/s':>8} {'parity':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        if "error" in r:
+            print(f"{r['backend']:<10} error: {r['error']}")
+        else:
+            print(f"{r['backend']:<10} {r['load_seconds']:>7} {r['rss_mb']!s:>8} {r['query_p50_ms']:>7} "
+                  f"{r['query_p95_ms']:>7} {r['docs_per_second']:>8} {r['parity_min_cosine']!s:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# LawHub LLM load-mode benchmark
+#
+# Measures load time, resident memory and generation speed of the local LLM in each
+# load mode. Every mode runs in a fresh subprocess so RSS numbers don't leak between runs.
+#
+#   python bench_llm.py                              # LOCAL_LLM_ID, all modes
+#   python bench_llm.py --model facebook/opt-125m --task text-generation --modes fp32 int8
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from config import LOCAL_LLM_ID
+
+MODES = ("fp32", "bf16", "int8")
+PROMPT = "Explain the right to constitutional remedies under Article 32 of the Constitution of India."
+
+
+def _rss_mb():
+    """Current resident set size in MB (None if it can't be read on this platform)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def run_single(model_id, task, mode, new_tokens, repeats):
+    import torch
+    from app import _load_llm, _llm_ram_mb
+
+    torch.set_num_threads(max(1, os.cpu_count() or 1))
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    llm = _load_llm(model_id, task, mode)
+    load_seconds = time.perf_counter() - started
+    if llm is None:
+        return {"mode": mode, "error": "load failed"}
+    rss_after = _rss_mb()
+
+    model = llm.pipeline.model
+    tokenizer = llm.pipeline.tokenizer
+    inputs = tokenizer(PROMPT, return_tensors="pt")
+    gen_kwargs = {"max_new_tokens": new_tokens, "min_new_tokens": new_tokens, "do_sample": False}
+    if tokenizer.pad_token_id is None:
+        gen_kwargs["pad_token_id"] = tokenizer.eos_token_id
+
+    with torch.inference_mode():
+        model.generate(**inputs, max_new_tokens=4)  # Warm-up
+        timings = []
+        generated = 0
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            out = model.generate(**inputs, **gen_kwargs)
+            timings.append(time.perf_counter() - t0)
+            prompt_len = 0 if model.config.is_encoder_decoder else inputs["input_ids"].shape[1]
+            generated += out.shape[1] - prompt_len
+
+    return {
+        "mode": mode,
+        "load_seconds": round(load_seconds, 2),
+        "rss_mb": round(rss_after, 1) if rss_after is not None else None,
+        "rss_delta_mb": round(rss_after - rss_before, 1) if rss_after is not None and rss_before is not None else None,
+        "weights_mb": round(_llm_ram_mb(llm) or 0, 1),
+        "tokens_per_second": round(generated / sum(timings), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLM load modes")
+    parser.add_argument("--model", default=LOCAL_LLM_ID)
+    parser.add_argument("--task", default=None, help="text-generation or text2text-generation")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--new-tokens", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--single", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.model, args.task, args.single, args.new_tokens, args.repeats)))
+        return
+
+    results = []
+    for mode in args.modes:
+        print(f"⏱️ Benchmarking {args.model} in {mode} mode...", file=sys.stderr)
+        cmd = [sys.executable, __file__, "--single", mode, "--model", args.model,
+               "--new-tokens", str(args.new_tokens), "--repeats", str(args.repeats)]
+        if args.task:
+            cmd += ["--task", args.task]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        lines = [ln for ln in proc.stdout.splitlines() if ln.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            results.append({"mode": mode, "error": (proc.stderr.strip().splitlines() or ["failed"])[-1]})
+        else:
+            results.append(json.loads(lines[-1]))
+
+    header = f"{'mode':<6} {'load s':>8} {'RSS MB':>9} {'weights MB':>11} {'tok/s':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        if "error" in r:
+            print(f"{r['mode']:<6} error: {r['error']}")
+        else:
+            print(f"{r['mode']:<6} {r['load_seconds']:>8} {r['rss_mb']!s:>9} {r['weights_mb']:>11} {r['tokens_per_second']:>8}")
+
+
+if __name__ == '__main__':
+    main()
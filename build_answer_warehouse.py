@@ -0,0 +1,129 @@
+# LawHub answer warehouse builder
+#
+# Runs the full /api/ask pipeline (RAG + LLM) offline, at low CPU priority, over the
+# most frequent questions and stores the responses in a compact read-only store that
+# ask() checks before doing any live generation.
+#
+#   python build_answer_warehouse.py --from-db                      # training_data questions
+#   python build_answer_warehouse.py --from-log capture.jsonl --limit 300
+#   python build_answer_warehouse.py --from-file questions.txt
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+import uuid
+from collections import Counter
+
+import numpy as np
+
+from config import ANSWER_WAREHOUSE_DIR, LEGAL_DB_PATH
+
+DB_PATH = LEGAL_DB_PATH
+
+
+def _questions_from_db(path):
+    with sqlite3.connect(path) as conn:
+        for question, country in conn.execute("SELECT question, country FROM training_data"):
+            yield question, (None if country in (None, '', 'General') else country)
+
+
+def _questions_from_lines(path):
+    """Plain text (one question per line) or JSONL with a 'question' (and optional 'country') field"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("question"):
+                    yield record["question"], record.get("country") or None
+            else:
+                yield line, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute answers for high-frequency questions")
+    parser.add_argument("--from-db", action="store_true", help="Use questions from the training_data table")
+    parser.add_argument("--from-log", action="append", default=[], help="JSONL request log (e.g. a traffic capture)")
+    parser.add_argument("--from-file", action="append", default=[], help="Text file with one question per line")
+    parser.add_argument("--limit", type=int, default=500, help="Keep only the N most frequent questions")
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between questions")
+    args = parser.parse_args()
+
+    if hasattr(os, "nice"):
+        os.nice(10)  # Stay out of the way of a live server on the same machine
+
+    import app as lawhub
+    lawhub.ANSWER_WAREHOUSE_ENABLED = False  # Always generate live while building
+
+    sources = [_questions_from_db(DB_PATH)] if args.from_db else []
+    sources += [_questions_from_lines(p) for p in args.from_log + args.from_file]
+    if not sources:
+        parser.error("give at least one of --from-db, --from-log, --from-file")
+
+    # Load the index first so question keys are normalized with its spelling vocabulary
+    if not lawhub.preload_rag_pipeline():
+        print("⚠️ RAG pipeline unavailable - answers will be rule-based")
+
+    counts = Counter()
+    originals = {}
+    for source in sources:
+        for question, country in source:
+            key = lawhub._warehouse_key(question, country)
+            counts[key] += 1
+            originals.setdefault(key, (question.strip(), country))
+    selected = [key for key, _ in counts.most_common(args.limit)]
+    print(f"🏬 {len(counts)} distinct questions, precomputing the top {len(selected)}")
+
+    client = lawhub.app.test_client()
+    entries = []
+    started = time.time()
+    for n, key in enumerate(selected, 1):
+        question, country = originals[key]
+        resp = client.post('/api/ask', json={"question": question, "country": country or ''})
+        payload = resp.get_json(silent=True) or {}
+        if resp.status_code == 200 and payload.get("success") and not payload.get("priority"):
+            entries.append({"key": key, "question": question, "country": country,
+                            "hits": counts[key], "response": payload})
+        print(f"   [{n}/{len(selected)}] {payload.get('model', resp.status_code)}: {question[:60]}")
+        if args.pause:
+            time.sleep(args.pause)
+
+    os.makedirs(ANSWER_WAREHOUSE_DIR, exist_ok=True)
+    build_id = uuid.uuid4().hex[:8]
+    emb_file = f"embeddings-{build_id}.npy"
+    vectors = (lawhub._get_embeddings().embed_documents([lawhub.normalize_question(e["question"]) for e in entries])
+               if entries else [])
+    np.save(os.path.join(ANSWER_WAREHOUSE_DIR, emb_file), np.asarray(vectors, dtype=np.float16).reshape(len(entries), -1))
+
+    meta = {
+        "built_at": time.time(),
+        "build_id": build_id,
+        "count": len(entries),
+        "embeddings_file": emb_file,
+        "tags": lawhub._warehouse_tags(),
+    }
+    tmp_path = os.path.join(ANSWER_WAREHOUSE_DIR, f"answers.json.{build_id}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"meta": meta, "entries": entries}, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, os.path.join(ANSWER_WAREHOUSE_DIR, "answers.json"))
+
+    # Older embedding matrices are no longer referenced (a running server may still map one)
+    for name in os.listdir(ANSWER_WAREHOUSE_DIR):
+        if name.startswith("embeddings-") and name != emb_file:
+            try:
+                os.remove(os.path.join(ANSWER_WAREHOUSE_DIR, name))
+            except OSError:
+                pass
+
+    print(f"✅ Stored {len(entries)} answers in {ANSWER_WAREHOUSE_DIR} ({time.time() - started:.0f}s)")
+
+
+if __name__ == '__main__':
+    main()
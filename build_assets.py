@@ -0,0 +1,138 @@
+# LawHub static asset build
+#
+# Pre-renders the page templates, rewrites team photos to responsive, content-hashed
+# WebP/JPEG variants, and precompresses text assets (gzip, plus brotli if installed).
+# Output goes to ASSET_BUILD_DIR together with a manifest.json that app.py serves from.
+#
+#   python build_assets.py
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+from io import BytesIO
+
+from config import ASSET_BUILD_DIR, ASSET_IMAGE_WIDTHS, ASSET_IMAGE_SIZES
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+TEMPLATES_DIR = "templates"
+STATIC_DIR = "static"
+PAGES = ("landing_page.html", "integrated_frontend.html")
+TEXT_MIMETYPES = {".html": "text/html; charset=utf-8", ".css": "text/css; charset=utf-8",
+                  ".js": "application/javascript; charset=utf-8", ".svg": "image/svg+xml"}
+IMG_TAG_RE = re.compile(r'<img\s+src="/static/(photos/[^"]+\.(?:jpe?g|png))"([^>]*)>', re.IGNORECASE)
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_asset(manifest, rel_path, data, mimetype):
+    """Write one built file (plus compressed variants for text) and record it in the manifest"""
+    path = os.path.join(ASSET_BUILD_DIR, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+    encodings = []
+    if mimetype in TEXT_MIMETYPES.values():
+        with open(path + ".gz", 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        encodings.append("gzip")
+        if brotli is not None:
+            with open(path + ".br", 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+            encodings.append("br")
+
+    manifest["files"][rel_path] = {"etag": _digest(data)[:20], "mimetype": mimetype,
+                                   "encodings": encodings, "size": len(data)}
+    return rel_path
+
+
+def _build_image_variants(manifest, photo_rel):
+    """Resize one photo to every configured width as WebP and JPEG; returns {format: [(url, width)]}"""
+    src_path = os.path.join(STATIC_DIR, photo_rel)
+    if Image is None or not os.path.exists(src_path):
+        return None
+
+    stem = os.path.splitext(os.path.basename(photo_rel))[0]
+    variants = {"webp": [], "jpeg": []}
+    with Image.open(src_path) as img:
+        img = img.convert("RGB")
+        for width in ASSET_IMAGE_WIDTHS:
+            if width > img.width and variants["jpeg"]:
+                break  # Never upscale; the largest variant is the original size
+            w = min(width, img.width)
+            resized = img.resize((w, max(1, round(img.height * w / img.width))), Image.LANCZOS)
+            for fmt, ext, mimetype, opts in (("webp", "webp", "image/webp", {"quality": 80, "method": 6}),
+                                            ("jpeg", "jpg", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True})):
+                buf = BytesIO()
+                resized.save(buf, format=fmt.upper(), **opts)
+                data = buf.getvalue()
+                rel = _write_asset(manifest, f"photos/{stem}-{w}w.{_digest(data)[:10]}.{ext}", data, mimetype)
+                variants[fmt].append((f"/assets/{rel}", w))
+    return variants
+
+
+def _picture_tag(variants, attrs):
+    webp = ", ".join(f"{url} {w}w" for url, w in variants["webp"])
+    jpeg = ", ".join(f"{url} {w}w" for url, w in variants["jpeg"])
+    fallback = variants["jpeg"][0][0]
+    if "loading=" not in attrs:
+        attrs += ' loading="lazy"'
+    return (f'<picture><source type="image/webp" srcset="{webp}" sizes="{ASSET_IMAGE_SIZES}">'
+            f'<img src="{fallback}" srcset="{jpeg}" sizes="{ASSET_IMAGE_SIZES}"{attrs}></picture>')
+
+
+def build():
+    if os.path.isdir(ASSET_BUILD_DIR):
+        shutil.rmtree(ASSET_BUILD_DIR)
+    os.makedirs(ASSET_BUILD_DIR)
+    manifest = {"files": {}, "pages": {}}
+    if Image is None:
+        print("⚠️ Pillow not installed - photos are left as-is")
+    if brotli is None:
+        print("⚠️ brotli not installed - only gzip variants are built")
+
+    image_cache = {}
+    for page in PAGES:
+        with open(os.path.join(TEMPLATES_DIR, page), 'r', encoding='utf-8') as f:
+            html = f.read()
+
+        def rewrite(match):
+            photo_rel, attrs = match.group(1), match.group(2)
+            if photo_rel not in image_cache:
+                image_cache[photo_rel] = _build_image_variants(manifest, photo_rel)
+            variants = image_cache[photo_rel]
+            return _picture_tag(variants, attrs) if variants else match.group(0)
+
+        html = IMG_TAG_RE.sub(rewrite, html)
+        manifest["pages"][page] = _write_asset(manifest, f"pages/{page}", html.encode('utf-8'), TEXT_MIMETYPES[".html"])
+
+    with open(os.path.join(ASSET_BUILD_DIR, "manifest.json"), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    total = sum(entry["size"] for entry in manifest["files"].values())
+    print(f"✅ Built {len(manifest['files'])} assets ({total / 1024:.0f} KB uncompressed) into {ASSET_BUILD_DIR}")
+    for rel, entry in manifest["files"].items():
+        sizes = [f"{entry['size'] / 1024:.1f} KB"]
+        for enc, suffix in (("gzip", ".gz"), ("br", ".br")):
+            if enc in entry["encodings"]:
+                sizes.append(f"{enc} {os.path.getsize(os.path.join(ASSET_BUILD_DIR, rel + suffix)) / 1024:.1f} KB")
+        print(f"   {rel}: {', '.join(sizes)}")
+    return manifest
+
+
+if __name__ == '__main__':
+    build()
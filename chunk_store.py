@@ -0,0 +1,204 @@
+# LawHub compact chunk store
+#
+# Read-only store of chunk text, metadata and embeddings, written once at ingest and
+# memory-mapped by every process that serves the index (the OS page cache is shared).
+# The store has these files:
+#   records.npy  fixed-width record per chunk: text block/offset/length, page, source,
+#                language, article
+#   blocks.npy   (start, size) of every compressed text block in blocks.bin
+#   blocks.bin   chunk text in ~64 KB blocks, zstd-compressed (zlib if zstandard is
+#                missing, or uncompressed)
+#   vectors.npy  float16 embedding matrix, row i = chunk i
+#   store.json   codec, counts and the source-path table
+# Chunk i is fetched by integer id: one record lookup, one block decompression (cached)
+# and a slice of it.
+
+import json
+import mmap
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+RECORD_DTYPE = np.dtype([
+    ("block", "<u4"), ("offset", "<u4"), ("length", "<u4"),
+    ("page", "<i4"), ("source", "<u2"), ("lang", "S2"), ("article", "S8"),
+])
+_ARTICLE_RE = re.compile(r"^\s*(\d{1,3}[A-Z]{0,2})\.\s", re.MULTILINE)
+
+
+def article_id(text):
+    """First article number that opens a line of the chunk ("21", "21A"), or ''"""
+    match = _ARTICLE_RE.search(text)
+    return match.group(1) if match else ""
+
+
+def _compressor(codec):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=19).compress
+    if codec == "zlib":
+        return lambda data: zlib.compress(data, 9)
+    return bytes
+
+
+def build_chunk_store(path, chunks, vectors, block_bytes=64 * 1024, codec=None, dimension=None):
+    """Write a chunk store for chunks (LangChain Documents) and their embedding vectors.
+
+    dimension is the embedding size; it is only needed when chunks is empty.
+    """
+    if codec is None:
+        codec = "zstd" if zstandard is not None else "zlib"
+    compress = _compressor(codec)
+    os.makedirs(path, exist_ok=True)
+
+    records = np.zeros(len(chunks), dtype=RECORD_DTYPE)
+    sources = {}
+    blocks = []
+    pending, pending_size = [], 0
+    with open(os.path.join(path, "blocks.bin"), 'wb') as out:
+        def flush():
+            nonlocal pending, pending_size
+            if pending:
+                data = compress(b"".join(pending))
+                blocks.append((out.tell(), len(data)))
+                out.write(data)
+                pending, pending_size = [], 0
+
+        for i, doc in enumerate(chunks):
+            text = doc.page_content.encode('utf-8')
+            if pending_size and pending_size + len(text) > block_bytes:
+                flush()
+            meta = doc.metadata or {}
+            page = meta.get("page")
+            records[i] = (len(blocks), pending_size, len(text),
+                          page if isinstance(page, int) else -1,
+                          sources.setdefault(meta.get("source") or "", len(sources)),
+                          (meta.get("lang") or "").encode('ascii'),
+                          article_id(doc.page_content).encode('ascii'))
+            pending.append(text)
+            pending_size += len(text)
+        flush()
+
+    np.save(os.path.join(path, "records.npy"), records)
+    np.save(os.path.join(path, "blocks.npy"), np.asarray(blocks, dtype="<u8").reshape(-1, 2))
+    if len(chunks):
+        vectors = np.asarray(vectors, dtype=np.float16).reshape(len(chunks), -1)
+    else:
+        vectors = np.zeros((0, dimension or 0), dtype=np.float16)
+    np.save(os.path.join(path, "vectors.npy"), vectors)
+    with open(os.path.join(path, "store.json"), 'w', encoding='utf-8') as f:
+        json.dump({"codec": codec, "count": len(chunks), "blocks": len(blocks),
+                   "sources": sorted(sources, key=sources.get)}, f)
+
+
+class ChunkStore:
+    """Memory-mapped, read-only view of a chunk store directory"""
+
+    def __init__(self, path, cached_blocks=64):
+        with open(os.path.join(path, "store.json"), 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        self.path = path
+        self.codec = header["codec"]
+        self.sources = header["sources"]
+        self.records = np.load(os.path.join(path, "records.npy"), mmap_mode='r')
+        self.blocks = np.load(os.path.join(path, "blocks.npy"), mmap_mode='r')
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode='r')
+        with open(os.path.join(path, "blocks.bin"), 'rb') as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(f.name) else b""
+        if self.codec == "zstd":
+            # ZstdDecompressor instances are not thread-safe: one per request thread
+            local = threading.local()
+
+            def decompress(data):
+                decompressor = getattr(local, "decompressor", None)
+                if decompressor is None:
+                    decompressor = local.decompressor = zstandard.ZstdDecompressor()
+                return decompressor.decompress(data)
+            self._decompress = decompress
+        elif self.codec == "zlib":
+            self._decompress = zlib.decompress
+        else:
+            self._decompress = None
+        self._cache = OrderedDict()
+        self._cache_size = cached_blocks
+        self._lock = threading.Lock()
+        self._lang_ids = {}
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(os.path.join(path, "store.json"))
+
+    def __len__(self):
+        return len(self.records)
+
+    def _block(self, n):
+        start, size = (int(v) for v in self.blocks[n])
+        raw = memoryview(self._data)[start:start + size]
+        if self._decompress is None:
+            return raw  # Uncompressed: a zero-copy view of the mapped file
+        with self._lock:
+            block = self._cache.get(n)
+            if block is not None:
+                self._cache.move_to_end(n)
+                return block
+        block = memoryview(self._decompress(raw))
+        with self._lock:
+            self._cache[n] = block
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return block
+
+    def ids_for_lang(self, lang):
+        """Ids of the chunks tagged with a language, ascending"""
+        ids = self._lang_ids.get(lang)
+        if ids is None:
+            ids = self._lang_ids[lang] = np.flatnonzero(self.records["lang"] == lang.encode('ascii'))
+        return ids
+
+    def nearest(self, query_vec, k, lang=None):
+        """Ids of the k chunks whose vectors score highest against query_vec (optionally one language)"""
+        ids = self.ids_for_lang(lang) if lang else np.arange(len(self))
+        if not len(ids):
+            return ids
+        scores = np.asarray(self.vectors[ids], dtype=np.float32) @ np.asarray(query_vec, dtype=np.float32)
+        return ids[np.argsort(-scores)[:k]]
+
+    def text(self, chunk_id):
+        record = self.records[chunk_id]
+        offset = int(record["offset"])
+        return bytes(self._block(int(record["block"]))[offset:offset + int(record["length"])]).decode('utf-8')
+
+    def metadata(self, chunk_id):
+        record = self.records[chunk_id]
+        meta = {"source": self.sources[int(record["source"])], "chunk_id": int(chunk_id)}
+        if record["page"] >= 0:
+            meta["page"] = int(record["page"])
+        if record["lang"]:
+            meta["lang"] = record["lang"].decode('ascii')
+        if record["article"]:
+            meta["article"] = record["article"].decode('ascii')
+        return meta
+
+    def close(self):
+        """Release the memory maps; the store can't be read afterwards"""
+        with self._lock:
+            self._cache.clear()
+        data, self._data = self._data, b""
+        # Dropping the arrays unmaps them once no reader still holds a slice
+        self.records = self.blocks = self.vectors = None
+        if isinstance(data, mmap.mmap):
+            try:
+                data.close()
+            except BufferError:
+                pass  # A reader still holds a view; the map goes away when it is collected
+
+    def disk_bytes(self):
+        return sum(os.path.getsize(os.path.join(self.path, name)) for name in os.listdir(self.path))
@@ -43,3 +43,144 @@ LOCAL_LLM_ID = "microsoft/DialoGPT-small"  # Small model (117M parameters) - muc
 # LOCAL_LLM_ID = "distilbert-base-uncased"  # Very small model (66M parameters)
 # LOCAL_LLM_ID = "google/flan-t5-small"  # Small T5 model (60M parameters)
 # LOCAL_LLM_ID = "facebook/opt-125m"  # Small OPT model (125M parameters)
+
+# Background index builds
+# Reindex jobs build into RAG_PERSIST_DIR/versions/<version> and swap the live index when done
+RAG_KEEP_VERSIONS = 2  # Index versions kept on disk, including the live one
+RAG_BUILD_BATCH_SIZE = 64  # Chunks embedded per batch while building (progress granularity)
+RAG_BUILD_RETRY_SECONDS = 60  # After a failed background build, requests wait this long before starting another
+INDEX_JOB_HISTORY = 20  # Finished jobs kept for /api/jobs/<id> lookups
+
+# Pinecone bulk upload (used when the index is empty or on reindex)
+PINECONE_UPSERT_BATCH_SIZE = 100  # Vectors per upsert request
+PINECONE_UPSERT_WORKERS = 4  # Parallel embed+upsert workers
+PINECONE_UPSERT_MAX_RETRIES = 5  # Retries per batch with exponential backoff
+PINECONE_CHECKPOINT_PATH = "pinecone_upload_checkpoint.json"  # Finished batches, for resuming
+PINECONE_STATS_CACHE_PATH = "pinecone_index_stats.json"  # Cached describe_index_stats()
+PINECONE_STATS_TTL = 3600  # Seconds before index stats are fetched again
+PINECONE_MANIFEST_PATH = "pinecone_upload_manifest.json"  # Ids of the last finished upload, for deleting stale vectors
+
+# LLM admission control
+LLM_MAX_CONCURRENCY = 2  # Generations allowed to run at once
+LLM_MAX_QUEUE = 8  # Requests allowed to wait for a generation slot
+LLM_QUEUE_TIMEOUT = 20  # Seconds a queued request waits before giving up
+LLM_OVERLOAD_MODE = "degrade"  # "degrade" = extractive answer, "reject" = 503 with Retry-After
+PRIORITY_ISSUE_TYPES = ("sexual_assault", "criminal")  # Answered rule-based immediately, never queued
+
+# Multi-model pool and router
+# Models are loaded on first use; least recently used ones are evicted to stay under the RAM budget
+LLM_MODELS = {
+    "small": {"model_id": LOCAL_LLM_ID, "est_ram_mb": 600},
+    "large": {"model_id": "google/flan-t5-large", "est_ram_mb": 3200},  # 780M params, fits the budget in fp32
+}
+# Each entry may also set "load_mode" to override LLM_LOAD_MODE for that model
+LLM_DEFAULT_MODEL = "small"  # Used for simple questions and whenever the routed model can't load
+LLM_POOL_RAM_BUDGET_MB = 4096  # Total RAM the pool may use for model weights
+LLM_LOAD_RETRY_SECONDS = 300  # After a failed load, the model is skipped for this long before retrying
+LLM_ROUTER = {
+    "complex_model": "large",  # Model for long/complex questions (must fit the budget to be used)
+    "min_question_words": 30,  # Questions at least this long count as complex
+    "min_context_chars": 4000,  # Retrieved context at least this large counts as complex
+    "complex_keywords": ("compare", "difference between", "explain in detail", "analyse", "analyze"),
+}
+
+# Low-memory model loading (benchmark with: python bench_llm.py)
+LLM_LOAD_MODE = "fp32"  # "fp32", "bf16" (half the RAM) or "int8" (dynamic int8 Linear layers, CPU)
+LLM_LOW_CPU_MEM_USAGE = True  # Stream weights while loading instead of holding two copies
+LLM_IDLE_UNLOAD_MINUTES = 30  # Free a model after this many idle minutes (0 = keep forever)
+
+# Static asset pipeline (run: python build_assets.py)
+ASSET_BUILD_DIR = "static/build"  # Prebuilt pages, photo variants and manifest.json
+ASSET_IMAGE_WIDTHS = (160, 320, 640)  # Widths of the resized WebP/JPEG photo variants
+ASSET_IMAGE_SIZES = "80px"  # sizes attribute for the team photos (rendered at 80 CSS px)
+
+# Bilingual indexing
+RAG_LANGUAGE_SPLIT = True  # Index English and Hindi text of each page as separate, language-tagged chunks
+
+# Document upload analysis
+UPLOAD_DIR = "uploads"  # Uploads are kept here only until their text is extracted
+UPLOAD_MAX_MB = 50  # Largest accepted upload
+UPLOAD_EXTRACT_WORKERS = 2  # Processes used for PDF/DOCX text extraction
+UPLOAD_INDEX_TTL_MINUTES = 30  # Per-document indexes expire after this long without questions
+UPLOAD_INDEX_MEMORY_MB = 256  # Cap on the total memory of all per-document indexes
+UPLOAD_TOP_K = 4  # Document chunks used to answer each question
+
+# Conversation sessions for /api/ask (memory ~ SESSION_MAX_COUNT x SESSION_MAX_CHUNKS x ~3 KB)
+SESSION_MAX_COUNT = 1000  # Sessions kept in memory; least recently used are evicted
+SESSION_TTL_MINUTES = 30  # Idle sessions expire after this long
+SESSION_MAX_TURNS = 6  # Recent questions kept per session
+SESSION_MAX_CHUNKS = 12  # Retrieved chunks (and their embeddings) kept per session
+SESSION_RERANK_MIN_SCORE = 0.45  # Cosine score needed to answer a follow-up from cached chunks
+
+# Answer warehouse (build with: python build_answer_warehouse.py --from-db)
+ANSWER_WAREHOUSE_DIR = "answer_warehouse"  # answers.json + memory-mapped question embeddings
+ANSWER_WAREHOUSE_ENABLED = True  # Check precomputed answers before live generation in /api/ask
+ANSWER_WAREHOUSE_MIN_SIMILARITY = 0.92  # Cosine similarity needed for a non-exact question match
+
+# Early-stop of degenerate generations (aborts inside generate(), then falls back immediately)
+LLM_EARLY_STOP = True
+LLM_EARLY_STOP_LOOP_REPEATS = 4  # A 2-8 token phrase repeated this many times in a row is a loop
+LLM_ECHO_MARKERS = (  # Prompt-template text that means the model is echoing its prompt
+    "1. Immediate Actions Required",
+    "Answer:",
+    "Context from Constitution of India",
+    "Constitutional Context:",
+    "User Question:",
+    "Uploaded document excerpts",
+)
+
+# Logging (written by a background thread; request threads never block on log I/O)
+LOG_LEVEL = "INFO"  # DEBUG includes per-request events
+LOG_FORMAT = "json"  # "json" (one object per line) or "text"
+LOG_DEBUG_SAMPLE_RATE = 0.01  # Fraction of DEBUG records kept
+LOG_QUEUE_SIZE = 10000  # Records buffered for the writer; extra records are dropped, not waited on
+
+# Serving (python asgi.py; app.py's __main__ is the development server)
+SERVER_HOST = "0.0.0.0"
+SERVER_PORT = 5000
+FLASK_DEBUG = False  # Only affects the development server
+ASGI_WORKERS = 1  # Processes; each one loads its own models
+ASGI_HANDLER_THREADS = 16  # Threads per process that run Flask handlers (retrieval, generation)
+ASGI_MAX_BODY_MB = 55  # Larger request bodies are refused before they reach a handler thread
+ASGI_DRAIN_TIMEOUT = 60  # Seconds in-flight requests get to finish on shutdown
+
+# Query normalization (case folding, abbreviations, spelling correction against the indexed corpus)
+SPELL_CORRECTION = True
+SPELL_MAX_EDIT_DISTANCE = 2
+SPELL_MIN_WORD_COUNT = 2  # Corpus words seen fewer times (often PDF extraction noise) are not correction targets
+SPELL_ENGLISH_FREQ_PATH = "model_cache/english_word_freq.txt"  # Optional general English "word count" list (e.g. count_1w.txt)
+SPELL_ENGLISH_MAX_WORDS = 20000  # Most frequent English words that are also correction targets
+SPELL_VALID_WORD_RATIO = 20.0  # A word from the English list is only replaced by a word this many times more frequent
+PINECONE_VOCAB_PATH = "pinecone_vocab.json"
+
+# Retrieval: score-aware adaptive top-k with MMR de-duplication (cosine similarities)
+RAG_ADAPTIVE_RETRIEVAL = True  # False: plain top-RAG_TOP_K similarity search
+RAG_TOP_K = 6  # Most chunks returned
+RAG_FETCH_K = 20  # Candidates scored before cutting
+RAG_LANG_OVERFETCH = 3  # Language-partitioned chunk stores fetch this many times RAG_FETCH_K and filter locally
+RAG_MIN_SCORE = 0.30  # Weaker hits are dropped (the best hit is always kept)
+RAG_SCORE_GAP = 0.08  # A drop this large between consecutive hits ends the list
+RAG_MMR_LAMBDA = 0.7  # 1.0 = pure relevance; lower favours diversity
+RAG_DUPLICATE_SIM = 0.95  # Chunks this similar to an already chosen one are dropped
+
+# Embeddings backend: "torch" (sentence-transformers) or "onnx" (ONNX Runtime, exported once on first use)
+EMBEDDINGS_BACKEND = "torch"
+EMBEDDINGS_ONNX_DIR = "model_cache/onnx"
+EMBEDDINGS_ONNX_VARIANT = "int8"  # "int8" (dynamically quantized) or "fp32"
+EMBEDDINGS_ONNX_THREADS = 0  # 0 = ONNX Runtime default
+EMBEDDINGS_PARITY_MIN_COSINE = 0.99  # Minimum cosine vs torch embeddings for the ONNX model to be used
+
+# Legal database (training_data, legal_documents; bulk loads via python legal_db.py)
+LEGAL_DB_PATH = "legal_database.db"
+DB_IMPORT_BATCH_SIZE = 5000  # Rows per insert transaction
+
+# Query-embedding micro-batching: concurrent embed_query calls share one batched encode
+EMBEDDINGS_MICRO_BATCH = True
+EMBEDDINGS_BATCH_MAX = 64  # Most queries encoded together
+EMBEDDINGS_BATCH_WAIT_MS = 2.0  # How long the first query in a batch waits for company
+
+# Traffic capture: sanitized /api/ask, /api/legal_qa and /api/deepseek_legal requests as JSONL (replay_traffic.py)
+TRAFFIC_CAPTURE = False
+TRAFFIC_CAPTURE_PATH = "traffic_capture.jsonl"
+TRAFFIC_CAPTURE_SAMPLE_RATE = 1.0  # Fraction of requests recorded
+TRAFFIC_CAPTURE_MAX_MB = 200  # Recording stops once the file reaches this size
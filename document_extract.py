@@ -0,0 +1,73 @@
+# LawHub document text extraction
+#
+# Runs inside a process pool, so this module only imports the standard library and pypdf
+# (worker processes must not pull in Flask, LangChain or torch).
+
+import os
+import re
+import zipfile
+from xml.etree import ElementTree
+
+_WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+RISK_TERMS = {
+    "termination": ["terminate", "termination"],
+    "penalty": ["penalty", "liquidated damages", "forfeit"],
+    "indemnity": ["indemnify", "indemnification", "hold harmless"],
+    "liability": ["liability", "liable"],
+    "arbitration": ["arbitration", "arbitrator"],
+    "non_compete": ["non-compete", "non compete", "restraint of trade"],
+    "confidentiality": ["confidential", "non-disclosure"],
+    "auto_renewal": ["automatically renew", "auto-renew", "automatic renewal"],
+}
+
+
+def _pdf_pages(path):
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    return [(i + 1, page.extract_text() or "") for i, page in enumerate(reader.pages)]
+
+
+def _docx_pages(path):
+    """Paragraph text of a .docx (no page info in the format, so everything is page 1)"""
+    with zipfile.ZipFile(path) as zf:
+        with zf.open("word/document.xml") as f:
+            tree = ElementTree.parse(f)
+    paragraphs = []
+    for para in tree.iter(f"{_WORD_NS}p"):
+        text = "".join(node.text or "" for node in para.iter(f"{_WORD_NS}t"))
+        if text.strip():
+            paragraphs.append(text)
+    return [(1, "\n".join(paragraphs))]
+
+
+def _risk_flags(pages, max_per_term=3):
+    flags = {}
+    for page_no, text in pages:
+        for sentence in re.split(r'(?<=[.;])\s+', text):
+            lowered = sentence.lower()
+            for term, keywords in RISK_TERMS.items():
+                if any(k in lowered for k in keywords) and len(flags.setdefault(term, [])) < max_per_term:
+                    flags[term].append({"page": page_no, "text": sentence.strip()[:300]})
+    return flags
+
+
+def extract_document(path):
+    """Extract (page, text) pairs plus cheap stats and risk flags from a PDF or DOCX file"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pdf":
+        pages = _pdf_pages(path)
+    elif ext == ".docx":
+        pages = _docx_pages(path)
+    elif ext == ".txt":
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            pages = [(1, f.read())]
+    else:
+        raise ValueError(f"Unsupported document type: {ext}")
+
+    return {
+        "pages": pages,
+        "page_count": len(pages),
+        "word_count": sum(len(text.split()) for _, text in pages),
+        "risk_flags": _risk_flags(pages),
+    }
@@ -0,0 +1,137 @@
+# LawHub query-embedding micro-batcher
+#
+# Wraps an embeddings model so concurrent embed_query calls from different request
+# threads share one forward pass. Callers queue their text and wait on a future. A single
+# worker thread takes the first waiting query, collects whatever else arrives within a
+# short window (or until the batch is full), encodes the batch with embed_documents and
+# hands each caller its vector. Under light load a query waits at most the window. Under
+# heavy load queries pile up while the previous batch is encoding, so batches grow with
+# traffic. Identical texts in a batch are encoded once. embed_documents calls (index
+# builds, upload indexing) are already batched and bypass the queue.
+
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from queue import Empty, SimpleQueue
+
+from langchain_core.embeddings import Embeddings
+
+
+class BatchingEmbeddings(Embeddings):
+    """Embeddings wrapper that coalesces concurrent embed_query calls into batched encodes"""
+
+    def __init__(self, inner, max_batch=64, max_wait_ms=2.0):
+        self.inner = inner
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = SimpleQueue()
+        self._closed = False
+        self._close_lock = threading.Lock()  # Orders every enqueue before or after the stop marker
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._queries = 0
+        self._unique = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._encode_seconds = 0.0
+        self._sizes = Counter()  # Batch size histogram, in power-of-two buckets
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def embed_documents(self, texts):
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text):
+        future = Future()
+        with self._close_lock:
+            queued = not self._closed
+            if queued:
+                self._queue.put((text, time.perf_counter(), future))
+        if not queued:
+            return self.inner.embed_query(text)
+        return future.result()
+
+    def _collect(self):
+        """Block for one query, then gather more until the window closes or the batch is full"""
+        batch = [self._queue.get()]
+        if batch[0] is None:
+            return None
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except Empty:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except Empty:
+                    break
+            if item is None:
+                self._queue.put(None)  # Finish this batch, then stop
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            unique = list(dict.fromkeys(text for text, _, _ in batch))
+            try:
+                vectors = dict(zip(unique, self.inner.embed_documents(unique)))
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            encoded = time.perf_counter()
+            for text, _, future in batch:
+                future.set_result(vectors[text])
+
+            waits = [started - queued for _, queued, _ in batch]
+            with self._stats_lock:
+                self._batches += 1
+                self._queries += len(batch)
+                self._unique += len(unique)
+                self._wait_seconds += sum(waits)
+                self._max_wait_seconds = max(self._max_wait_seconds, max(waits))
+                self._encode_seconds += encoded - started
+                self._sizes[1 << (len(batch) - 1).bit_length()] += 1
+
+    def close(self):
+        """Stop the worker after the queries already queued; later calls encode directly"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._worker.join(timeout=5)
+        # Nothing is queued after the marker; this only matters if the worker didn't stop in time
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except Empty:
+                break
+            if item is not None:
+                try:
+                    item[2].set_result(self.inner.embed_query(item[0]))
+                except Exception as e:
+                    item[2].set_exception(e)
+
+    def stats(self):
+        with self._stats_lock:
+            batches, queries = self._batches, self._queries
+            return {
+                "batches": batches,
+                "queries": queries,
+                "avg_batch_size": round(queries / batches, 2) if batches else None,
+                "batch_sizes": {f"<={size}": n for size, n in sorted(self._sizes.items())},
+                "duplicates_merged": queries - self._unique,
+                "avg_wait_ms": round(self._wait_seconds / queries * 1000, 2) if queries else None,
+                "max_wait_ms": round(self._max_wait_seconds * 1000, 2),
+                "avg_encode_ms": round(self._encode_seconds / batches * 1000, 2) if batches else None,
+            }
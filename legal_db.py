@@ -0,0 +1,336 @@
+# LawHub legal database (legal_database.db)
+#
+# Streaming bulk import/export for the training_data and legal_documents tables, plus
+# per-(country, category) row counts kept in <table>_stats. The counts are updated in
+# the same transaction as every insert made through this module, so reading stats never
+# scans the data tables. Connections use WAL mode, so readers are not blocked while a
+# bulk load is writing.
+#
+#   python legal_db.py import training_data qa.csv
+#   python legal_db.py import legal_documents --dataset some/dataset --split train --map content=text
+#   python legal_db.py export training_data --format jsonl -o training.jsonl
+#   python legal_db.py rebuild-stats
+
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+
+from config import LEGAL_DB_PATH, DB_IMPORT_BATCH_SIZE
+
+TABLES = {
+    "training_data": {
+        "columns": ("question", "answer", "country", "category", "source"),
+        "required": ("question", "answer"),
+        "defaults": {"country": "General", "category": "General", "source": "HuggingFace"},
+        "ddl": """CREATE TABLE IF NOT EXISTS training_data (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                country TEXT DEFAULT 'General',
+                category TEXT DEFAULT 'General',
+                source TEXT DEFAULT 'HuggingFace',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )""",
+    },
+    "legal_documents": {
+        "columns": ("title", "content", "country", "category", "source", "url"),
+        "required": ("title", "content"),
+        "defaults": {"country": "General", "category": "General", "source": "Government", "url": None},
+        "ddl": """CREATE TABLE IF NOT EXISTS legal_documents (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                content TEXT NOT NULL,
+                country TEXT DEFAULT 'General',
+                category TEXT DEFAULT 'General',
+                source TEXT DEFAULT 'Government',
+                url TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )""",
+    },
+}
+EXPORT_FORMATS = ("jsonl", "csv")
+
+
+def _stats_table(table):
+    return f"{table}_stats"
+
+
+_schema_lock = threading.Lock()
+_schema_ready = set()  # Database paths whose schema this process has already ensured
+
+
+def _ensure_schema(conn):
+    """Switch to WAL and create missing tables, backfilling new stats tables, in one write transaction"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for table, spec in TABLES.items():
+            conn.execute(spec["ddl"])
+            stats = _stats_table(table)
+            exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (stats,)).fetchone()
+            conn.execute(f"""CREATE TABLE IF NOT EXISTS {stats} (
+                country TEXT NOT NULL, category TEXT NOT NULL, count INTEGER NOT NULL,
+                PRIMARY KEY (country, category))""")
+            if not exists:
+                conn.execute(f"""INSERT INTO {stats} (country, category, count)
+                    SELECT COALESCE(country, 'General'), COALESCE(category, 'General'), COUNT(*)
+                    FROM {table} GROUP BY 1, 2""")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def connect(path=LEGAL_DB_PATH):
+    """Open the database in WAL mode, creating missing tables (and backfilling their stats) once per process"""
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    key = os.path.abspath(path)
+    with _schema_lock:
+        if key not in _schema_ready:
+            _ensure_schema(conn)
+            _schema_ready.add(key)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _row_values(spec, record):
+    """Column tuple for one source record, or None if a required field is empty"""
+    values = []
+    for column in spec["columns"]:
+        value = record.get(column)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in (None, ""):
+            if column in spec["required"]:
+                return None
+            value = spec["defaults"].get(column)
+        values.append(value)
+    return tuple(values)
+
+
+def _insert_batch(conn, table, spec, rows):
+    """Insert rows and bump their stats counters in one transaction"""
+    country_idx = spec["columns"].index("country")
+    category_idx = spec["columns"].index("category")
+    counts = Counter((row[country_idx], row[category_idx]) for row in rows)
+    placeholders = ", ".join("?" for _ in spec["columns"])
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(f"INSERT INTO {table} ({', '.join(spec['columns'])}) VALUES ({placeholders})", rows)
+        conn.executemany(f"""INSERT INTO {_stats_table(table)} (country, category, count) VALUES (?, ?, ?)
+            ON CONFLICT(country, category) DO UPDATE SET count = count + excluded.count""",
+                         [(country, category, n) for (country, category), n in counts.items()])
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def insert_rows(conn, table, records, batch_size=DB_IMPORT_BATCH_SIZE, progress=None):
+    """Stream dict records into table in batched transactions; returns import stats.
+
+    Records missing a required field are skipped. progress, if given, is called with the
+    number of rows inserted so far after every batch.
+    """
+    spec = TABLES[table]
+    started = time.time()
+    inserted = skipped = 0
+    batch = []
+    for record in records:
+        row = _row_values(spec, record)
+        if row is None:
+            skipped += 1
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _insert_batch(conn, table, spec, batch)
+            inserted += len(batch)
+            batch = []
+            if progress is not None:
+                progress(inserted)
+    if batch:
+        _insert_batch(conn, table, spec, batch)
+        inserted += len(batch)
+    elapsed = time.time() - started
+    return {
+        "table": table,
+        "inserted": inserted,
+        "skipped": skipped,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(inserted / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def rebuild_stats(conn):
+    """Recount the stats tables from scratch (after writes that bypassed this module)"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for table in TABLES:
+            conn.execute(f"DELETE FROM {_stats_table(table)}")
+            conn.execute(f"""INSERT INTO {_stats_table(table)} (country, category, count)
+                SELECT COALESCE(country, 'General'), COALESCE(category, 'General'), COUNT(*)
+                FROM {table} GROUP BY 1, 2""")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def table_stats(conn, table):
+    """Totals and per-country / per-category counts, read from the stats table only"""
+    total, by_country, by_category = 0, Counter(), Counter()
+    for country, category, count in conn.execute(f"SELECT country, category, count FROM {_stats_table(table)}"):
+        total += count
+        by_country[country] += count
+        by_category[category] += count
+    return {
+        "total": total,
+        "country_specific": total - by_country.get("General", 0),
+        "by_country": dict(by_country.most_common()),
+        "by_category": dict(by_category.most_common()),
+    }
+
+
+# -----------------------
+# Sources
+# -----------------------
+
+def iter_csv(stream):
+    """Dict rows from a CSV text stream with a header line"""
+    yield from csv.DictReader(stream)
+
+
+def iter_jsonl(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_dataset(name, split="train", config_name=None):
+    """Rows of a Hugging Face dataset, streamed (nothing is downloaded up front)"""
+    from datasets import load_dataset
+    yield from load_dataset(name, config_name, split=split, streaming=True)
+
+
+def remap(records, mapping):
+    """Rename source fields to table columns, e.g. {"question": "instruction"}"""
+    for record in records:
+        if mapping:
+            record = {**record, **{column: record.get(field) for column, field in mapping.items()}}
+        yield record
+
+
+def records_from_stream(stream, fmt):
+    if fmt == "csv":
+        return iter_csv(stream)
+    if fmt == "jsonl":
+        return iter_jsonl(stream)
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def format_from_filename(filename, default="jsonl"):
+    ext = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    return {"csv": "csv", "jsonl": "jsonl", "ndjson": "jsonl", "json": "jsonl"}.get(ext, default)
+
+
+# -----------------------
+# Export
+# -----------------------
+
+def export_rows(conn, table, fmt="jsonl", fetch_size=1000):
+    """Yield the table as text chunks (JSONL lines or CSV with a header), streaming from the cursor"""
+    if table not in TABLES or fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Cannot export {table} as {fmt}")
+    columns = ("id",) + TABLES[table]["columns"] + ("created_at",)
+    cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id")
+    buf = io.StringIO()
+    writer = csv.writer(buf) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(columns)
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            break
+        for row in rows:
+            if writer is not None:
+                writer.writerow(row)
+            else:
+                buf.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+                buf.write("\n")
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export for legal_database.db")
+    parser.add_argument("--db", default=LEGAL_DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="Stream rows from CSV, JSONL or a datasets source into a table")
+    imp.add_argument("table", choices=sorted(TABLES))
+    imp.add_argument("path", nargs="?", help="CSV or JSONL file ('-' for stdin)")
+    imp.add_argument("--format", choices=("csv", "jsonl"), help="Default: from the file extension")
+    imp.add_argument("--dataset", help="Hugging Face dataset name instead of a file")
+    imp.add_argument("--dataset-config")
+    imp.add_argument("--split", default="train")
+    imp.add_argument("--map", action="append", default=[], metavar="COLUMN=FIELD",
+                     help="Read a table column from a differently named source field")
+    imp.add_argument("--set", action="append", default=[], metavar="COLUMN=VALUE",
+                     help="Fixed value for a column missing from the source (e.g. country=India)")
+    imp.add_argument("--batch-size", type=int, default=DB_IMPORT_BATCH_SIZE)
+
+    exp = sub.add_parser("export", help="Stream a table out as JSONL or CSV")
+    exp.add_argument("table", choices=sorted(TABLES))
+    exp.add_argument("--format", choices=EXPORT_FORMATS, default="jsonl")
+    exp.add_argument("-o", "--output", help="Output file (default: stdout)")
+
+    sub.add_parser("rebuild-stats", help="Recount the materialized stats tables")
+    sub.add_parser("stats", help="Print the materialized stats")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.command == "import":
+        mapping = dict(item.split("=", 1) for item in args.map)
+        fixed = dict(item.split("=", 1) for item in args.set)
+        if args.dataset:
+            records = iter_dataset(args.dataset, args.split, args.dataset_config)
+        elif args.path:
+            stream = sys.stdin if args.path == "-" else open(args.path, 'r', encoding='utf-8', newline='')
+            records = records_from_stream(stream, args.format or format_from_filename(args.path))
+        else:
+            parser.error("give a file path or --dataset")
+        records = remap(records, mapping)
+        if fixed:
+            records = ({**fixed, **{k: v for k, v in r.items() if v not in (None, "")}} for r in records)
+        result = insert_rows(conn, args.table, records, args.batch_size,
+                             progress=lambda n: print(f"   {n} rows...", file=sys.stderr))
+        print(f"✅ Imported {result['inserted']} rows into {args.table} ({result['skipped']} skipped) "
+              f"in {result['seconds']}s ({result['rows_per_second']} rows/s)")
+    elif args.command == "export":
+        out = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+        try:
+            for chunk in export_rows(conn, args.table, args.format):
+                out.write(chunk)
+        finally:
+            if args.output:
+                out.close()
+    elif args.command == "rebuild-stats":
+        rebuild_stats(conn)
+        print("✅ Stats rebuilt")
+    else:
+        print(json.dumps({table: table_stats(conn, table) for table in TABLES}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
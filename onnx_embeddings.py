@@ -0,0 +1,199 @@
+# LawHub ONNX Runtime embeddings
+#
+# Exports the sentence-transformer once to an ONNX graph (plus a dynamically quantized
+# int8 copy) under model_cache/onnx/. At serve time it runs with ONNX Runtime and the
+# Rust `tokenizers` library, so embedding needs neither torch nor transformers. The
+# export records the cosine similarity of each variant against the torch embeddings,
+# and a variant below the configured minimum is refused.
+#
+#   python onnx_embeddings.py            # export (or re-export) and print the parity check
+
+import json
+import os
+import shutil
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import HUGGINGFACE_EMBEDDINGS_MODEL, EMBEDDINGS_ONNX_DIR
+
+PARITY_TEXTS = [
+    "What does Article 21 of the Constitution of India say about the right to life?",
+    "Can the police arrest me without a warrant?",
+    "Writ of habeas corpus under Article 32",
+    "The State shall not deny to any person equality before the law or the equal protection of the laws within the territory of India.",
+    "Right to constitutional remedies",
+    "How do I file for divorce and custody of my children?",
+    "मौलिक अधिकार क्या हैं?",
+    "Directive Principles of State Policy are not enforceable by any court.",
+]
+_META_FILE = "export.json"
+
+
+def model_dir(model_name, cache_dir=EMBEDDINGS_ONNX_DIR):
+    return os.path.join(cache_dir, model_name.replace("/", "--"))
+
+
+def _cosines(a, b):
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    return (a * b).sum(1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def export_onnx(model_name=HUGGINGFACE_EMBEDDINGS_MODEL, cache_dir=EMBEDDINGS_ONNX_DIR, opset=14):
+    """Export model_name to <cache_dir>/<model>/model.onnx and model.int8.onnx, with a parity check.
+
+    Needs torch, transformers, sentence-transformers and onnxruntime (once, at export time).
+    """
+    import torch
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+    from transformers import AutoModel, AutoTokenizer
+
+    out_dir = model_dir(model_name, cache_dir)
+    tmp_dir = f"{out_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    reference = SentenceTransformer(model_name, device="cpu")
+    max_length = int(reference.max_seq_length or tokenizer.model_max_length)
+
+    class Encoder(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.inner(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids).last_hidden_state
+
+    sample = tokenizer(["export sample", "a longer export sample sentence"], padding=True, return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    raw_path = os.path.join(tmp_dir, "model.raw.onnx")
+    with torch.no_grad():
+        torch.onnx.export(Encoder(model), tuple(sample[n] for n in input_names), raw_path,
+                          input_names=input_names, output_names=["last_hidden_state"],
+                          dynamic_axes={n: {0: "batch", 1: "sequence"} for n in input_names + ["last_hidden_state"]},
+                          opset_version=opset, do_constant_folding=True)
+
+    # Store the graph with portable (basic) optimizations applied; the rest happen at load time
+    opts = ort.SessionOptions()
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+    opts.optimized_model_filepath = os.path.join(tmp_dir, "model.onnx")
+    ort.InferenceSession(raw_path, opts, providers=["CPUExecutionProvider"])
+    os.remove(raw_path)
+    quantize_dynamic(os.path.join(tmp_dir, "model.onnx"), os.path.join(tmp_dir, "model.int8.onnx"),
+                     weight_type=QuantType.QInt8)
+
+    tokenizer.save_pretrained(tmp_dir)
+    meta = {
+        "model": model_name,
+        "max_length": max_length,
+        "pad_token": tokenizer.pad_token,
+        "pad_id": tokenizer.pad_token_id,
+        "dimension": reference.get_sentence_embedding_dimension(),
+        "parity": {},
+    }
+    with open(os.path.join(tmp_dir, _META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    expected = reference.encode(PARITY_TEXTS, normalize_embeddings=True)
+    for variant in ("fp32", "int8"):
+        cos = _cosines(OnnxEmbeddings(tmp_dir, variant).embed_documents(PARITY_TEXTS), expected)
+        meta["parity"][variant] = {"min_cosine": round(float(cos.min()), 6), "mean_cosine": round(float(cos.mean()), 6)}
+    with open(os.path.join(tmp_dir, _META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return meta
+
+
+class OnnxEmbeddings(Embeddings):
+    """Mean-pooled, L2-normalized sentence embeddings computed with ONNX Runtime"""
+
+    def __init__(self, path, variant="int8", threads=0, batch_size=32):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(path, _META_FILE), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.variant = variant
+        self.batch_size = batch_size
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+        model_file = "model.int8.onnx" if variant == "int8" else "model.onnx"
+        self._session = ort.InferenceSession(os.path.join(path, model_file), opts, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self._session.get_inputs()}
+
+        self._tokenizer = Tokenizer.from_file(os.path.join(path, "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=self.meta["max_length"])
+        self._tokenizer.enable_padding(pad_id=self.meta["pad_id"], pad_token=self.meta["pad_token"])
+
+    def _encode(self, texts):
+        encodings = self._tokenizer.encode_batch(list(texts))
+        mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": np.asarray([e.ids for e in encodings], dtype=np.int64), "attention_mask": mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.asarray([e.type_ids for e in encodings], dtype=np.int64)
+        hidden = self._session.run(None, feeds)[0]
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        # Batch texts of similar length together so little compute goes into padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out = np.empty((len(texts), self.meta["dimension"]), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            out[idx] = self._encode([texts[i] for i in idx])
+        return out.tolist()
+
+    def embed_query(self, text):
+        return self._encode([text])[0].tolist()
+
+
+def load_onnx_embeddings(model_name=HUGGINGFACE_EMBEDDINGS_MODEL, cache_dir=EMBEDDINGS_ONNX_DIR,
+                         variant="int8", threads=0, min_cosine=0.99):
+    """OnnxEmbeddings for model_name, exporting it first if the cache is empty.
+
+    Raises ValueError if the variant failed its parity check against the torch model.
+    """
+    path = model_dir(model_name, cache_dir)
+    if not os.path.exists(os.path.join(path, _META_FILE)):
+        export_onnx(model_name, cache_dir)
+    # Checked before a session is created, so a failing variant costs no model load
+    with open(os.path.join(path, _META_FILE), 'r', encoding='utf-8') as f:
+        parity = json.load(f).get("parity", {}).get(variant, {})
+    if parity.get("min_cosine", 0.0) < min_cosine:
+        raise ValueError(f"ONNX {variant} embeddings fail the parity check "
+                         f"(min cosine {parity.get('min_cosine')} < {min_cosine})")
+    return OnnxEmbeddings(path, variant, threads)
+
+
+def load_embeddings(load_torch, model_name=HUGGINGFACE_EMBEDDINGS_MODEL, cache_dir=EMBEDDINGS_ONNX_DIR,
+                    variant="int8", threads=0, min_cosine=0.99):
+    """ONNX embeddings if they load and pass the parity check, otherwise load_torch().
+
+    Returns (embeddings, the reason ONNX was not used or None).
+    """
+    try:
+        return load_onnx_embeddings(model_name, cache_dir, variant, threads, min_cosine), None
+    except Exception as e:
+        return load_torch(), e
+
+
+if __name__ == '__main__':
+    result = export_onnx()
+    print(f"✅ Exported {result['model']} to {model_dir(result['model'])}")
+    for variant, parity in result["parity"].items():
+        print(f"   {variant}: min cosine {parity['min_cosine']}, mean {parity['mean_cosine']}")
@@ -0,0 +1,246 @@
+# LawHub Pinecone bulk upload pipeline
+#
+# Embeds and upserts document chunks in fixed-size batches across a worker pool,
+# retries failed batches with exponential backoff, and checkpoints finished batches
+# to disk so an interrupted upload resumes where it stopped. The ids of a finished upload
+# are kept in a manifest, so the next upload can delete vectors of chunks that changed
+# or disappeared.
+
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger("lawhub.pinecone")
+
+
+class InMemoryIndex:
+    """Local stand-in for a pinecone.Index (upsert / describe_index_stats / fetch)"""
+
+    def __init__(self, fail_first=0):
+        self.vectors = {}
+        self.upsert_calls = 0
+        self._fail_remaining = fail_first  # Simulate transient errors on the first N upserts
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors, namespace=None):
+        with self._lock:
+            self.upsert_calls += 1
+            if self._fail_remaining > 0:
+                self._fail_remaining -= 1
+                raise ConnectionError("Simulated Pinecone upsert failure")
+            for vec_id, values, metadata in vectors:
+                self.vectors[(namespace or "", vec_id)] = (list(values), dict(metadata or {}))
+        return {"upserted_count": len(vectors)}
+
+    def describe_index_stats(self):
+        with self._lock:
+            return {"total_vector_count": len(self.vectors)}
+
+    def delete(self, ids, namespace=None):
+        with self._lock:
+            for vec_id in ids:
+                self.vectors.pop((namespace or "", vec_id), None)
+
+    def fetch(self, ids, namespace=None):
+        with self._lock:
+            found = {i: self.vectors[(namespace or "", i)] for i in ids if (namespace or "", i) in self.vectors}
+        return {"vectors": {i: {"id": i, "values": v, "metadata": m} for i, (v, m) in found.items()}}
+
+
+class UploadCheckpoint:
+    """Set of completed batch numbers persisted as JSON, replaced atomically on every update"""
+
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.done = set()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                if state.get("fingerprint") == fingerprint:
+                    self.done = set(state.get("done", []))
+                else:
+                    logger.warning("Upload checkpoint is for a different corpus, starting over")
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable upload checkpoint: %s", e)
+
+    def mark_done(self, batch_no):
+        with self._lock:
+            self.done.add(batch_no)
+            self._write()
+
+    def clear(self):
+        with self._lock:
+            self.done = set()
+            if self.path and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _write(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"fingerprint": self.fingerprint, "done": sorted(self.done)}, f)
+        os.replace(tmp_path, self.path)
+
+
+def chunk_id(doc, position):
+    """Deterministic vector id: an unchanged chunk is overwritten in place, a changed one gets a new id"""
+    meta = getattr(doc, 'metadata', None) or {}
+    digest = hashlib.sha1(doc.page_content.encode('utf-8')).hexdigest()[:12]
+    return f"{meta.get('page', 'x')}-{position}-{digest}"
+
+
+def corpus_fingerprint(chunks, index_name, batch_size):
+    h = hashlib.sha1(f"{index_name}:{batch_size}:{len(chunks)}".encode('utf-8'))
+    for doc in chunks:
+        h.update(doc.page_content.encode('utf-8'))
+    return h.hexdigest()
+
+
+def _upsert_with_retry(index, vectors, namespace, max_retries, backoff):
+    attempt = 0
+    while True:
+        try:
+            return index.upsert(vectors=vectors, namespace=namespace)
+        except Exception as e:
+            attempt += 1
+            if attempt > max_retries:
+                raise
+            delay = backoff * (2 ** (attempt - 1)) * (1 + random.random() * 0.25)
+            logger.warning("Upsert failed (%s), retry %s/%s in %.2fs", e, attempt, max_retries, delay)
+            time.sleep(delay)
+
+
+def _read_manifest(path):
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return set(json.load(f)["ids"])
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("Ignoring unreadable upload manifest: %s", e)
+        return None
+
+
+def _write_manifest(path, ids):
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"ids": sorted(ids)}, f)
+    os.replace(tmp_path, path)
+
+
+def _delete_with_retry(index, ids, namespace, max_retries, backoff, batch_size=1000):
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        attempt = 0
+        while True:
+            try:
+                index.delete(ids=batch, namespace=namespace)
+                break
+            except Exception as e:
+                attempt += 1
+                if attempt > max_retries:
+                    raise
+                delay = backoff * (2 ** (attempt - 1)) * (1 + random.random() * 0.25)
+                logger.warning("Delete failed (%s), retry %d/%d in %.2fs", e, attempt, max_retries, delay)
+                time.sleep(delay)
+
+
+def bulk_upsert(chunks, embed_documents, index, index_name="", checkpoint_path=None,
+                batch_size=100, workers=4, max_retries=5, backoff=0.5,
+                namespace=None, progress=None, manifest_path=None):
+    """Embed and upsert chunks in batches across a thread pool, resuming from checkpoint_path.
+
+    embed_documents is a callable taking a list of texts and returning their vectors
+    (e.g. HuggingFaceEmbeddings.embed_documents). progress, if given, is called with
+    (batches_done, batches_total) after each batch. Once every batch is in, vectors
+    listed in manifest_path by the previous upload but absent from this one are deleted,
+    and the manifest is rewritten. Returns a stats dict.
+    """
+    started = time.time()
+    batches = [chunks[i:i + batch_size] for i in range(0, len(chunks), batch_size)]
+    checkpoint = UploadCheckpoint(checkpoint_path, corpus_fingerprint(chunks, index_name, batch_size))
+    pending = [n for n in range(len(batches)) if n not in checkpoint.done]
+    skipped = len(batches) - len(pending)
+    if skipped:
+        logger.info("Resuming upload: %s/%s batches already uploaded", skipped, len(batches))
+
+    def upload_batch(batch_no):
+        batch = batches[batch_no]
+        offset = batch_no * batch_size
+        values = embed_documents([doc.page_content for doc in batch])
+        vectors = []
+        for pos, (doc, vec) in enumerate(zip(batch, values)):
+            metadata = dict(doc.metadata or {})
+            metadata["text"] = doc.page_content  # LangChain's Pinecone store reads text from here
+            vectors.append((chunk_id(doc, offset + pos), list(vec), metadata))
+        _upsert_with_retry(index, vectors, namespace, max_retries, backoff)
+        checkpoint.mark_done(batch_no)
+        return len(vectors)
+
+    uploaded = 0
+    done = skipped
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pinecone-upsert") as pool:
+        futures = [pool.submit(upload_batch, n) for n in pending]
+        for future in as_completed(futures):
+            uploaded += future.result()
+            done += 1
+            if progress is not None:
+                progress(done, len(batches))
+
+    # Only after the full corpus is in, so queries never miss chunks mid-upload
+    new_ids = {chunk_id(doc, pos) for pos, doc in enumerate(chunks)}
+    previous_ids = _read_manifest(manifest_path)
+    stale = sorted(previous_ids - new_ids) if previous_ids is not None else []
+    if stale:
+        _delete_with_retry(index, stale, namespace, max_retries, backoff)
+        logger.info("Deleted %d vectors of chunks no longer in the corpus", len(stale))
+    elif previous_ids is None and manifest_path:
+        logger.info("No upload manifest yet; vectors from earlier uploads are not cleaned up this time")
+    _write_manifest(manifest_path, new_ids)
+
+    elapsed = time.time() - started
+    stats = {
+        "batches": len(batches),
+        "batches_skipped": skipped,
+        "vectors_uploaded": uploaded,
+        "vectors_deleted": len(stale),
+        "seconds": round(elapsed, 2),
+        "vectors_per_second": round(uploaded / elapsed, 1) if elapsed > 0 else None,
+    }
+    logger.info("Uploaded %s vectors in %ss (%s vec/s)", uploaded, stats['seconds'], stats['vectors_per_second'])
+    # A finished upload no longer needs its checkpoint
+    checkpoint.clear()
+    return stats
+
+
+def cached_index_stats(index, cache_path, ttl_seconds, refresh=False):
+    """describe_index_stats() cached on disk for ttl_seconds"""
+    if not refresh and cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if time.time() - cached.get("fetched_at", 0) < ttl_seconds:
+                return cached["stats"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    raw = index.describe_index_stats()
+    total = raw.get("total_vector_count", 0) if isinstance(raw, dict) else getattr(raw, "total_vector_count", 0)
+    stats = {"total_vector_count": int(total or 0)}
+    if cache_path:
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"fetched_at": time.time(), "stats": stats}, f)
+        os.replace(tmp_path, cache_path)
+    return stats
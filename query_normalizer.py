@@ -0,0 +1,224 @@
+# LawHub query normalization
+#
+# Turns a raw question into the canonical form used for cache keys, keyword rules and
+# retrieval. It applies Unicode NFKC, case folding and abbreviation expansion
+# ("art. 21" -> "article 21"), then corrects typos against a vocabulary built from the
+# indexed chunks and the rule tables. Ordinary English words are never rewritten into
+# near-miss rule keywords ("rest" -> "rent"): common words are left alone, and a word
+# found in an optional English frequency list is only replaced by a far more frequent
+# one. Correction uses symmetric-delete lookups: every vocabulary word's deletions are
+# precomputed once, so correcting a token costs a few dict probes plus a bounded
+# edit-distance check. Results are memoized per token.
+# Standard library only.
+
+import re
+import unicodedata
+from collections import Counter
+
+# Expanded wherever they appear
+ABBREVIATIONS = {
+    "govt": "government", "dept": "department", "amdt": "amendment", "amndt": "amendment",
+    "const": "constitution", "constn": "constitution", "fr": "fundamental right",
+    "frs": "fundamental rights", "dpsp": "directive principles of state policy",
+    "hc": "high court", "pil": "public interest litigation",
+    "info": "information", "w/o": "without", "u/s": "under section", "r/w": "read with",
+}
+# Expanded only before a number ("art 21", "sec. 498a", "cl 3")
+NUMBERED_ABBREVIATIONS = {
+    "art": "article", "arts": "articles", "sec": "section",
+    "secs": "sections", "s": "section", "ss": "sections", "cl": "clause", "sch": "schedule",
+    "para": "paragraph", "pt": "part",
+}
+
+_SLASH_ABBREV_RE = re.compile(r"\b(?:w/o|u/s|r/w)\b")
+_LETTER_DIGIT_RE = re.compile(r"(?<=[a-z])(?=\d)")
+_TOKEN_RE = re.compile(r"[\w\u0900-\u097f']+")  # Devanagari vowel signs are not \w on their own
+_NUMBER_RE = re.compile(r"^(?:\d+[a-z]?|[ivxlc]+)$")
+_CORRECTABLE_RE = re.compile(r"^[a-z]{3,}$")
+_VOWELS = set("aeiouy")
+
+# Everyday words that sit one edit away from legal keywords; never corrected
+COMMON_WORDS = frozenset("""
+    about above after again against also always among another answer any anyone around asked
+    away back based became because been before began being below best better between both
+    bring brought built call came cannot care case cause change child come could count dear
+    does done down during each early else even ever every fact fall family fast feel felt find
+    fine first five four free from full gave give given goes going gone good great hand hard
+    have having head hear heard help here high hold home hope into just keep kept kind knew
+    know land last late later least left lend less lest life like line list little live long
+    look lose lost made main make many mean means might mind more most move much must name near
+    need never next none note nothing number often once only open other over part past pass
+    place point pour quite rate read real rest right said same seen self send sent shall short
+    should show side since some soon sort still such sure take tell term than that their them
+    then there these they thing think this those though three through time told took turn
+    under until upon used very want well went were what when where which while whom whose why
+    will wish with within without word words work world would year years your
+""".split())
+
+
+def load_frequency_list(path):
+    """Word counts from a "word count" per line file (e.g. a general English frequency list)"""
+    counts = Counter()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and _CORRECTABLE_RE.match(parts[0].casefold()):
+                try:
+                    counts[parts[0].casefold()] += int(float(parts[1]))
+                except ValueError:
+                    continue
+    return counts
+
+
+def tokenize(text):
+    """NFKC-normalized, case-folded word tokens"""
+    return _TOKEN_RE.findall(unicodedata.normalize("NFKC", text).casefold())
+
+
+def count_words(texts, min_length=3):
+    """Word counts over texts, for building a SpellCorrector vocabulary"""
+    counts = Counter()
+    for text in texts:
+        counts.update(t for t in tokenize(text) if len(t) >= min_length and _CORRECTABLE_RE.match(t))
+    return counts
+
+
+def _osa_distance(a, b, max_distance):
+    """Optimal string alignment distance, or max_distance + 1 once it is certainly exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, prev2[j - 2] + 1)
+            cur[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def _skeleton(word):
+    """First letter plus de-duplicated consonants ("habeas" and "habious" both give "hbs")"""
+    out = [word[0]]
+    for ch in word[1:]:
+        if ch not in _VOWELS and ch != out[-1]:
+            out.append(ch)
+    return "".join(out)
+
+
+class SpellCorrector:
+    """Symmetric-delete spelling correction over a fixed vocabulary.
+
+    vocabulary maps word -> frequency. Tokens already in the vocabulary, numbers and
+    non-Latin tokens are left alone. Candidates must share the token's first letter and
+    lie within max_distance edits (1 for words under 6 letters), ties going to the more
+    frequent word. A consonant-skeleton index catches vowel-heavy misspellings that are
+    one edit further away.
+
+    Words in COMMON_WORDS are kept as they are. english optionally maps general English
+    words to their frequency; a token found there is itself a real word, so it is only
+    replaced by a one-edit candidate at least valid_word_ratio times as frequent in it.
+    """
+
+    def __init__(self, vocabulary, max_distance=2, prefix_length=7, cache_size=50000,
+                 english=None, valid_word_ratio=20.0):
+        self.vocabulary = dict(vocabulary)
+        self.english = dict(english or {})
+        self.valid_word_ratio = valid_word_ratio
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.cache_size = cache_size
+        self.corrections = 0
+        self._cache = {}
+        self._deletes = {}
+        self._skeletons = {}
+        for word in self.vocabulary:
+            for variant in self._delete_variants(word[:prefix_length], max_distance):
+                self._deletes.setdefault(variant, []).append(word)
+            if len(word) >= 5:
+                self._skeletons.setdefault(_skeleton(word), []).append(word)
+
+    @staticmethod
+    def _delete_variants(word, distance):
+        variants = {word}
+        frontier = {word}
+        for _ in range(distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w)) if len(w) > 1}
+            variants |= frontier
+        return variants
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def correct_token(self, token):
+        cached = self._cache.get(token)
+        if cached is not None:
+            return cached
+        result = self._lookup(token)
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[token] = result
+        return result
+
+    def _lookup(self, token):
+        if (token in self.vocabulary or token in COMMON_WORDS or len(token) < 4
+                or not _CORRECTABLE_RE.match(token)):
+            return token
+        known = self.english.get(token, 0)
+        max_distance = self.max_distance if len(token) >= 6 and not known else 1
+        best, best_key = None, None
+        seen = set()
+        for variant in self._delete_variants(token[:self.prefix_length], max_distance):
+            for word in self._deletes.get(variant, ()):
+                if word in seen or word[0] != token[0]:
+                    continue
+                seen.add(word)
+                distance = _osa_distance(token, word, max_distance)
+                if distance <= max_distance:
+                    key = (distance, -self.vocabulary[word])
+                    if best_key is None or key < best_key:
+                        best, best_key = word, key
+        if best is None and len(token) >= 6 and not known:
+            for word in self._skeletons.get(_skeleton(token), ()):
+                distance = _osa_distance(token, word, max_distance + 1)
+                if distance <= max_distance + 1:
+                    key = (distance, -self.vocabulary[word])
+                    if best_key is None or key < best_key:
+                        best, best_key = word, key
+        if best is None or (known and self.english.get(best, 0) < self.valid_word_ratio * known):
+            return token
+        self.corrections += 1
+        return best
+
+    def correct(self, tokens):
+        return [self.correct_token(t) for t in tokens]
+
+
+def normalize_query(text, corrector=None):
+    """Canonical form of a question: folded, abbreviations expanded, typos corrected"""
+    folded = unicodedata.normalize("NFKC", text).casefold()
+    folded = _SLASH_ABBREV_RE.sub(lambda m: f" {ABBREVIATIONS[m.group(0)]} ", folded)
+    folded = _LETTER_DIGIT_RE.sub(" ", folded)  # "art21" -> "art 21"
+    tokens = _TOKEN_RE.findall(folded)
+
+    expanded = []
+    for i, token in enumerate(tokens):
+        following = tokens[i + 1] if i + 1 < len(tokens) else ""
+        if token in NUMBERED_ABBREVIATIONS and _NUMBER_RE.match(following):
+            expanded.extend(NUMBERED_ABBREVIATIONS[token].split())
+        elif token in ABBREVIATIONS:
+            expanded.extend(ABBREVIATIONS[token].split())
+        else:
+            expanded.append(token)
+
+    if corrector is not None:
+        expanded = corrector.correct(expanded)
+    return " ".join(expanded)
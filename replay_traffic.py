@@ -0,0 +1,201 @@
+# LawHub traffic replay
+#
+# Re-issues a traffic capture (TRAFFIC_CAPTURE in config.py) against a running server.
+# Requests keep their original inter-arrival gaps, optionally compressed by --speed.
+# Each response's latency, status and answer path go to a results file. diff compares
+# two results files, or a capture against a replay, and exits non-zero when latency or
+# the answer-path mix regresses beyond the given limits.
+#
+# Latencies differ in kind: a capture records time spent inside the Flask handler, while
+# a replay records the client round trip (network, ASGI queueing, serialization). diff
+# only gates latency when both files are of the same kind; capture vs replay compares
+# answer paths and error rates, and its latency columns are informational.
+#
+#   python replay_traffic.py replay traffic_capture.jsonl --target http://localhost:5000 -o base.jsonl
+#   python replay_traffic.py replay traffic_capture.jsonl --target http://staging:5000 --speed 4 -o new.jsonl
+#   python replay_traffic.py diff base.jsonl new.jsonl --max-p95-regression 0.15
+
+import argparse
+import json
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from traffic_capture import answer_path
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def load_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _send(session, target, entry, session_prefix, timeout):
+    body = {"question": entry["question"]}
+    if entry.get("country"):
+        body["country"] = entry["country"]
+    if entry.get("session"):
+        body["session_id"] = f"{session_prefix}-{entry['session']}"
+    started = time.perf_counter()
+    try:
+        response = session.post(target + entry["endpoint"], json=body, timeout=timeout)
+        latency_ms = (time.perf_counter() - started) * 1000
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = None
+        path = response.headers.get("X-Answer-Path") or answer_path(response.status_code, payload)
+        return {"status": response.status_code, "path": path, "latency_ms": round(latency_ms, 1)}
+    except requests.RequestException as e:
+        return {"status": 0, "path": "error", "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+                "error": type(e).__name__}
+
+
+def replay(entries, target, speed=1.0, concurrency=256, timeout=180):
+    """Replay entries on their original schedule (divided by speed); returns one result per entry"""
+    target = target.rstrip("/")
+    session_prefix = f"replay-{uuid.uuid4().hex[:8]}"
+    entries = sorted(entries, key=lambda e: e["ts"])
+    results = [None] * len(entries)
+    local = threading.local()
+    first_ts = entries[0]["ts"] if entries else 0
+    started = time.perf_counter()
+
+    def run(i, entry, scheduled):
+        # How late the request left: large values mean the replayer, not the server, is saturated
+        lag_ms = max(0.0, time.perf_counter() - started - scheduled) * 1000
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        outcome = _send(local.session, target, entry, session_prefix, timeout)
+        results[i] = {"endpoint": entry["endpoint"], "offset_s": round(scheduled, 3),
+                      "dispatch_lag_ms": round(lag_ms, 1), **outcome}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i, entry in enumerate(entries):
+            scheduled = (entry["ts"] - first_ts) / speed
+            delay = scheduled - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run, i, entry, scheduled)
+            if (i + 1) % 500 == 0:
+                print(f"   {i + 1}/{len(entries)} sent", file=sys.stderr)
+    return results
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(results):
+    """Latency percentiles, error rate and answer-path shares, overall and per endpoint"""
+    groups = defaultdict(list)
+    for r in results:
+        groups["all"].append(r)
+        groups[r["endpoint"]].append(r)
+    summary = {}
+    for name, rows in groups.items():
+        ok = sorted(r["latency_ms"] for r in rows if 0 < r["status"] < 500)
+        paths = Counter(r.get("path") or "unknown" for r in rows)
+        summary[name] = {
+            "count": len(rows),
+            "error_rate": round(sum(1 for r in rows if r["status"] == 0 or r["status"] >= 500) / len(rows), 4),
+            **{f"p{p}_ms": _percentile(ok, p) for p in PERCENTILES},
+            "paths": {path: round(n / len(rows), 4) for path, n in paths.most_common()},
+        }
+    return summary
+
+
+def _is_capture(rows):
+    # Capture lines keep the question; replay results don't
+    return bool(rows) and "question" in rows[0]
+
+
+def diff(base, new, max_p95_regression=0.10, max_path_shift=0.05, max_error_increase=0.01):
+    """Print a side-by-side comparison; returns the list of regressions found"""
+    a, b = summarize(base), summarize(new)
+    regressions = []
+    same_timing = _is_capture(base) == _is_capture(new)
+    if not same_timing:
+        print("ℹ️ Capture latency is in-process, replay latency is a round trip: latency is not gated")
+    for name in sorted(set(a) | set(b), key=lambda n: (n != "all", n)):
+        sa, sb = a.get(name), b.get(name)
+        print(f"\n{name}  (base {sa['count'] if sa else 0} requests, new {sb['count'] if sb else 0})")
+        if not sa or not sb:
+            continue
+        print(f"  {'':<14} {'base':>10} {'new':>10} {'change':>9}")
+        for key in [f"p{p}_ms" for p in PERCENTILES] + ["error_rate"]:
+            va, vb = sa[key], sb[key]
+            change = f"{(vb - va) / va:+.1%}" if va and vb is not None else ""
+            print(f"  {key:<14} {va!s:>10} {vb!s:>10} {change:>9}")
+        if same_timing and sa["p95_ms"] and sb["p95_ms"] and (sb["p95_ms"] - sa["p95_ms"]) / sa["p95_ms"] > max_p95_regression:
+            regressions.append(f"{name}: p95 {sa['p95_ms']} -> {sb['p95_ms']} ms")
+        if sb["error_rate"] - sa["error_rate"] > max_error_increase:
+            regressions.append(f"{name}: error rate {sa['error_rate']:.2%} -> {sb['error_rate']:.2%}")
+        print("  answer paths:")
+        for path in sorted(set(sa["paths"]) | set(sb["paths"])):
+            pa, pb = sa["paths"].get(path, 0.0), sb["paths"].get(path, 0.0)
+            print(f"    {path:<20} {pa:>8.1%} {pb:>8.1%} {pb - pa:>+8.1%}")
+            if abs(pb - pa) > max_path_shift:
+                regressions.append(f"{name}: {path} share {pa:.1%} -> {pb:.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured LawHub traffic and diff the results")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rep = sub.add_parser("replay", help="Re-issue a capture against a server")
+    rep.add_argument("capture", help="JSONL written by TRAFFIC_CAPTURE")
+    rep.add_argument("--target", default="http://localhost:5000")
+    rep.add_argument("--speed", type=float, default=1.0, help="Rate multiplier (2 = twice the captured rate)")
+    rep.add_argument("--limit", type=int, help="Replay only the earliest N requests")
+    rep.add_argument("--concurrency", type=int, default=256, help="Most requests in flight")
+    rep.add_argument("--timeout", type=float, default=180)
+    rep.add_argument("-o", "--output", required=True, help="Results JSONL")
+
+    dif = sub.add_parser("diff", help="Compare two results files (or a capture and a replay, without "
+                                      "gating latency: captures time the handler, replays the round trip)")
+    dif.add_argument("base")
+    dif.add_argument("new")
+    dif.add_argument("--max-p95-regression", type=float, default=0.10, help="Allowed relative p95 increase")
+    dif.add_argument("--max-path-shift", type=float, default=0.05, help="Allowed change in any answer path's share")
+    dif.add_argument("--max-error-increase", type=float, default=0.01)
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        # Captures from several workers interleave: --limit takes the earliest N requests
+        entries = sorted(load_jsonl(args.capture), key=lambda e: e["ts"])[:args.limit]
+        if not entries:
+            parser.error("capture is empty")
+        span = (max(e["ts"] for e in entries) - min(e["ts"] for e in entries)) / args.speed
+        print(f"▶️ Replaying {len(entries)} requests against {args.target} over ~{span:.0f}s", file=sys.stderr)
+        results = replay(entries, args.target, args.speed, args.concurrency, args.timeout)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for r in results:
+                f.write(json.dumps(r) + "\n")
+        late = sum(1 for r in results if r["dispatch_lag_ms"] > 100)
+        if late:
+            print(f"⚠️ {late} requests left >100 ms late; raise --concurrency or lower --speed", file=sys.stderr)
+        print(json.dumps(summarize(results)["all"], indent=2))
+    else:
+        regressions = diff(load_jsonl(args.base), load_jsonl(args.new),
+                           args.max_p95_regression, args.max_path_shift, args.max_error_increase)
+        if regressions:
+            print("\n❌ Regressions:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import chunk_store
+from chunk_store import ChunkStore, article_id, build_chunk_store
+
+CODECS = [
+    pytest.param("zstd", marks=pytest.mark.skipif(chunk_store.zstandard is None,
+                                                  reason="zstandard not installed")),
+    "zlib",
+    "none",
+]
+
+
+def _chunks(n=40):
+    docs = []
+    for i in range(n):
+        text = f"{i % 300 + 1}. Article text {i} — नागरिक " + "x" * (i * 37 % 500)
+        meta = {"source": f"doc{i % 3}.pdf", "lang": "hi" if i % 4 == 0 else "en"}
+        if i % 5:
+            meta["page"] = i
+        docs.append(SimpleNamespace(page_content=text, metadata=meta))
+    return docs
+
+
+def _vectors(n=40, dim=8):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_round_trip(tmp_path, codec):
+    chunks, vectors = _chunks(), _vectors()
+    # Small blocks so the store spans many of them
+    build_chunk_store(str(tmp_path), chunks, vectors, block_bytes=1024, codec=codec)
+    store = ChunkStore(str(tmp_path), cached_blocks=2)
+    try:
+        assert store.codec == codec
+        assert len(store) == len(chunks)
+        assert len(store.blocks) > 1
+        for i, doc in enumerate(chunks):
+            assert store.text(i) == doc.page_content
+            meta = store.metadata(i)
+            assert meta["source"] == doc.metadata["source"]
+            assert meta["lang"] == doc.metadata["lang"]
+            assert meta.get("page") == doc.metadata.get("page")
+            assert meta["article"] == article_id(doc.page_content)
+            assert meta["chunk_id"] == i
+        assert store.vectors.dtype == np.float16
+        np.testing.assert_allclose(np.asarray(store.vectors, dtype=np.float32), vectors, atol=1e-3)
+    finally:
+        store.close()
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_concurrent_reads(tmp_path, codec):
+    chunks = _chunks(200)
+    build_chunk_store(str(tmp_path), chunks, _vectors(200), block_bytes=2048, codec=codec)
+    store = ChunkStore(str(tmp_path), cached_blocks=3)
+    try:
+        ids = list(np.random.default_rng(1).integers(0, len(chunks), 2000))
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            texts = list(pool.map(store.text, ids))
+        assert texts == [chunks[i].page_content for i in ids]
+    finally:
+        store.close()
+
+
+def test_lang_filter_and_nearest(tmp_path):
+    chunks, vectors = _chunks(), _vectors()
+    build_chunk_store(str(tmp_path), chunks, vectors, codec="zlib")
+    store = ChunkStore(str(tmp_path))
+    try:
+        hindi = store.ids_for_lang("hi")
+        assert list(hindi) == [i for i, doc in enumerate(chunks) if doc.metadata["lang"] == "hi"]
+        assert len(store.ids_for_lang("ta")) == 0
+
+        assert store.nearest(vectors[7], 1)[0] == 7
+        nearest_hindi = store.nearest(vectors[7], 3, lang="hi")
+        assert len(nearest_hindi) == 3
+        assert set(nearest_hindi) <= set(hindi)
+        assert store.nearest(vectors[8], 1, lang="hi")[0] == 8
+        assert len(store.nearest(vectors[7], 3, lang="ta")) == 0
+    finally:
+        store.close()
+
+
+def test_empty_store(tmp_path):
+    build_chunk_store(str(tmp_path), [], [], codec="zlib", dimension=8)
+    store = ChunkStore(str(tmp_path))
+    try:
+        assert len(store) == 0
+        assert store.vectors.shape == (0, 8)
+        assert len(store.nearest(np.ones(8), 5)) == 0
+    finally:
+        store.close()
+
+
+def test_close_releases_arrays(tmp_path):
+    build_chunk_store(str(tmp_path), _chunks(5), _vectors(5), codec="zlib")
+    store = ChunkStore(str(tmp_path))
+    assert ChunkStore.exists(str(tmp_path))
+    store.text(0)
+    store.close()
+    assert store.records is None and store.vectors is None
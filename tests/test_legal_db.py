@@ -0,0 +1,108 @@
+import io
+import json
+import sqlite3
+import threading
+
+import pytest
+
+import legal_db
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "legal.db")
+
+
+def _qa(n, country="India", category="Criminal"):
+    return [{"question": f"q{i}", "answer": f"a{i}", "country": country, "category": category}
+            for i in range(n)]
+
+
+def test_connect_creates_schema_in_wal_mode(db_path):
+    conn = legal_db.connect(db_path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    for table in legal_db.TABLES:
+        assert {table, f"{table}_stats"} <= tables
+
+
+def test_insert_rows_updates_stats(db_path):
+    conn = legal_db.connect(db_path)
+    records = _qa(5) + _qa(3, country="USA", category="Civil") + [{"question": "q", "answer": " "},
+                                                                   {"question": "q", "answer": "a"}]
+    result = legal_db.insert_rows(conn, "training_data", records, batch_size=2)
+    assert (result["inserted"], result["skipped"]) == (9, 1)
+
+    stats = legal_db.table_stats(conn, "training_data")
+    assert stats["total"] == 9
+    assert stats["country_specific"] == 8
+    assert stats["by_country"] == {"India": 5, "USA": 3, "General": 1}
+    assert stats["by_category"] == {"Criminal": 5, "Civil": 3, "General": 1}
+
+
+def test_failed_batch_rolls_back_rows_and_stats(db_path):
+    conn = legal_db.connect(db_path)
+    legal_db.insert_rows(conn, "training_data", _qa(2))
+    spec = legal_db.TABLES["training_data"]
+    bad = [("q", "a", "India", "Criminal", "src"), ("q", None, "India", "Criminal", "src")]
+    with pytest.raises(sqlite3.IntegrityError):
+        legal_db._insert_batch(conn, "training_data", spec, bad)
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM training_data").fetchone()[0] == 2
+    assert legal_db.table_stats(conn, "training_data")["total"] == 2
+
+
+def test_rebuild_stats(db_path):
+    conn = legal_db.connect(db_path)
+    legal_db.insert_rows(conn, "training_data", _qa(4))
+    # A write that bypasses the module leaves the stats stale until they are rebuilt
+    conn.execute("INSERT INTO training_data (question, answer, country) VALUES ('q', 'a', 'UK')")
+    assert legal_db.table_stats(conn, "training_data")["total"] == 4
+    legal_db.rebuild_stats(conn)
+    assert legal_db.table_stats(conn, "training_data")["by_country"] == {"India": 4, "UK": 1}
+
+
+def test_rebuild_stats_rolls_back_on_failure(db_path):
+    conn = legal_db.connect(db_path)
+    legal_db.insert_rows(conn, "training_data", _qa(4))
+    conn.execute("DROP TABLE legal_documents")
+    with pytest.raises(sqlite3.OperationalError):
+        legal_db.rebuild_stats(conn)
+    assert not conn.in_transaction
+    assert legal_db.table_stats(conn, "training_data")["total"] == 4
+
+
+def test_export_round_trip(db_path):
+    conn = legal_db.connect(db_path)
+    legal_db.insert_rows(conn, "training_data", _qa(7))
+    lines = "".join(legal_db.export_rows(conn, "training_data", "jsonl", fetch_size=3)).splitlines()
+    assert [json.loads(line)["question"] for line in lines] == [f"q{i}" for i in range(7)]
+
+    text = "".join(legal_db.export_rows(conn, "training_data", "csv", fetch_size=3))
+    rows = list(legal_db.iter_csv(io.StringIO(text)))
+    assert len(rows) == 7 and rows[0]["answer"] == "a0"
+    with pytest.raises(ValueError):
+        list(legal_db.export_rows(conn, "training_data", "xml"))
+
+
+def test_concurrent_writers(db_path):
+    legal_db.connect(db_path).close()
+    errors = []
+
+    def load(country):
+        try:
+            conn = legal_db.connect(db_path)
+            legal_db.insert_rows(conn, "training_data", _qa(50, country=country), batch_size=10)
+            conn.close()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=load, args=(f"C{i}",)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    stats = legal_db.table_stats(legal_db.connect(db_path), "training_data")
+    assert stats["total"] == 200
+    assert stats["by_country"] == {f"C{i}": 50 for i in range(4)}
@@ -0,0 +1,32 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from onnx_embeddings import _META_FILE, load_embeddings, model_dir
+
+
+def _write_export(cache_dir, model_name, min_cosine):
+    path = model_dir(model_name, cache_dir)
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, _META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({"model_name": model_name, "parity": {"int8": {"min_cosine": min_cosine}}}, f)
+
+
+def test_low_parity_falls_back_to_torch(tmp_path):
+    _write_export(str(tmp_path), "test-model", 0.91)
+    model, error = load_embeddings(lambda: "torch", model_name="test-model", cache_dir=str(tmp_path),
+                                   variant="int8", min_cosine=0.99)
+    assert model == "torch"
+    assert isinstance(error, ValueError)
+    assert "parity" in str(error)
+
+
+def test_missing_variant_falls_back_to_torch(tmp_path):
+    _write_export(str(tmp_path), "test-model", 0.999)
+    model, error = load_embeddings(lambda: "torch", model_name="test-model", cache_dir=str(tmp_path),
+                                   variant="fp32", min_cosine=0.99)
+    assert model == "torch"
+    assert error is not None
@@ -0,0 +1,61 @@
+import pytest
+
+from query_normalizer import (SpellCorrector, count_words, load_frequency_list, normalize_query,
+                              tokenize)
+
+CORPUS = [
+    "Article 21 of the Constitution protects life and personal liberty.",
+    "A writ of habeas corpus may be issued by the High Court under Article 226.",
+    "The Constitution (Forty-second Amendment) Act amended the Preamble.",
+    "A tenant must pay rent to the landlord; the landlord may seek eviction.",
+    "Section 498A punishes cruelty to a married woman.",
+] * 3
+
+
+@pytest.fixture
+def corrector():
+    return SpellCorrector(count_words(CORPUS))
+
+
+def test_abbreviations():
+    assert normalize_query("Art. 21 and sec 498A") == "article 21 and section 498a"
+    assert normalize_query("art21 u/s 302") == "article 21 under section 302"
+    assert normalize_query("Govt. PIL in HC") == "government public interest litigation in high court"
+    # Numbered abbreviations only expand before a number
+    assert normalize_query("the art of law") == "the art of law"
+
+
+def test_tokenize_folds_and_keeps_devanagari():
+    assert tokenize("ＡＲＴＩＣＬＥ २१ नागरिकता") == ["article", "२१", "नागरिकता"]
+
+
+def test_typos_are_corrected(corrector):
+    assert normalize_query("constituion amendmnt", corrector) == "constitution amendment"
+    assert normalize_query("habious corpus", corrector) == "habeas corpus"
+    assert corrector.corrections == 3
+
+
+def test_real_words_are_left_alone(corrector):
+    for question in ["can i rest at home", "what is my right to life", "how do i pay my dues",
+                     "art 21 विवाह", "section 498a"]:
+        assert normalize_query(question, corrector).split() == normalize_query(question).split()
+    assert corrector.corrections == 0
+
+
+def test_english_word_needs_a_far_more_frequent_candidate():
+    vocabulary = {"tenant": 5, "rent": 5}
+    # "rant" is a real English word: "rent" is not frequent enough to replace it
+    rare = SpellCorrector(vocabulary, english={"rant": 100, "rent": 900})
+    assert rare.correct_token("rant") == "rant"
+    common = SpellCorrector(vocabulary, english={"rant": 100, "rent": 5000})
+    assert common.correct_token("rant") == "rent"
+    # A real word is only ever replaced by a one-edit candidate
+    assert SpellCorrector(vocabulary, english={"tenet": 1, "tenant": 5000}).correct_token("tenet") == "tenet"
+    # Without an English list, ordinary distance rules apply
+    assert SpellCorrector(vocabulary).correct_token("tenent") == "tenant"
+
+
+def test_load_frequency_list(tmp_path):
+    path = tmp_path / "freq.txt"
+    path.write_text("the 1000\nRent 20\nbad-line\nrent 5\nx1 3\nlaw 7.0\n", encoding="utf-8")
+    assert load_frequency_list(str(path)) == {"the": 1000, "rent": 25, "law": 7}
@@ -0,0 +1,117 @@
+# LawHub traffic capture
+#
+# Opt-in recording of question traffic (/api/ask, /api/legal_qa, /api/deepseek_legal) as
+# JSONL, for replay_traffic.py. Each line holds the arrival time, endpoint, sanitized
+# question, country, a hashed session id, status, latency and the answer path the
+# server took. Emails, phone numbers and ID numbers are masked before anything is
+# written. Request threads only enqueue records and a background thread writes them.
+# When the queue is full or the file reaches its size cap, records are dropped instead
+# of slowing requests down. Standard library only.
+
+import atexit
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+
+_REDACTIONS = [
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "[email]"),
+    (re.compile(r"\b[A-Z]{5}\d{4}[A-Z]\b"), "[id]"),  # PAN
+    (re.compile(r"\b\d{4}[ -]?\d{4}[ -]?\d{4}\b"), "[id]"),  # Aadhaar
+    (re.compile(r"(?<![\w])\+?\d[\d ()-]{7,}\d\b"), "[phone]"),
+]
+MAX_QUESTION_CHARS = 2000
+
+
+def sanitize(text):
+    """Question text with emails, phone and ID numbers masked (article/section numbers are kept)"""
+    text = (text or "")[:MAX_QUESTION_CHARS]
+    for pattern, replacement in _REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def hash_session(session_id):
+    """Stable pseudonym for a session id, so replay can keep a conversation's turns together"""
+    if not session_id:
+        return None
+    return hashlib.sha1(session_id.encode('utf-8')).hexdigest()[:12]
+
+
+def answer_path(status, payload, noted=None):
+    """Which path produced a response: llm+rag, retrieval, rule-based, template-echo, early-stop, ..."""
+    if noted:
+        return noted
+    if status >= 500 and isinstance(payload, dict) and payload.get("retry_after") is not None:
+        return "rejected"
+    if status >= 400 or not isinstance(payload, dict) or not payload.get("success", True):
+        return "error"
+    if payload.get("warehouse"):
+        return "warehouse"
+    if payload.get("priority"):
+        return "priority"
+    return {"LLM + RAG": "llm+rag", "retrieval": "retrieval", "rule-based": "rule-based"}.get(
+        payload.get("model"), str(payload.get("model") or "unknown"))
+
+
+class TrafficCapture:
+    """Appends sanitized request records to a JSONL file from a background thread"""
+
+    def __init__(self, path, max_mb=200, queue_size=10000):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._size = self._file.tell()
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, endpoint, ts, data, status, path, latency_ms):
+        """Queue one request; data is the request's JSON body"""
+        entry = {
+            "ts": round(ts, 4),
+            "endpoint": endpoint,
+            "question": sanitize(data.get("question")),
+            "country": data.get("country") or None,
+            "session": hash_session((data.get("session_id") or "").strip()),
+            "status": status,
+            "path": path,
+            "latency_ms": round(latency_ms, 1),
+        }
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                break
+            line = json.dumps(entry, ensure_ascii=False) + "\n"
+            size = len(line.encode('utf-8'))  # Non-ASCII (e.g. Hindi) questions take several bytes per char
+            if self._size + size > self.max_bytes:
+                self.dropped += 1
+                continue
+            self._file.write(line)
+            self._size += size
+            self.written += 1
+            if self._queue.empty():
+                self._file.flush()
+        self._file.close()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def stats(self):
+        return {"path": self.path, "written": self.written, "dropped": self.dropped}